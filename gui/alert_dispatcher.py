@@ -0,0 +1,111 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+# Маркер остановки потоков диспетчера
+_STOP = object()
+
+
+@dataclass
+class AlertEvent:
+    rule: str     # правило, по которому копятся дайджесты ('leak', 'threshold', ...)
+    key: str      # объект события: повтор с тем же ключом заменяет предыдущий
+    title: str    # заголовок сообщения
+    text: str     # полный текст для одиночного уведомления
+    summary: str  # строка для дайджеста
+    timestamp: float = field(default_factory=time.time)
+
+
+class AlertDispatcher:
+    """Асинхронная доставка уведомлений с дедупликацией и дайджестами.
+
+    Цикл мониторинга только кладёт события в ограниченную очередь
+    (submit не блокирует; при переполнении событие отбрасывается).
+    Поток диспетчера копит события по правилам: первое событие правила
+    уходит сразу, а всё, что пришло за следующие digest_interval секунд,
+    сводится в одно сообщение. Отправка идёт в отдельном потоке, так что
+    медленная сеть не задерживает ни замеры, ни сборку дайджестов.
+    """
+
+    def __init__(self, send, digest_interval: float = 60.0, max_queue: int = 1000,
+                 max_items: int = 20):
+        self.send = send  # функция отправки текста
+        self.digest_interval = digest_interval
+        self.max_items = max_items
+        self.dropped = 0
+        self._events = queue.Queue(maxsize=max_queue)
+        self._outbox = queue.Queue()
+        self._pending = {}    # {правило: {ключ: AlertEvent}}
+        self._last_sent = {}  # {правило: время отправки, monotonic}
+        self._threads = [
+            threading.Thread(target=self._dispatch_loop, name="alert-dispatch", daemon=True),
+            threading.Thread(target=self._delivery_loop, name="alert-delivery", daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, event: AlertEvent) -> bool:
+        """Ставит событие в очередь; False, если очередь переполнена"""
+        try:
+            self._events.put_nowait(event)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def stop(self, timeout: float = 2.0):
+        """Отправляет накопленное и останавливает потоки"""
+        try:
+            self._events.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+
+    def _next_due(self):
+        due = [self._last_sent.get(rule, float('-inf')) + self.digest_interval for rule in self._pending]
+        return min(due) if due else None
+
+    def _dispatch_loop(self):
+        while True:
+            due = self._next_due()
+            timeout = None if due is None else max(0.0, due - time.monotonic())
+            try:
+                event = self._events.get(timeout=timeout)
+            except queue.Empty:
+                event = None
+
+            if event is _STOP:
+                for rule in list(self._pending):
+                    self._outbox.put(self._digest(self._pending.pop(rule)))
+                self._outbox.put(_STOP)
+                return
+            if event is not None:
+                self._pending.setdefault(event.rule, {})[event.key] = event
+
+            now = time.monotonic()
+            for rule in list(self._pending):
+                if now >= self._last_sent.get(rule, float('-inf')) + self.digest_interval:
+                    self._outbox.put(self._digest(self._pending.pop(rule)))
+                    self._last_sent[rule] = now
+
+    def _digest(self, events: dict) -> str:
+        events = list(events.values())
+        if len(events) == 1:
+            return f"{events[0].title}\n{events[0].text}"
+        lines = [f"{events[0].title} — {len(events)} шт."]
+        lines += [f"• {event.summary}" for event in events[:self.max_items]]
+        if len(events) > self.max_items:
+            lines.append(f"… и ещё {len(events) - self.max_items}")
+        return "\n".join(lines)
+
+    def _delivery_loop(self):
+        while True:
+            text = self._outbox.get()
+            if text is _STOP:
+                return
+            try:
+                self.send(text)
+            except Exception as e:
+                print(f"Ошибка доставки уведомления: {e}")
@@ -0,0 +1,85 @@
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+def _age(snapshot, kind: str) -> str:
+    sampled = snapshot.sampled.get(kind)
+    if not sampled:
+        return ""
+    return (f"\nДанные на {datetime.fromtimestamp(sampled).strftime('%H:%M:%S')} "
+            f"({time.time() - sampled:.0f} с назад)")
+
+
+def _rate(value: float) -> str:
+    for unit in ("Б/с", "КБ/с", "МБ/с"):
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} ГБ/с"
+
+
+def format_top(snapshot, count: int = 10) -> str:
+    """Самые крупные процессы по памяти и по загрузке CPU"""
+    processes = snapshot.processes
+    if processes is None or not len(processes):
+        return "⏳ Данные о процессах ещё собираются"
+    count = max(1, min(count, 50, len(processes)))
+    rss_mb = processes.rss_mb
+
+    lines = [f"🧠 Top-{count} по памяти:"]
+    for i in np.argsort(rss_mb)[::-1][:count].tolist():
+        lines.append(f"{processes.names[i]} ({processes.pids[i]}): {rss_mb[i]:.1f} МБ")
+
+    lines.append(f"\n⚙️ Top-{count} по CPU:")
+    for i in np.argsort(processes.cpu_percent)[::-1][:count].tolist():
+        lines.append(f"{processes.names[i]} ({processes.pids[i]}): {processes.cpu_percent[i]:.1f}%")
+    return "\n".join(lines) + _age(snapshot, 'processes')
+
+
+def format_disk(snapshot) -> str:
+    if not snapshot.disk:
+        return "⏳ Данные о дисках ещё собираются"
+    lines = ["💾 Заполнение дисков:"]
+    for part in snapshot.disk:
+        if 'error' in part:
+            lines.append(f"{part['mountpoint']}: {part['error']}")
+            continue
+        mark = "🔴" if part['percent'] >= 90 else "🟡" if part['percent'] >= 75 else "🟢"
+        lines.append(f"{mark} {part['mountpoint']} ({part['device']}): {part['percent']:.0f}%, "
+                     f"свободно {part['free'] / 1024 ** 3:.1f} из {part['total'] / 1024 ** 3:.1f} ГБ")
+    return "\n".join(lines) + _age(snapshot, 'disk')
+
+
+def format_net(snapshot) -> str:
+    if not snapshot.network:
+        return "⏳ Данные о сети ещё собираются"
+    lines = ["🌐 Интерфейсы (⬇ приём / ⬆ передача):"]
+    for nic, stats in sorted(snapshot.network.items(), key=lambda item: -item[1]['rx_rate'] - item[1]['tx_rate']):
+        line = f"{nic}: ⬇ {_rate(stats['rx_rate'])} / ⬆ {_rate(stats['tx_rate'])}"
+        if stats['errors'] or stats['drops']:
+            line += f" (ошибок {stats['errors']}, потерь {stats['drops']})"
+        lines.append(line)
+    return "\n".join(lines) + _age(snapshot, 'network')
+
+
+def format_health(snapshot) -> str:
+    if 'health' not in snapshot.sampled:
+        return "⏳ Данные SMART ещё собираются"
+    if not snapshot.health:
+        return "ℹ️ Диски для проверки SMART не найдены"
+    lines = ["🩺 Состояние дисков (SMART):"]
+    for device, health in snapshot.health.items():
+        if health is None:
+            lines.append(f"{device}: нет данных (нужен smartctl и права администратора)")
+            continue
+        details = [health.health_status]
+        if health.temperature is not None:
+            details.append(f"{health.temperature:.0f}°C")
+        if health.bad_sectors:
+            details.append(f"плохих секторов: {health.bad_sectors}")
+        if health.lifespan is not None:
+            details.append(f"ресурс {health.lifespan:.0f}%")
+        lines.append(f"{device} ({health.model}): {', '.join(details)}")
+    return "\n".join(lines) + _age(snapshot, 'health')
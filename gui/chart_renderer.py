@@ -0,0 +1,129 @@
+import io
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from metrics_history import lttb
+
+# Окна графиков для /chart: суффикс -> секунд в единице
+WINDOW_UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+
+# Ряды архива для метрик графика: метрика -> [(ряд, подпись, цвет)]
+CHART_SERIES = {
+    'system': [('cpu', 'CPU, %', 'tab:blue'), ('memory', 'Память, %', 'tab:red')],
+    'cpu': [('cpu', 'CPU, %', 'tab:blue')],
+    'memory': [('memory', 'Память, %', 'tab:red')],
+}
+
+
+def parse_window(text: str, default: int = 3600) -> int:
+    """'15m', '6h', '1d' -> секунды; некорректное значение - default"""
+    if text and text[-1] in WINDOW_UNITS and text[:-1].isdigit() and int(text[:-1]) > 0:
+        return int(text[:-1]) * WINDOW_UNITS[text[-1]]
+    return default
+
+
+def render_png(title: str, series, width: int = 800, height: int = 400) -> bytes:
+    """Рисует ряды [(подпись, цвет, времена, значения)] в PNG.
+
+    Выполняется в процессе-исполнителе: используется только Agg через
+    Figure/FigureCanvasAgg, без pyplot и без Qt.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.dates import DateFormatter
+    from datetime import datetime
+
+    dpi = 100
+    figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    for label, color, times, values in series:
+        ax.plot([datetime.fromtimestamp(t) for t in times], values, color=color, label=label, linewidth=1.2)
+    ax.set_title(title)
+    ax.set_ylim(0, 100)
+    ax.grid(True, alpha=0.3)
+    ax.xaxis.set_major_formatter(DateFormatter('%H:%M'))
+    if series:
+        ax.legend(loc='upper left')
+    figure.tight_layout()
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+class ChartRenderer:
+    """Графики истории CPU и памяти для сообщений бота.
+
+    Данные берутся из архива метрик и прореживаются LTTB до ширины
+    картинки, а сама отрисовка идёт в отдельном процессе (spawn, Agg),
+    так что ни GUI, ни потоки сбора не ждут matplotlib. Готовые PNG
+    кэшируются по (метрика, окно) на ttl секунд: серия одинаковых
+    запросов обходится одной отрисовкой.
+    """
+
+    def __init__(self, archive, ttl: float = 60.0, width: int = 800, timeout: float = 30.0):
+        self.archive = archive
+        self.ttl = ttl
+        self.width = width
+        self.timeout = timeout
+        self._cache = {}  # {(метрика, окно): (время, png)}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: форк процесса с потоками Qt и сбора небезопасен
+                self._executor = ProcessPoolExecutor(max_workers=1,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def render(self, metric: str = 'system', window: int = 3600):
+        """PNG графика или None, если данных нет или отрисовка не удалась.
+        Блокирует вызывающий (фоновый) поток до готовности картинки"""
+        if self.archive is None or metric not in CHART_SERIES:
+            return None
+        key = (metric, window)
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and now - cached[0] < self.ttl:
+                return cached[1]
+
+        series = []
+        for name, label, color in CHART_SERIES[metric]:
+            times, values = self.archive.query(name, now - window, now)
+            if len(times):
+                times, values = lttb(times, values, self.width)
+                series.append((label, color, times.tolist(), values.tolist()))
+        if not series:
+            return None
+
+        title = f"{' и '.join(label for label, *_ in series)} за {self.describe_window(window)}"
+        try:
+            png = self._pool().submit(render_png, title, series, self.width).result(timeout=self.timeout)
+        except Exception as e:
+            print(f"Ошибка отрисовки графика: {e}")
+            return None
+
+        with self._lock:
+            # Устаревшие картинки выбрасываются при каждой новой отрисовке
+            self._cache = {k: v for k, v in self._cache.items() if now - v[0] < self.ttl}
+            self._cache[key] = (now, png)
+        return png
+
+    @staticmethod
+    def describe_window(window: int) -> str:
+        for unit, label in (('d', 'сут.'), ('h', 'ч'), ('m', 'мин')):
+            if window % WINDOW_UNITS[unit] == 0:
+                return f"{window // WINDOW_UNITS[unit]} {label}"
+        return f"{window} с"
@@ -0,0 +1,194 @@
+import time
+import numpy as np
+from PyQt5.QtWidgets import QWidget, QToolTip
+from PyQt5.QtGui import QImage, QPainter, QColor
+from PyQt5.QtCore import Qt
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+
+class LiveChart(FigureCanvas):
+    """Лёгкий график реального времени на блиттинге.
+
+    Оси, сетка и заголовок рисуются один раз и кэшируются как фон;
+    на каждом кадре восстанавливается фон и перерисовываются только
+    линия и подпись текущего значения.
+    """
+
+    def __init__(self, title: str, color: str = 'b-', capacity: int = 60,
+                 ylim=(0, 100), figsize=(6, 3)):
+        self.figure = Figure(figsize=figsize)
+        super().__init__(self.figure)
+        self.capacity = capacity
+
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_title(title)
+        self.ax.set_ylim(*ylim)
+        self.ax.set_xlim(0, capacity)
+        self.ax.grid(True)
+
+        # Анимированные артисты не попадают в кэшированный фон
+        self.line, = self.ax.plot([], [], color, animated=True)
+        self.value_text = self.ax.text(0.98, 0.95, '', transform=self.ax.transAxes,
+                                       ha='right', va='top', animated=True)
+
+        self._background = None
+        self.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        """Полная перерисовка (первый показ, resize): обновляем кэш фона"""
+        self._background = self.copy_from_bbox(self.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        self.ax.draw_artist(self.line)
+        self.ax.draw_artist(self.value_text)
+
+    def set_xlim(self, xmin: float, xmax: float):
+        """Смена диапазона оси X требует полной перерисовки и нового фона"""
+        self.ax.set_xlim(xmin, xmax)
+        self._background = None
+
+    def set_ylim(self, ymin: float, ymax: float):
+        """Смена диапазона оси Y, как и X, сбрасывает кэш фона"""
+        if self.ax.get_ylim() != (ymin, ymax):
+            self.ax.set_ylim(ymin, ymax)
+            self._background = None
+
+    def pixel_width(self) -> int:
+        """Ширина области данных в пикселях - столько точек имеет смысл рисовать"""
+        return max(int(self.ax.bbox.width), 2)
+
+    def set_data(self, xdata, ydata, label: str = ''):
+        """Обновляет линию и подпись, перерисовывая только их"""
+        self.line.set_data(xdata, ydata)
+        self.value_text.set_text(label)
+
+        if self._background is None:
+            # Фон ещё не закэширован - нужна одна полная отрисовка
+            self.draw()
+            return
+
+        self.restore_region(self._background)
+        self._draw_animated()
+        self.blit(self.ax.bbox)
+
+
+class CoreHeatStrip(QWidget):
+    """Тепловая полоса загрузки ядер.
+
+    Значения переводятся в цвета через таблицу и рисуются одной QImage,
+    масштабируемой на виджет, поэтому стоимость кадра не зависит от
+    числа ядер. Если ядер больше, чем помещается в ширину, полоса
+    переносится на несколько строк.
+    """
+
+    MIN_CELL_WIDTH = 6
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(24)
+        self.setMouseTracking(True)
+        self.values = np.zeros(0)
+        self._image = None
+        self._columns = 1
+        self._lut = self._build_lut()
+        self._empty_color = QColor(Qt.lightGray).rgb()
+
+    @staticmethod
+    def _build_lut() -> np.ndarray:
+        """Палитра 0..100%: зелёный -> жёлтый -> красный (ARGB32)"""
+        level = np.linspace(0.0, 1.0, 101)
+        red = np.clip(level * 2, 0, 1) * 255
+        green = np.clip((1 - level) * 2, 0, 1) * 200
+        return (0xFF000000 | (red.astype(np.uint32) << 16) | (green.astype(np.uint32) << 8)).astype(np.uint32)
+
+    def set_values(self, values):
+        """Загрузка ядер в процентах"""
+        self.values = np.asarray(values, dtype=np.float64)
+        self._rebuild_image()
+        self.update()
+
+    def _rebuild_image(self):
+        count = len(self.values)
+        if not count:
+            self._image = None
+            return
+        self._columns = max(1, min(count, self.width() // self.MIN_CELL_WIDTH))
+        rows = -(-count // self._columns)
+
+        pixels = np.full(rows * self._columns, self._empty_color, dtype=np.uint32)
+        indexes = np.clip(np.nan_to_num(self.values), 0, 100).astype(np.intp)
+        pixels[:count] = self._lut[indexes]
+        self._pixels = pixels.reshape(rows, self._columns)
+        # QImage не копирует буфер - держим ссылку в self._pixels
+        self._image = QImage(self._pixels.data, self._columns, rows,
+                             self._columns * 4, QImage.Format_RGB32)
+
+    def resizeEvent(self, event):
+        self._rebuild_image()
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        if self._image is None:
+            return
+        painter = QPainter(self)
+        painter.drawImage(self.rect(), self._image)
+        painter.end()
+
+    def mouseMoveEvent(self, event):
+        if self._image is None:
+            return
+        rows = self._image.height()
+        column = event.x() * self._columns // max(self.width(), 1)
+        row = event.y() * rows // max(self.height(), 1)
+        core = row * self._columns + column
+        if 0 <= core < len(self.values):
+            QToolTip.showText(event.globalPos(), f"CPU {core}: {self.values[core]:.1f}%", self)
+
+
+def benchmark(frames: int = 200):
+    """Сравнение времени кадра: полная отрисовка canvas.draw() против блиттинга"""
+    import random
+    import sys
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    chart = LiveChart('Benchmark', capacity=60)
+    chart.resize(600, 300)
+    chart.show()
+    chart.draw()
+    app.processEvents()
+
+    data = [random.uniform(0, 100) for _ in range(60)]
+    xs = list(range(len(data)))
+
+    start = time.perf_counter()
+    for i in range(frames):
+        data[i % 60] = random.uniform(0, 100)
+        chart.ax.set_title(f'Benchmark: {data[i % 60]:.1f}%')
+        chart.line.set_animated(False)
+        chart.line.set_data(xs, data)
+        chart.draw()
+        app.processEvents()
+    full_ms = (time.perf_counter() - start) * 1000 / frames
+
+    chart.line.set_animated(True)
+    chart.ax.set_title('Benchmark')
+    chart.draw()
+    app.processEvents()
+
+    start = time.perf_counter()
+    for i in range(frames):
+        data[i % 60] = random.uniform(0, 100)
+        chart.set_data(xs, data, f'{data[i % 60]:.1f}%')
+        app.processEvents()
+    blit_ms = (time.perf_counter() - start) * 1000 / frames
+
+    print(f"canvas.draw(): {full_ms:.2f} мс/кадр")
+    print(f"blit:          {blit_ms:.2f} мс/кадр ({full_ms / blit_ms:.1f}x быстрее)")
+    return full_ms, blit_ms
+
+
+if __name__ == "__main__":
+    benchmark()
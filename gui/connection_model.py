@@ -0,0 +1,44 @@
+from process_model import DiffTableModel
+
+
+class ConnectionTableModel(DiffTableModel):
+    """Таблица сокетов из снимка ConnectionCollector.
+
+    Строка - сам Connection; сопоставляются строки по протоколу, адресам
+    и inode. Неизменившиеся сокеты сравниваются одним сравнением
+    кортежей, так что обновление раз в секунду остаётся дешёвым и на
+    сотнях тысяч соединений. Столбцы tcp_info пусты, если данные собраны
+    без sock_diag.
+    """
+
+    COLUMNS = ("Protocol", "Local Address", "Remote Address", "Status", "PID", "Process",
+               "Send-Q", "Recv-Q", "RTT, ms", "Retrans", "Cwnd", "Bytes Acked", "Bytes Received")
+    RTT_COLUMN = 8
+
+    @staticmethod
+    def row_key(row):
+        return row[0], row[1], row[2], row[13]
+
+    @staticmethod
+    def _same(row, new):
+        return tuple(row) == new
+
+    @staticmethod
+    def format_value(column, value):
+        if value is None or (column == 4 and not value):
+            return ""
+        if column == ConnectionTableModel.RTT_COLUMN:
+            return f"{value:.2f}"
+        return str(value)
+
+    @staticmethod
+    def sort_value(column, value):
+        if value is None:
+            # Без tcp_info - ниже любых чисел
+            return -1 if column >= ConnectionTableModel.RTT_COLUMN else ""
+        return value
+
+    def connection_at(self, row: int):
+        """(протокол, локальный адрес, удалённый адрес, PID) в строке исходной модели"""
+        protocol, local, remote, _, pid = self._rows[row][:5]
+        return protocol, local, remote, pid
@@ -0,0 +1,56 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def cooldown_key(mode: str, name: str, cmdline_hash: int, cgroup: str) -> str:
+    """Ключ кулдауна, не зависящий от PID: перезапуск сервиса - тот же ключ.
+    mode - 'name', 'cmdline' (хэш командной строки) или 'cgroup'"""
+    if mode == 'cmdline':
+        return f"cmd:{cmdline_hash:08x}"
+    if mode == 'cgroup' and cgroup:
+        return f"cg:{cgroup}"
+    return f"name:{name}"
+
+
+class CooldownStore:
+    """Время последних уведомлений с истечением по TTL и вытеснением LRU.
+
+    Записи лежат в OrderedDict в порядке последнего уведомления, поэтому
+    самые старые всегда в начале: истёкшие снимаются с головы за
+    амортизированное O(1) на событие, а при превышении max_size
+    вытесняется самая давняя запись.
+    """
+
+    def __init__(self, ttl: float = 3600, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # {ключ: время уведомления}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def allow(self, key: str, now: float = None) -> bool:
+        """True, если по ключу можно уведомлять; тогда время запоминается"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._expire(now)
+            if key in self._entries:
+                return False
+            self._entries[key] = now
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return True
+
+    def _expire(self, now: float):
+        entries = self._entries
+        while entries:
+            key, notified = next(iter(entries.items()))
+            if now - notified <= self.ttl:
+                break
+            del entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,141 @@
+import os
+import time
+import psutil
+import numpy as np
+
+# Колонки строк cpuN в /proc/stat (в тиках USER_HZ)
+CPU_FIELDS = ('user', 'nice', 'system', 'idle', 'iowait',
+              'irq', 'softirq', 'steal', 'guest', 'guest_nice')
+USER, NICE, SYSTEM, IDLE, IOWAIT, IRQ, SOFTIRQ, STEAL, GUEST, GUEST_NICE = range(len(CPU_FIELDS))
+
+
+class CpuStatsCollector:
+    """Поядерная статистика CPU за один проход по /proc/stat за тик.
+
+    Проценты считаются векторно по разнице счётчиков между вызовами
+    collect(); на системах без /proc используется psutil.
+    """
+
+    # Частота меняется медленно, а её чтение не бесплатно
+    FREQ_REFRESH = 5.0
+
+    def __init__(self, proc_stat: str = '/proc/stat', cpuinfo: str = '/proc/cpuinfo'):
+        self.proc_stat = proc_stat
+        self.cpuinfo = cpuinfo
+        self.use_proc = os.path.exists(proc_stat)
+        self._freq = None
+        self._freq_time = 0.0
+        self._prev = self._read_counters()
+
+    def _read_counters(self):
+        """Returns (timestamp, per-core times array, ctxt, intr)"""
+        if self.use_proc:
+            return self._read_proc_stat()
+        return self._read_psutil()
+
+    def _read_proc_stat(self):
+        with open(self.proc_stat, 'rb') as f:
+            data = f.read()
+        now = time.monotonic()
+
+        rows = []
+        ctxt = intr = 0
+        for line in data.split(b'\n'):
+            if line.startswith(b'cpu'):
+                # Первая строка "cpu " - агрегат, его считаем сами
+                if line[3:4] == b' ':
+                    continue
+                values = line.split()[1:len(CPU_FIELDS) + 1]
+                # Старые ядра отдают меньше колонок
+                values += [b'0'] * (len(CPU_FIELDS) - len(values))
+                rows.append(values)
+            elif line.startswith(b'ctxt '):
+                ctxt = int(line.split()[1])
+            elif line.startswith(b'intr '):
+                intr = int(line.split(None, 2)[1])
+
+        return now, np.array(rows, dtype=np.float64), ctxt, intr
+
+    @staticmethod
+    def _read_psutil():
+        now = time.monotonic()
+        times = np.array([[getattr(core, field, 0.0) for field in CPU_FIELDS]
+                          for core in psutil.cpu_times(percpu=True)], dtype=np.float64)
+        stats = psutil.cpu_stats()
+        return now, times, stats.ctx_switches, stats.interrupts
+
+    def _read_frequency(self, cores: int):
+        """Per-core frequency in MHz; refreshed every FREQ_REFRESH seconds"""
+        now = time.monotonic()
+        if self._freq is not None and len(self._freq) == cores and now - self._freq_time < self.FREQ_REFRESH:
+            return self._freq
+
+        freq = None
+        try:
+            # Один файл на все ядра вместо cpufreq/scaling_cur_freq на каждое
+            with open(self.cpuinfo, 'rb') as f:
+                mhz = [float(line.split(b':')[1]) for line in f if line.startswith(b'cpu MHz')]
+            if len(mhz) == cores:
+                freq = np.array(mhz)
+        except (OSError, ValueError, IndexError):
+            pass
+
+        if freq is None:
+            try:
+                per_core = psutil.cpu_freq(percpu=True) or []
+                if len(per_core) == cores:
+                    freq = np.array([f.current for f in per_core])
+            except (AttributeError, NotImplementedError, OSError):
+                pass
+
+        self._freq = freq
+        self._freq_time = now
+        return freq
+
+    @staticmethod
+    def _load_average():
+        try:
+            return os.getloadavg()
+        except (AttributeError, OSError):
+            return psutil.getloadavg()
+
+    def collect(self) -> dict:
+        """Collect per-core usage since the previous call"""
+        current = self._read_counters()
+        prev_time, prev_times, prev_ctxt, prev_intr = self._prev
+        now, times, ctxt, intr = current
+        self._prev = current
+
+        cores = len(times)
+        if prev_times.shape != times.shape:
+            # Ядро ушло в offline/online - сравнивать не с чем
+            prev_times = times
+
+        delta = np.maximum(times - prev_times, 0.0)
+        # guest уже учтён в user/nice
+        total = delta.sum(axis=1) - delta[:, GUEST] - delta[:, GUEST_NICE]
+        safe_total = np.where(total > 0, total, 1.0)
+
+        def percent(columns):
+            return np.round(delta[:, columns].sum(axis=1) * 100.0 / safe_total, 1)
+
+        idle = percent([IDLE, IOWAIT])
+        busy = np.where(total > 0, 100.0 - idle, 0.0)
+        overall = total.sum()
+        idle_ticks = delta[:, IDLE].sum() + delta[:, IOWAIT].sum()
+        total_percent = round(float(100.0 - idle_ticks * 100.0 / overall), 1) if overall > 0 else 0.0
+
+        elapsed = max(now - prev_time, 1e-6)
+        return {
+            'cores': cores,
+            'usage_percent': total_percent,
+            'busy': busy,
+            'user': percent([USER, NICE]),
+            'system': percent([SYSTEM, IRQ, SOFTIRQ]),
+            'iowait': percent([IOWAIT]),
+            'steal': percent([STEAL]),
+            'freq_mhz': self._read_frequency(cores),
+            'load_avg': self._load_average(),
+            'ctx_switches_per_sec': max(ctxt - prev_ctxt, 0) / elapsed,
+            'interrupts_per_sec': max(intr - prev_intr, 0) / elapsed
+        }
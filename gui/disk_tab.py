@@ -171,6 +171,16 @@ class DiskTab(QWidget):
             self.monitor_btn.setText("Мониторить здоровье")
             self.health_timer.stop()
 
+    def set_tab_active(self, active: bool):
+        """Мониторинг здоровья опрашивает smartctl только пока вкладка видна"""
+        if not self.monitor_btn.isChecked():
+            return
+        if active:
+            self.update_health_info()
+            self.health_timer.start(5000)
+        else:
+            self.health_timer.stop()
+
     def update_health_info(self):
         if self.current_disk:
             self.show_health_info(self.current_disk)
@@ -0,0 +1,309 @@
+import asyncio
+import errno
+import ipaddress
+import itertools
+import math
+import os
+import socket
+import struct
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMP_DEST_UNREACHABLE = 3
+ICMP_TIME_EXCEEDED = 11
+ICMP_HEADER = struct.Struct('!BBHHH')  # тип, код, контрольная сумма, идентификатор, номер
+# Ошибки ICMP для сокета датаграмм приходят в очередь ошибок (IP_RECVERR)
+IP_RECVERR = getattr(socket, 'IP_RECVERR', 11)
+SO_EE_ORIGIN_ICMP = 2
+EXTENDED_ERR = struct.Struct('=IBBBBII')  # struct sock_extended_err, за ним адрес отправителя
+PAYLOAD = b'system-monitor-ping'.ljust(32, b'\0')
+RECEIVE_BUFFER = 4 * 1024 * 1024
+
+
+def checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def ping_stats(rtts: List[Optional[float]]) -> Dict:
+    """Статистика в формате NetworkDiagnostics._parse_ping по списку RTT
+    в мс (None - ответа не было); mdev считается как у iputils ping"""
+    received = [rtt for rtt in rtts if rtt is not None]
+    stats = {
+        'packets_sent': len(rtts),
+        'packets_received': len(received),
+        'packet_loss': round(100 * (len(rtts) - len(received)) / len(rtts)) if rtts else 0
+    }
+    if received:
+        mean = sum(received) / len(received)
+        stats['rtt_min'] = min(received)
+        stats['rtt_avg'] = mean
+        stats['rtt_max'] = max(received)
+        stats['rtt_mdev'] = math.sqrt(max(0.0, sum(rtt * rtt for rtt in received) / len(received) - mean * mean))
+    return stats
+
+
+class IPv6NotSupported(OSError):
+    """Цель доступна только по IPv6, а движок работает с ICMP для IPv4"""
+
+    def __init__(self, target: str):
+        super().__init__(errno.EAFNOSUPPORT, f"IPv6 is not supported by the native ICMP engine: {target}")
+
+
+class IcmpReply(NamedTuple):
+    rtt: float      # мс
+    responder: str  # кто ответил: сам адрес или маршрутизатор по пути
+    kind: int       # ICMP_ECHO_REPLY, ICMP_TIME_EXCEEDED или ICMP_DEST_UNREACHABLE
+
+
+def icmp_available() -> bool:
+    """Можно ли открыть ICMP-сокет (датаграмм или сырой)"""
+    for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP).close()
+            return True
+        except OSError:
+            continue
+    return False
+
+
+class IcmpPinger:
+    """ICMP echo без запуска системного ping, на asyncio.
+
+    Используется непривилегированный ICMP-сокет датаграмм Linux
+    (SOCK_DGRAM/IPPROTO_ICMP, нужен net.ipv4.ping_group_range), а если он
+    недоступен - сырой сокет (root). Все запросы к любому числу хостов
+    идут через один сокет; ответы сопоставляются с ожидающими
+    запросами по (адрес, идентификатор, номер). Идентификатор сокета
+    датаграмм назначает ядро, у сырого - это младшие биты PID.
+
+    Запросу можно задать TTL (probe): тогда ответом будет time exceeded
+    от маршрутизатора на этом шаге. Сырой сокет получает такие ошибки
+    как обычные пакеты, сокет датаграмм - через очередь IP_RECVERR;
+    запрос в обоих случаях находится по вложенному исходному заголовку.
+
+    Только IPv4: цели, у которых есть лишь адреса IPv6, отклоняются с
+    IPv6NotSupported.
+    """
+
+    def __init__(self):
+        self.sock = None
+        self.raw = False
+        self.identifier = 0
+        self._sequence = itertools.count()
+        self._waiting = {}  # {(адрес, номер): (future, время отправки)}
+        self._loop = None
+        self._default_ttl = 64
+
+    def open(self):
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        except PermissionError:
+            # Без ping_group_range остаётся сырой сокет, для него нужен root
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            self.raw = True
+        self.sock.setblocking(False)
+        # Ответы на сотни одновременных запросов приходят пачкой
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+        if self.raw:
+            self.identifier = os.getpid() & 0xFFFF
+        else:
+            self.sock.bind(('', 0))
+            self.identifier = self.sock.getsockname()[1]
+            self.sock.setsockopt(socket.IPPROTO_IP, IP_RECVERR, 1)
+        self._default_ttl = self.sock.getsockopt(socket.IPPROTO_IP, socket.IP_TTL)
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self.sock.fileno(), self._on_readable)
+
+    def close(self):
+        if self.sock is None:
+            return
+        self._loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+        self.sock = None
+        for future, _ in self._waiting.values():
+            if not future.done():
+                future.cancel()
+        self._waiting.clear()
+
+    async def __aenter__(self):
+        self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def _on_readable(self):
+        if not self.raw:
+            self._read_errors()
+        # Ошибка из очереди IP_RECVERR один раз сообщается и обычному recv
+        for _ in range(64):
+            try:
+                data, (address, _) = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                continue
+            received = time.perf_counter()
+            if self.raw:
+                # Сырой сокет отдаёт пакет вместе с IP-заголовком
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < ICMP_HEADER.size:
+                continue
+            kind, _, _, identifier, sequence = ICMP_HEADER.unpack_from(data)
+            if kind == ICMP_ECHO_REPLY:
+                # Сырой сокет видит все ICMP хоста - чужие ответы отбрасываем
+                if not self.raw or identifier == self.identifier:
+                    self._resolve(address, sequence, IcmpReply(0.0, address, kind), received)
+            elif self.raw and kind in (ICMP_TIME_EXCEEDED, ICMP_DEST_UNREACHABLE):
+                # После заголовка ошибки - IP-заголовок и начало нашего запроса
+                inner = data[ICMP_HEADER.size:]
+                if len(inner) < 20 or len(inner) < (inner[0] & 0x0F) * 4 + ICMP_HEADER.size:
+                    continue
+                destination = socket.inet_ntoa(inner[16:20])
+                request, _, _, identifier, sequence = ICMP_HEADER.unpack_from(inner, (inner[0] & 0x0F) * 4)
+                if request == ICMP_ECHO_REQUEST and identifier == self.identifier:
+                    self._resolve(destination, sequence, IcmpReply(0.0, address, kind), received)
+
+    def _read_errors(self):
+        """Очередь ошибок сокета датаграмм: time exceeded и unreachable"""
+        while True:
+            try:
+                data, ancdata, _, (destination, _) = self.sock.recvmsg(2048, 512, socket.MSG_ERRQUEUE)
+            except OSError:
+                return
+            received = time.perf_counter()
+            if len(data) < ICMP_HEADER.size:
+                continue
+            sequence = ICMP_HEADER.unpack_from(data)[4]
+            for level, cmsg_type, cmsg in ancdata:
+                if level != socket.IPPROTO_IP or cmsg_type != IP_RECVERR or len(cmsg) < EXTENDED_ERR.size + 8:
+                    continue
+                _, origin, kind, _, _, _, _ = EXTENDED_ERR.unpack_from(cmsg)
+                if origin == SO_EE_ORIGIN_ICMP:
+                    # sockaddr_in отправителя ошибки: семейство, порт, адрес
+                    responder = socket.inet_ntoa(cmsg[EXTENDED_ERR.size + 4:EXTENDED_ERR.size + 8])
+                    self._resolve(destination, sequence, IcmpReply(0.0, responder, kind), received)
+
+    def _resolve(self, destination: str, sequence: int, reply: IcmpReply, received: float):
+        waiting = self._waiting.pop((destination, sequence), None)
+        if waiting and not waiting[0].done():
+            waiting[0].set_result(reply._replace(rtt=(received - waiting[1]) * 1000))
+
+    async def probe(self, address: str, timeout: float = 1.0, ttl: Optional[int] = None) -> Optional[IcmpReply]:
+        """Один echo-запрос на IPv4-адрес; ttl ограничивает число шагов.
+        Ответ от адреса или маршрутизатора, None - по таймауту"""
+        sequence = next(self._sequence) & 0xFFFF
+        header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, self.identifier, sequence)
+        packet = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, checksum(header + PAYLOAD),
+                                  self.identifier, sequence) + PAYLOAD
+        future = self._loop.create_future()
+        key = (address, sequence)
+        self._waiting[key] = (future, time.perf_counter())
+        try:
+            if ttl is None:
+                self.sock.sendto(packet, (address, 0))
+            else:
+                # Между установкой TTL и отправкой нет await - другие запросы не вклинятся
+                self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, ttl)
+                try:
+                    self.sock.sendto(packet, (address, 0))
+                finally:
+                    self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, self._default_ttl)
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, OSError):
+            return None
+        finally:
+            self._waiting.pop(key, None)
+
+    async def ping_once(self, address: str, timeout: float = 1.0) -> Optional[float]:
+        """RTT в мс до IPv4-адреса или None по таймауту (или недоступности)"""
+        reply = await self.probe(address, timeout)
+        return reply.rtt if reply is not None and reply.kind == ICMP_ECHO_REPLY else None
+
+    async def resolve(self, host: str) -> str:
+        """IPv4-адрес хоста; IP-адрес возвращается без обращения к DNS"""
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            pass
+        else:
+            if address.version != 4:
+                raise IPv6NotSupported(host)
+            return str(address)
+
+        infos = await self._loop.getaddrinfo(host, None, type=socket.SOCK_DGRAM)
+        for family, _, _, _, sockaddr in infos:
+            if family == socket.AF_INET:
+                return sockaddr[0]
+        raise IPv6NotSupported(host)
+
+    async def ping(self, host: str, count: int = 4, interval: float = 0.2,
+                   timeout: float = 1.0) -> Dict:
+        """count запросов с шагом interval; статистика как у _parse_ping"""
+        address = await self.resolve(host)
+        probes = []
+        for index in range(count):
+            if index:
+                await asyncio.sleep(interval)
+            # Следующий запрос не ждёт ответа на предыдущий
+            probes.append(asyncio.ensure_future(self.ping_once(address, timeout)))
+        stats = ping_stats(await asyncio.gather(*probes))
+        stats['address'] = address
+        return stats
+
+    async def sweep(self, network: str, count: int = 1, timeout: float = 1.0,
+                    concurrency: int = 256) -> Dict[str, Dict]:
+        """Пинг всех адресов сети CIDR (например, '192.168.1.0/24');
+        одновременно в полёте не больше concurrency адресов"""
+        limit = asyncio.Semaphore(concurrency)
+
+        async def probe(address):
+            async with limit:
+                return address, await self.ping(address, count, interval=0.1, timeout=timeout)
+
+        hosts = ipaddress.ip_network(network, strict=False)
+        if hosts.version != 4:
+            raise IPv6NotSupported(network)
+        addresses = [str(address) for address in (hosts.hosts() if hosts.num_addresses > 2 else hosts)]
+        return dict(await asyncio.gather(*(probe(address) for address in addresses)))
+
+
+def benchmark(network: str = '127.0.0.0/24'):
+    """Время опроса подсети нативным движком против запуска ping на хост"""
+    import shutil
+    import subprocess
+
+    async def native():
+        async with IcmpPinger() as pinger:
+            return await pinger.sweep(network, count=1)
+
+    start = time.perf_counter()
+    results = asyncio.run(native())
+    native_s = time.perf_counter() - start
+    alive = sum(1 for stats in results.values() if stats['packets_received'])
+
+    print(f"Адресов: {len(results)}, отвечают: {alive}")
+    print(f"IcmpPinger: {native_s:.2f} с")
+    if not shutil.which('ping'):
+        return native_s, None
+
+    sample = list(results)[:16]
+    start = time.perf_counter()
+    for address in sample:
+        subprocess.run(['ping', '-c', '1', '-W', '1', address], stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+    forked_s = (time.perf_counter() - start) / len(sample) * len(results)
+
+    print(f"ping на каждый адрес (оценка): {forked_s:.2f} с")
+    return native_s, forked_s
+
+
+if __name__ == "__main__":
+    benchmark()
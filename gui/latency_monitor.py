@@ -0,0 +1,316 @@
+import asyncio
+import socket
+import threading
+import time
+
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from icmp_ping import IcmpPinger
+
+# Окна статистики: подпись -> секунд
+LATENCY_WINDOWS = {'1m': 60, '5m': 300, '10m': 600}
+
+
+class LatencyHistogram:
+    """Гистограммы задержек в скользящем окне при постоянной памяти.
+
+    Корзины логарифмические в стиле HDR Histogram: до 64 мкс по
+    корзине на микросекунду, дальше каждая октава делится на 32 равные
+    части, так что относительная ошибка квантиля не превышает ~1.6%
+    на всём диапазоне до max_ms. Время разбито на slots кадров по
+    slot_seconds; кадр - строка матрицы счётчиков, кольцо кадров
+    переиспользуется, и память не зависит от длительности наблюдения.
+    Окно - сумма последних кадров, квантили - поиск по накопленной сумме.
+    """
+
+    SUB_BITS = 5
+    SUB_COUNT = 1 << SUB_BITS  # корзин на октаву
+
+    def __init__(self, slot_seconds: float = 10.0, slots: int = 60, max_ms: float = 60000.0):
+        self.slot_seconds = slot_seconds
+        self.slots = slots
+        self.max_us = int(max_ms * 1000)
+        self.bucket_count = self.bucket_index(self.max_us) + 1
+        self.counts = np.zeros((slots, self.bucket_count), dtype=np.uint32)
+        self.sent = np.zeros(slots, dtype=np.int64)
+        self.received = np.zeros(slots, dtype=np.int64)
+        self.jitter_sum = np.zeros(slots, dtype=np.float64)  # сумма |RTT - предыдущий RTT|, мс
+        self.jitter_count = np.zeros(slots, dtype=np.int64)
+        self.slot_ids = np.full(slots, -1, dtype=np.int64)  # номер кадра в строке, -1 - пусто
+        self.last_rtt = None
+        # Середины корзин в мс - значение квантиля
+        bounds = np.array([self.bucket_lower(i) for i in range(self.bucket_count + 1)], dtype=np.float64)
+        self.midpoints = (bounds[:-1] + bounds[1:]) / 2000.0
+
+    @classmethod
+    def bucket_index(cls, us: int) -> int:
+        if us < 2 * cls.SUB_COUNT:
+            return us
+        shift = us.bit_length() - cls.SUB_BITS - 1
+        return 2 * cls.SUB_COUNT + (shift - 1) * cls.SUB_COUNT + (us >> shift) - cls.SUB_COUNT
+
+    @classmethod
+    def bucket_lower(cls, index: int) -> int:
+        """Нижняя граница корзины в мкс"""
+        if index < 2 * cls.SUB_COUNT:
+            return index
+        shift, sub = divmod(index - 2 * cls.SUB_COUNT, cls.SUB_COUNT)
+        return (sub + cls.SUB_COUNT) << (shift + 1)
+
+    def memory_bytes(self) -> int:
+        return sum(array.nbytes for array in (self.counts, self.sent, self.received, self.jitter_sum,
+                                              self.jitter_count, self.slot_ids, self.midpoints))
+
+    def _row(self, timestamp: float) -> int:
+        slot_id = int(timestamp // self.slot_seconds)
+        row = slot_id % self.slots
+        if self.slot_ids[row] != slot_id:
+            # Строка кольца досталась новому кадру - старые данные вне окна
+            self.counts[row] = 0
+            self.sent[row] = self.received[row] = self.jitter_count[row] = 0
+            self.jitter_sum[row] = 0.0
+            self.slot_ids[row] = slot_id
+        return row
+
+    def record(self, timestamp: float, rtt_ms):
+        """Результат одной пробы: RTT в мс или None - ответа не было"""
+        row = self._row(timestamp)
+        self.sent[row] += 1
+        if rtt_ms is None:
+            return
+        self.received[row] += 1
+        us = min(max(int(rtt_ms * 1000), 0), self.max_us)
+        self.counts[row, self.bucket_index(us)] += 1
+        if self.last_rtt is not None:
+            self.jitter_sum[row] += abs(rtt_ms - self.last_rtt)
+            self.jitter_count[row] += 1
+        self.last_rtt = rtt_ms
+
+    def window(self, seconds: float, now: float, offset: float = 0.0):
+        """Маска строк кадров в интервале [now - offset - seconds, now - offset)"""
+        last = int((now - offset) // self.slot_seconds)
+        first = last - max(1, round(seconds / self.slot_seconds)) + 1
+        return (self.slot_ids >= first) & (self.slot_ids <= last)
+
+    def stats(self, seconds: float, now: float, offset: float = 0.0) -> dict:
+        """Квантили, джиттер и потери за окно; задержки в мс, потери в %"""
+        rows = self.window(seconds, now, offset)
+        sent = int(self.sent[rows].sum())
+        received = int(self.received[rows].sum())
+        stats = {
+            'sent': sent,
+            'received': received,
+            'loss': 100.0 * (sent - received) / sent if sent else 0.0,
+        }
+        if received:
+            cumulative = np.cumsum(self.counts[rows].sum(axis=0, dtype=np.int64))
+            for name, q in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+                index = int(np.searchsorted(cumulative, q * received))
+                stats[name] = float(self.midpoints[min(index, self.bucket_count - 1)])
+            jitter_count = int(self.jitter_count[rows].sum())
+            stats['jitter'] = float(self.jitter_sum[rows].sum() / jitter_count) if jitter_count else 0.0
+        return stats
+
+
+class LatencyMonitor(QObject):
+    """Непрерывный ICMP-пинг списка целей в фоновом потоке asyncio.
+
+    Каждая цель опрашивается раз в interval секунд одним сокетом
+    IcmpPinger, результаты копятся в LatencyHistogram. Раз в
+    report_interval секунд stats_ready получает статистику всех целей по
+    окнам LATENCY_WINDOWS. Регрессия - p95 за последнюю минуту выше базы
+    (p95 за предыдущие минуты окна) в factor раз и не меньше чем на
+    min_delta_ms, либо потери за минуту от loss_threshold %; regression
+    приходит один раз на эпизод, повтор - только после восстановления.
+    """
+
+    stats_ready = pyqtSignal(dict)     # {цель: {'address': ..., 'regressed': ..., окно: статистика}}
+    regression = pyqtSignal(str, str)  # цель, описание
+    error = pyqtSignal(str, str)       # цель, ошибка
+
+    SHORT_WINDOW = 60
+    MIN_BASELINE = 30  # ответов в базе, без которых регрессию не ищем
+    MIN_SHORT = 10
+
+    def __init__(self, parent=None, interval: float = 1.0, timeout: float = 2.0,
+                 report_interval: float = 1.0, factor: float = 1.5, min_delta_ms: float = 5.0,
+                 loss_threshold: float = 20.0):
+        super().__init__(parent)
+        self.interval = interval
+        self.timeout = timeout
+        self.report_interval = report_interval
+        self.factor = factor
+        self.min_delta_ms = min_delta_ms
+        self.loss_threshold = loss_threshold
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._pinger = None
+        self._targets = {}  # {цель: [задача, адрес, гистограмма, регрессия]}; только в потоке цикла
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, name="latency-monitor", daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._shutdown)
+        self._thread.join(5)
+        self._thread = None
+        self._loop = None
+
+    def add_target(self, host: str):
+        self.start()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._add, host)
+
+    def remove_target(self, host: str):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._remove, host)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        self._pinger = IcmpPinger()
+        try:
+            self._pinger.open()
+        except OSError as e:
+            self._pinger = None
+            self.error.emit('', f"ICMP socket unavailable: {e}")
+        self._stopping = asyncio.Event()
+        self._ready.set()
+        reporter = asyncio.ensure_future(self._report())
+        await self._stopping.wait()
+        reporter.cancel()
+        for task, *_ in self._targets.values():
+            task.cancel()
+        await asyncio.gather(reporter, *(task for task, *_ in self._targets.values()),
+                             return_exceptions=True)
+        self._targets.clear()
+        if self._pinger is not None:
+            self._pinger.close()
+
+    def _shutdown(self):
+        self._stopping.set()
+
+    def _add(self, host: str):
+        if self._pinger is None:
+            self.error.emit(host, "ICMP socket unavailable")
+            return
+        if host in self._targets:
+            return
+        state = [None, None, LatencyHistogram(), False]
+        state[0] = asyncio.ensure_future(self._probe(host, state))
+        self._targets[host] = state
+
+    def _remove(self, host: str):
+        state = self._targets.pop(host, None)
+        if state is not None:
+            state[0].cancel()
+
+    async def _probe(self, host: str, state):
+        try:
+            state[1] = await self._pinger.resolve(host)
+        except (OSError, socket.gaierror) as e:
+            self._targets.pop(host, None)
+            self.error.emit(host, str(e))
+            return
+
+        histogram = state[2]
+        probes = set()
+
+        async def probe():
+            sent = time.time()
+            # Запись по времени отправки: проба попадает в тот кадр, где была отправлена
+            histogram.record(sent, await self._pinger.ping_once(state[1], self.timeout))
+
+        try:
+            # Шаг задаёт отправка, ответ не ждём - медленная цель не сбивает частоту
+            next_at = time.monotonic()
+            while True:
+                task = asyncio.ensure_future(probe())
+                probes.add(task)
+                task.add_done_callback(probes.discard)
+                next_at += self.interval
+                await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+        finally:
+            for task in probes:
+                task.cancel()
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            now = time.time()
+            report = {}
+            for host, state in self._targets.items():
+                if state[1] is None:
+                    continue
+                histogram = state[2]
+                entry = {name: histogram.stats(seconds, now) for name, seconds in LATENCY_WINDOWS.items()}
+                message = self._check_regression(histogram, now)
+                if message and not state[3]:
+                    self.regression.emit(host, message)
+                state[3] = message is not None
+                entry['address'] = state[1]
+                entry['regressed'] = state[3]
+                report[host] = entry
+            self.stats_ready.emit(report)
+
+    def _check_regression(self, histogram: LatencyHistogram, now: float):
+        """Описание регрессии за последнюю минуту или None"""
+        short = histogram.stats(self.SHORT_WINDOW, now)
+        longest = max(LATENCY_WINDOWS.values())
+        base = histogram.stats(longest - self.SHORT_WINDOW, now, offset=self.SHORT_WINDOW)
+
+        if short['sent'] >= self.MIN_SHORT and short['loss'] >= self.loss_threshold \
+                and base['loss'] < self.loss_threshold:
+            return f"packet loss {short['loss']:.0f}% over the last minute (baseline {base['loss']:.0f}%)"
+        if short['received'] < self.MIN_SHORT or base['received'] < self.MIN_BASELINE:
+            return None
+        if short['p95'] > max(base['p95'] * self.factor, base['p95'] + self.min_delta_ms):
+            return (f"p95 latency {short['p95']:.1f} ms over the last minute "
+                    f"(baseline {base['p95']:.1f} ms, p99 {short['p99']:.1f} ms)")
+        return None
+
+
+def benchmark(samples: int = 1_000_000):
+    """Скорость записи и точность квантилей против точного расчёта"""
+    rng = np.random.default_rng(1)
+    rtts = rng.lognormal(mean=3.0, sigma=0.6, size=samples)  # ~20 мс с хвостом
+    histogram = LatencyHistogram(slot_seconds=10, slots=60)
+    now = time.time()
+    # Все пробы в одном окне: 10 минут по samples / 600 проб в секунду
+    times = now - 599 + np.arange(samples) * (599 / samples)
+
+    start = time.perf_counter()
+    for timestamp, rtt in zip(times.tolist(), rtts.tolist()):
+        histogram.record(timestamp, rtt)
+    record_us = (time.perf_counter() - start) / samples * 1e6
+
+    start = time.perf_counter()
+    stats = histogram.stats(600, now)
+    stats_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Запись: {record_us:.2f} мкс/проба, окно 10 мин: {stats_ms:.2f} мс, "
+          f"память на цель: {histogram.memory_bytes() / 1024:.0f} КБ")
+    for name, q in (('p50', 50), ('p95', 95), ('p99', 99)):
+        exact = float(np.percentile(rtts, q))
+        print(f"{name}: {stats[name]:.3f} мс (точно {exact:.3f}, ошибка {abs(stats[name] / exact - 1):.2%})")
+    return stats
+
+
+if __name__ == "__main__":
+    benchmark()
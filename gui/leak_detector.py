@@ -0,0 +1,130 @@
+import threading
+from dataclasses import dataclass
+
+
+@dataclass
+class LeakInfo:
+    pid: int
+    slope_mb_per_min: float  # наклон линейной регрессии RSS по времени
+    growth_score: float      # доля шагов окна, на которых память росла
+    growth_mb: float         # прирост за окно
+
+
+class _Series:
+    """Скользящее окно одного процесса с накопленными суммами регрессии"""
+
+    __slots__ = ('times', 'values', 'ups', 'head', 'count', 'origin',
+                 'sum_t', 'sum_y', 'sum_tt', 'sum_ty', 'up_count', 'last', 'flagged')
+
+    def __init__(self, size: int, origin: float):
+        self.times = [0.0] * size
+        self.values = [0.0] * size
+        self.ups = [0] * size
+        self.head = 0
+        self.count = 0
+        self.origin = origin  # смещение времени, чтобы суммы оставались небольшими
+        self.sum_t = self.sum_y = self.sum_tt = self.sum_ty = 0.0
+        self.up_count = 0
+        self.last = None
+        self.flagged = False
+
+
+class LeakDetector:
+    """Онлайн-детектор утечек памяти по истории RSS процессов.
+
+    Для каждого процесса держится окно из window последних замеров и
+    суммы Σt, Σy, Σt², Σty, поэтому наклон регрессии пересчитывается за
+    O(1) на замер: новая точка добавляется в суммы, вытесненная -
+    вычитается. Так же за O(1) ведётся доля шагов с ростом памяти.
+    Процесс помечается, когда окно заполнено, наклон не меньше
+    min_slope МБ/мин и память росла не менее чем на min_score шагов.
+    """
+
+    def __init__(self, window: int = 20, min_slope: float = 1.0, min_score: float = 0.8,
+                 noise_mb: float = 0.1):
+        self.window = max(3, int(window))
+        self.min_slope = min_slope
+        self.min_score = min_score
+        self.noise_mb = noise_mb
+        self._series = {}  # {(pid, starttime): _Series}
+        self._flagged = {}  # {pid: LeakInfo}
+        self._lock = threading.Lock()
+
+    def update(self, pid: int, starttime: float, timestamp: float, rss_mb: float):
+        """Добавляет замер. Возвращает LeakInfo, если процесс только что
+        стал подозрительным, иначе None"""
+        key = (pid, starttime)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series(self.window, timestamp)
+
+        t = timestamp - series.origin
+        y = rss_mb
+        up = 1 if series.last is not None and y > series.last + self.noise_mb else 0
+        series.last = y
+
+        head = series.head
+        if series.count == self.window:
+            # Вытесняем самую старую точку
+            old_t, old_y = series.times[head], series.values[head]
+            series.sum_t -= old_t
+            series.sum_y -= old_y
+            series.sum_tt -= old_t * old_t
+            series.sum_ty -= old_t * old_y
+            # Шаг к новой самой старой точке больше не входит в окно
+            following = (head + 1) % self.window
+            series.up_count -= series.ups[following]
+            series.ups[following] = 0
+        else:
+            series.count += 1
+
+        series.times[head] = t
+        series.values[head] = y
+        series.ups[head] = up
+        series.sum_t += t
+        series.sum_y += y
+        series.sum_tt += t * t
+        series.sum_ty += t * y
+        series.up_count += up
+        series.head = (head + 1) % self.window
+
+        return self._evaluate(pid, series)
+
+    def _evaluate(self, pid: int, series: _Series):
+        if series.count < self.window:
+            return None
+
+        n = series.count
+        denominator = n * series.sum_tt - series.sum_t ** 2
+        if denominator <= 0:
+            return None
+        slope = (n * series.sum_ty - series.sum_t * series.sum_y) / denominator * 60
+        score = series.up_count / (n - 1)
+        oldest = series.values[series.head]
+        info = LeakInfo(pid, slope, score, series.last - oldest)
+
+        leaking = slope >= self.min_slope and score >= self.min_score
+        with self._lock:
+            if leaking:
+                self._flagged[pid] = info
+            else:
+                self._flagged.pop(pid, None)
+
+        newly_flagged = leaking and not series.flagged
+        series.flagged = leaking
+        return info if newly_flagged else None
+
+    def forget_missing(self, alive):
+        """Удаляет состояние завершившихся процессов; alive - пары (pid, starttime)"""
+        alive = set(alive)
+        for key in [key for key in self._series if key not in alive]:
+            del self._series[key]
+        alive_pids = {pid for pid, _ in alive}
+        with self._lock:
+            for pid in [pid for pid in self._flagged if pid not in alive_pids]:
+                del self._flagged[pid]
+
+    def flagged(self) -> dict:
+        """Копия {pid: LeakInfo} подозрительных процессов (потокобезопасно)"""
+        with self._lock:
+            return dict(self._flagged)
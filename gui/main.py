@@ -1,5 +1,6 @@
 import sys
 import ctypes
+import multiprocessing
 import platform
 from PyQt5.QtWidgets import QApplication
 from main_window import MainWindow
@@ -15,6 +16,10 @@ def is_admin():
 
 # main.py
 if __name__ == "__main__":
+    # В собранном PyInstaller exe процесс отрисовки графиков (spawn)
+    # запускает тот же exe - без этого он откроет ещё одно окно
+    multiprocessing.freeze_support()
+    
     # Проверяем, запущен ли в режиме отладки
     is_debug = hasattr(sys, 'gettrace') and sys.gettrace() is not None
     
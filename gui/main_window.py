@@ -7,6 +7,10 @@ from disk_tab import DiskTab
 from network_tab import NetworkTab
 from disk_defrag import DefragTab
 from memory_tab import MemoryTab
+from tab_scheduler import TabScheduler
+from sampling_service import SamplingService
+from metrics_archive import MetricsArchive
+from alert_dispatcher import AlertEvent
 
 
 class MainWindow(QMainWindow):
@@ -39,29 +43,39 @@ class MainWindow(QMainWindow):
             return False
 
     def init_ui(self):
+        # Общий сервис сбора метрик для всех вкладок и бота
+        self.sampler = SamplingService(self)
+        # История метрик на диске - переживает перезапуск и падение
+        self.archive = MetricsArchive()
+
         # Create tabs
         self.tabs = QTabWidget()
 
         # Add tabs
-        self.system_tab = SystemTab()
+        self.system_tab = SystemTab(self.sampler, self.archive)
         self.tabs.addTab(self.system_tab, "System Information")
 
         self.disk_tab = DiskTab()
         self.tabs.addTab(self.disk_tab, "Disk Information")
 
-        self.network_tab = NetworkTab()
+        self.network_tab = NetworkTab(self.sampler)
         self.tabs.addTab(self.network_tab, "Network Diagnostics")
 
         self.defrag_tab = DefragTab()
         self.tabs.addTab(self.defrag_tab, "Defragmentation")
 
         # Добавляем вкладку мониторинга памяти
-        self.memory_tab = MemoryTab()
+        self.memory_tab = MemoryTab(self.sampler, self.archive)
         self.tabs.addTab(self.memory_tab, "Memory Analyzer")  # <-- Новая вкладка
+        # Регрессии задержки уходят через очередь оповещений бота
+        self.network_tab.latency_alert.connect(self.submit_latency_alert)
 
         # Set central widget
         self.setCentralWidget(self.tabs)
 
+        # Скрытые вкладки не рисуют и не опрашивают систему впустую
+        self.tab_scheduler = TabScheduler(self, self.tabs)
+
     def init_menu(self):
         # Create menu bar
         menubar = self.menuBar()
@@ -84,9 +98,25 @@ class MainWindow(QMainWindow):
             QMessageBox.information(self, "Настройки Telegram",
                                     "Настройки Telegram доступны во вкладке 'Memory Analyzer'")
 
+    def submit_latency_alert(self, host, message):
+        self.memory_tab.bot_manager.alerts.submit(AlertEvent(
+            rule='latency',
+            key=host,
+            title="🐢 Рост сетевой задержки!",
+            text=f"Цель: {host}\n{message}",
+            summary=f"{host}: {message}"
+        ))
+
     def closeEvent(self, event):
         """Обработка закрытия окна"""
         # Останавливаем мониторинг во вкладке памяти
         if hasattr(self, 'memory_tab'):
             self.memory_tab.stop_monitoring()
+            # Накопленные дайджесты уходят до выхода
+            self.memory_tab.bot_manager.alerts.stop()
+            self.memory_tab.bot_manager.charts.close()
+        self.network_tab.latency_monitor.stop()
+        self.network_tab.native_trace.cancel()
+        self.sampler.stop()
+        self.archive.close()
         event.accept()
\ No newline at end of file
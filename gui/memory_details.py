@@ -0,0 +1,76 @@
+import sys
+import time
+import psutil
+import numpy as np
+
+
+class MemoryDetailCache:
+    """PSS/USS для самых крупных процессов.
+
+    Чтение /proc/<pid>/smaps_rollup заставляет ядро обойти все
+    отображения процесса, поэтому оно делается только для top-N по RSS,
+    результат кэшируется по (pid, starttime), а за один вызов update()
+    перечитывается не больше budget процессов - сначала новые, затем
+    самые устаревшие.
+    """
+
+    def __init__(self, top_n: int = 50, max_age: float = 30.0, budget: int = 10,
+                 proc_root: str = '/proc'):
+        self.top_n = top_n
+        self.max_age = max_age
+        self.budget = budget
+        self.proc_root = proc_root
+        self.native = sys.platform.startswith('linux')
+        self._cache = {}  # {(pid, starttime): (pss, uss, время чтения)}
+
+    def _read_rollup(self, pid: int):
+        """(pss, uss) в байтах или None, если прочитать нельзя"""
+        if not self.native:
+            try:
+                info = psutil.Process(pid).memory_full_info()
+                return getattr(info, 'pss', None), info.uss
+            except (psutil.Error, OSError):
+                return None
+
+        values = {}
+        try:
+            with open(f"{self.proc_root}/{pid}/smaps_rollup", 'rb') as f:
+                for line in f:
+                    key, _, rest = line.partition(b':')
+                    if key in (b'Pss', b'Private_Clean', b'Private_Dirty', b'Private_Hugetlb'):
+                        values[key] = int(rest.split()[0]) * 1024
+        except (OSError, ValueError, IndexError):
+            return None
+        if b'Pss' not in values:
+            return None
+        uss = values.get(b'Private_Clean', 0) + values.get(b'Private_Dirty', 0) + values.get(b'Private_Hugetlb', 0)
+        return values[b'Pss'], uss
+
+    def update(self, processes) -> dict:
+        """Обновляет кэш по снимку процессов; возвращает {pid: (pss_mb, uss_mb)}"""
+        now = time.monotonic()
+        count = min(self.top_n, len(processes))
+        if not count:
+            self._cache = {}
+            return {}
+
+        # Индексы top-N по RSS без полной сортировки
+        top = np.argpartition(processes.rss, -count)[-count:]
+        keys = [(int(processes.pids[i]), float(processes.starttimes[i])) for i in top]
+
+        # Кэш только для текущего top-N: выбывшие и завершившиеся уходят
+        cache = {key: self._cache[key] for key in keys if key in self._cache}
+        stale = sorted((key for key in keys if key not in cache or now - cache[key][2] > self.max_age),
+                       key=lambda key: cache[key][2] if key in cache else -1.0)
+
+        for key in stale[:self.budget]:
+            result = self._read_rollup(key[0])
+            # Недоступный процесс тоже кэшируем, чтобы не долбить его каждый тик
+            pss, uss = result if result else (None, None)
+            cache[key] = (pss, uss, now)
+        self._cache = cache
+
+        mb = 1024 * 1024
+        return {pid: (pss / mb if pss is not None else None, uss / mb if uss is not None else None)
+                for (pid, _), (pss, uss, _) in cache.items()
+                if pss is not None or uss is not None}
@@ -2,36 +2,57 @@ import os
 import sys
 
 import psutil
+import numpy as np
 import time
 import threading
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget,
-    QTableWidgetItem, QLabel, QHeaderView, QSplitter, QComboBox,
-    QMessageBox, QInputDialog, QDialog, QFormLayout, QLineEdit, QCheckBox
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableView,
+    QAbstractItemView, QLabel, QHeaderView, QSplitter, QComboBox,
+    QMessageBox, QInputDialog, QDialog, QFormLayout, QLineEdit, QCheckBox,
+    QStackedWidget
 )
-from PyQt5.QtCore import Qt, QTimer
-import requests
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from datetime import datetime
 from tgBotManager import TelegramBotManager
+from alert_dispatcher import AlertEvent
 from crypto_utils import SecretManager
+from process_history import ProcessHistoryStore
+from process_model import ProcessTableModel, ProcessSortProxy, ProcessGroupTree
+from process_groups import GROUP_MODES, aggregate
+from sampling_service import SamplingService
+from metrics_archive import MetricsArchive
+from leak_detector import LeakDetector
 
 class MemoryTab(QWidget):
-    def __init__(self):
+    # Номер запроса, (pid, имя, времена, значения) - история из архива
+    archived_history_ready = pyqtSignal(int, object)
+
+    # Период обновления таблицы процессов, сек
+    TABLE_INTERVAL = 5.0
+    # Глубина истории процесса, подгружаемой из архива, сек
+    ARCHIVE_WINDOW = 86400
+
+    def __init__(self, sampler: SamplingService = None, archive: MetricsArchive = None):
         super().__init__()
+        self.sampler = sampler or SamplingService()
+        self.archive = archive
         self.is_monitoring = False
         self.monitor_thread = None
-        self.history = {}  # {pid: [(time, mem_mb), ...]}
+        self.history = ProcessHistoryStore()  # история RSS по PID
+        self.leak_detector = LeakDetector()
         self.current_pid = None
+        self.history_request = 0  # номер последнего запроса истории из архива
 
         # Инициализация менеджера бота
-        self.bot_manager = TelegramBotManager()
+        self.bot_manager = TelegramBotManager(sampler=self.sampler, archive=self.archive)
         self.telegram_settings = self.bot_manager.settings
 
         # Подключение сигналов бота
         self.bot_manager.update_status_signal.connect(self.set_monitoring_state)
+        self.archived_history_ready.connect(self.show_archived_history)
 
         self.init_ui()
 
@@ -56,15 +77,43 @@ class MemoryTab(QWidget):
         table_widget = QWidget()
         table_layout = QVBoxLayout(table_widget)
 
-        # Таблица процессов
-        self.process_table = QTableWidget()
-        self.process_table.setColumnCount(3)
-        self.process_table.setHorizontalHeaderLabels(["PID", "Имя процесса", "Память (МБ)"])
+        # Группировка: браузеры и пулы воркеров размазывают память по PID
+        group_layout = QHBoxLayout()
+        group_layout.addWidget(QLabel("Группировка:"))
+        self.group_selector = QComboBox()
+        self.group_selector.addItems(GROUP_MODES)
+        self.group_selector.currentTextChanged.connect(self.set_group_mode)
+        group_layout.addWidget(self.group_selector)
+        group_layout.addStretch()
+        table_layout.addLayout(group_layout)
+
+        # Таблица процессов: модель обновляется по разнице снимков,
+        # сортирует прокси, выделение сохраняется между обновлениями
+        self.process_model = ProcessTableModel(self)
+        self.process_proxy = ProcessSortProxy(self)
+        self.process_proxy.setSourceModel(self.process_model)
+
+        self.process_table = QTableView()
+        self.process_table.setModel(self.process_proxy)
+        self.process_table.setSortingEnabled(True)
+        self.process_table.sortByColumn(2, Qt.DescendingOrder)
+        self.process_table.verticalHeader().setVisible(False)
         self.process_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
-        self.process_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.process_table.setSelectionMode(QTableWidget.SingleSelection)
-        self.process_table.cellDoubleClicked.connect(self.show_process_history)
-        table_layout.addWidget(self.process_table)
+        self.process_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.process_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.process_table.doubleClicked.connect(self.show_process_history)
+
+        self.group_tree = ProcessGroupTree()
+        self.group_tree.itemDoubleClicked.connect(self.show_group_history)
+
+        self.process_views = QStackedWidget()
+        self.process_views.addWidget(self.process_table)
+        self.process_views.addWidget(self.group_tree)
+        table_layout.addWidget(self.process_views)
+
+        # Итог по PSS осмыслен в отличие от суммы RSS: общие страницы делятся
+        self.memory_total_label = QLabel()
+        table_layout.addWidget(self.memory_total_label)
 
         # Кнопки управления
         btn_layout = QHBoxLayout()
@@ -106,17 +155,26 @@ class MemoryTab(QWidget):
 
         main_layout.addWidget(splitter)
 
-        # Таймер для обновления таблицы
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.update_process_list)
-        self.update_timer.start(5000)  # Обновление каждые 5 секунд
-
-        # Первоначальное обновление
-        self.update_process_list()
+        # Таблица обновляется по снимкам общего сервиса сбора
+        self.sampler.snapshot_ready.connect(self.update_process_list)
+        self.table_subscription = self.sampler.subscribe(('processes', 'memory_details'), self.TABLE_INTERVAL)
+        self.sampler.start()
 
         # Обновление статуса бота
         self.update_bot_status()
 
+    def set_tab_active(self, active: bool):
+        """Таблица процессов нужна только на экране - в фоне подписка на паузе"""
+        self.sampler.set_interval(self.table_subscription, self.TABLE_INTERVAL if active else None)
+        # Сразу показываем последний имеющийся снимок, не дожидаясь нового
+        if active:
+            self.show_snapshot(self.sampler.latest())
+
+    def set_group_mode(self, label):
+        self.process_views.setCurrentWidget(
+            self.group_tree if GROUP_MODES[label] else self.process_table)
+        self.show_snapshot(self.sampler.latest())
+
     def open_telegram_settings(self):
         dialog = TelegramSettingsDialog(self, self.telegram_settings)
         if dialog.exec_() == QDialog.Accepted:
@@ -188,100 +246,163 @@ class MemoryTab(QWidget):
         self.update_monitor_status()
 
     def monitor_loop(self):
-        while self.is_monitoring:
-            try:
-                current_time = time.time()
-
-                for proc in psutil.process_iter(['pid', 'name', 'memory_info']):
-                    try:
-                        pid = proc.info['pid']
-                        name = proc.info['name']
-                        mem_mb = proc.info['memory_info'].rss / 1024 / 1024
-
-                        # Сохраняем историю
-                        if pid not in self.history:
-                            self.history[pid] = []
-                        self.history[pid].append((current_time, mem_mb))
-
-                        # Ограничиваем длину истории
-                        if len(self.history[pid]) > 100:
-                            self.history[pid].pop(0)
-
-                        # Проверка порога и отправка уведомления
-                        if mem_mb > self.telegram_settings.get('threshold', 500):
-                            self.send_telegram_alert(name, pid, mem_mb)
-
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        interval = self.telegram_settings.get('interval', 30)
+        subscription = self.sampler.subscribe(('processes',), interval)
+        last_sampled = 0.0
+        # Окно детектора задаётся во времени и пересчитывается в замеры
+        self.leak_detector = LeakDetector(
+            window=self.telegram_settings.get('leak_window', 600) / interval,
+            min_slope=self.telegram_settings.get('leak_min_slope', 1.0),
+            min_score=self.telegram_settings.get('leak_min_score', 0.8)
+        )
+        try:
+            while self.is_monitoring:
+                try:
+                    interval = self.telegram_settings.get('interval', 30)
+                    self.sampler.set_interval(subscription, interval)
+
+                    # Ждём свежий снимок, но не чаще своего интервала
+                    snapshot = self.sampler.wait_for('processes', last_sampled + interval, timeout=1.0)
+                    if snapshot is None or snapshot.processes is None:
                         continue
+                    last_sampled = snapshot.sampled['processes']
+                    processes = snapshot.processes
 
-                time.sleep(self.telegram_settings.get('interval', 30))
-
-            except Exception as e:
-                print(f"Ошибка мониторинга: {e}")
-                time.sleep(5)
-
-    def send_telegram_alert(self, name, pid, mem_mb):
-        """Отправка уведомления через бота"""
-        if not self.telegram_settings.get('bot_token') or not self.telegram_settings.get('chat_id'):
+                    starttimes = processes.starttimes.tolist()
+                    # Исключённые правилами процессы не порождают уведомлений
+                    excluded = self.bot_manager.rules.excluded(processes).tolist()
+                    for (pid, name, mem_mb), starttime, skip in zip(processes.processes(), starttimes, excluded):
+                        # Сохраняем историю
+                        self.history.append(pid, processes.timestamp, mem_mb, starttime)
+                        if self.archive:
+                            self.archive.record(self.archive_series(pid, name), processes.timestamp, mem_mb)
+
+                        # Устойчивый рост памяти вместо фиксированного порога
+                        leak = self.leak_detector.update(pid, starttime, processes.timestamp, mem_mb)
+                        if leak is not None and not skip:
+                            self.send_telegram_alert(name, pid, mem_mb, leak)
+
+                    # Завершившиеся процессы освобождают слоты истории
+                    pids = processes.pids.tolist()
+                    self.history.evict_missing(pids)
+                    self.leak_detector.forget_missing(zip(pids, starttimes))
+
+                except Exception as e:
+                    print(f"Ошибка мониторинга: {e}")
+                    time.sleep(5)
+        finally:
+            self.sampler.unsubscribe(subscription)
+
+    def send_telegram_alert(self, name, pid, mem_mb, leak):
+        """Ставит уведомление о подозрении на утечку в очередь бота"""
+        self.bot_manager.alerts.submit(AlertEvent(
+            rule='leak',
+            key=f"{name}_{pid}",
+            title="📈 Подозрение на утечку памяти!",
+            text=(
+                f"Процесс: {name}\n"
+                f"PID: {pid}\n"
+                f"Память: {mem_mb:.1f} МБ\n"
+                f"Рост: {leak.slope_mb_per_min:+.2f} МБ/мин, +{leak.growth_mb:.1f} МБ за окно "
+                f"(растёт на {leak.growth_score:.0%} замеров)\n"
+                f"Время: {datetime.now().strftime('%H:%M:%S')}"
+            ),
+            summary=f"{name} ({pid}): {mem_mb:.1f} МБ, {leak.slope_mb_per_min:+.2f} МБ/мин"
+        ))
+
+    def update_process_list(self, snapshot):
+        if 'processes' not in snapshot.updated or snapshot.processes is None:
+            return
+        # Снимок мог быть заказан потоком мониторинга - скрытую таблицу не трогаем
+        if not self.isVisible():
             return
+        self.show_snapshot(snapshot)
 
-        url = f"https://api.telegram.org/bot{self.telegram_settings['bot_token']}/sendMessage"
-        text = (
-            f"⚠️ Высокое потребление памяти!\n"
-            f"Процесс: {name}\n"
-            f"PID: {pid}\n"
-            f"Память: {mem_mb:.1f} МБ\n"
-            f"Время: {datetime.now().strftime('%H:%M:%S')}"
-        )
-        try:
-            requests.post(url, data={
-                "chat_id": self.telegram_settings['chat_id'],
-                "text": text
-            }, timeout=5)
-        except Exception as e:
-            print(f"Ошибка отправки в Telegram: {e}")
-
-    def update_process_list(self):
-        processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'memory_info']):
-            try:
-                pid = proc.info['pid']
-                name = proc.info['name']
-                mem_mb = proc.info['memory_info'].rss / 1024 / 1024
-                processes.append((pid, name, mem_mb))
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-
-        # Сортируем по использованию памяти
-        processes.sort(key=lambda x: x[2], reverse=True)
-
-        # Обновляем таблицу
-        self.process_table.setRowCount(len(processes))
-        for row, (pid, name, mem_mb) in enumerate(processes):
-            self.process_table.setItem(row, 0, QTableWidgetItem(str(pid)))
-            self.process_table.setItem(row, 1, QTableWidgetItem(name))
-            self.process_table.setItem(row, 2, QTableWidgetItem(f"{mem_mb:.1f}"))
-
-    def show_process_history(self, row, column):
-        pid = int(self.process_table.item(row, 0).text())
-        name = self.process_table.item(row, 1).text()
+    def show_snapshot(self, snapshot):
+        """Передаёт снимок в модель таблицы и пересчитывает итог PSS"""
+        if snapshot.processes is None:
+            return
+        details = snapshot.memory_details
+        rows = [(pid, name, rss_mb, *details.get(pid, (None, None)))
+                for pid, name, rss_mb in snapshot.processes.processes()]
+
+        # Модель сама вычислит вставки, удаления и изменения
+        self.process_model.apply_snapshot(rows)
+        self.process_model.set_highlighted(self.leak_detector.flagged())
+
+        mode = GROUP_MODES[self.group_selector.currentText()]
+        if mode:
+            self.group_tree.show_groups(aggregate(snapshot.processes, details, mode))
+
+        if details:
+            pss_total = sum(pss for pss, _ in details.values() if pss is not None)
+            uss_total = sum(uss for _, uss in details.values() if uss is not None)
+            self.memory_total_label.setText(
+                f"Top-{len(details)} по RSS: PSS {pss_total:.1f} МБ, USS {uss_total:.1f} МБ")
+
+    def show_process_history(self, index):
+        source = self.process_proxy.mapToSource(index)
+        pid, name = self.process_model.process_at(source.row())
         self.current_pid = pid
         self.plot_process_history(pid, name)
 
+    def show_group_history(self, item, column):
+        process = self.group_tree.process_of(item)
+        if process is not None:
+            pid, name = process
+            self.current_pid = pid
+            self.plot_process_history(pid, name)
+
+    @staticmethod
+    def archive_series(pid, name):
+        return f"rss/{name}/{pid}"
+
     def plot_process_history(self, pid, name):
-        if pid not in self.history or not self.history[pid]:
-            self.graph_label.setText(f"Нет данных истории для процесса: {name} (PID: {pid})")
+        """История из памяти рисуется сразу, более ранняя (например, до
+        перезапуска) догружается из архива в фоне и дорисовывается"""
+        self.history_request += 1
+        times, mems = self.history.snapshot(pid)
+        loading = self.archive is not None
+        self.draw_process_history(pid, name, times, mems, loading)
+        if loading:
+            threading.Thread(target=self.load_archived_history,
+                             args=(self.history_request, pid, name), daemon=True).start()
+
+    def load_archived_history(self, request, pid, name):
+        """Выполняется в фоновом потоке: чтение архива не держит GUI"""
+        try:
+            times, mems = self.archive.query(self.archive_series(pid, name),
+                                             time.time() - self.ARCHIVE_WINDOW)
+        except OSError as e:
+            print(f"Ошибка чтения архива метрик: {e}")
+            times, mems = np.empty(0), np.empty(0)
+        self.archived_history_ready.emit(request, (pid, name, times, mems))
+
+    def show_archived_history(self, request, result):
+        # Пока шло чтение, могли выбрать другой процесс
+        if request != self.history_request:
+            return
+        pid, name, old_times, old_mems = result
+        times, mems = self.history.snapshot(pid)
+        if len(times):
+            keep = old_times < times[0]
+            old_times, old_mems = old_times[keep], old_mems[keep]
+        if len(old_times) or not len(times):
+            self.draw_process_history(pid, name, np.concatenate([old_times, times]),
+                                      np.concatenate([old_mems, mems]))
+
+    def draw_process_history(self, pid, name, times, mems, loading=False):
+        if not len(times):
+            if loading:
+                self.graph_label.setText(f"Загрузка истории из архива: {name} (PID: {pid})")
+            else:
+                self.graph_label.setText(f"Нет данных истории для процесса: {name} (PID: {pid})")
             self.ax.clear()
             self.canvas.draw()
             return
 
-        data = self.history[pid]
-        times = [t for t, m in data]
-        mems = [m for t, m in data]
-
         # Преобразуем временные метки в относительное время
-        min_time = min(times)
-        rel_times = [t - min_time for t in times]
+        rel_times = times - times[0]
 
         # Очищаем график
         self.ax.clear()
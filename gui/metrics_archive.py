@@ -0,0 +1,418 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import defaultdict, deque
+
+import numpy as np
+
+# Заголовок блока: маркер, длина полезной нагрузки, CRC32 нагрузки
+BLOCK_MAGIC = 0xA7
+BLOCK_HEADER = struct.Struct('<BII')
+NAME_LENGTH = struct.Struct('<H')
+SEGMENT_SUFFIX = '.seg'
+COMPACT_SUFFIX = '.tmp'
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _unzigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+def _write_varint(out: bytearray, value: int):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_block(series: str, times, values) -> bytes:
+    """Кодирует точки одного ряда в блок.
+
+    Время хранится в миллисекундах как дельта дельт (у равномерного ряда
+    это нули - по байту на точку), значения - как XOR с предыдущим
+    float64: у медленно меняющихся метрик совпадают знак, порядок и
+    старшие биты мантиссы, поэтому пишутся только значащие байты XOR.
+    """
+    name = series.encode()
+    payload = bytearray(NAME_LENGTH.pack(len(name)))
+    payload += name
+    _write_varint(payload, len(times))
+
+    previous_ms = delta = 0
+    previous_bits = 0
+    for i, (timestamp, value) in enumerate(zip(times, values)):
+        ms = int(round(timestamp * 1000))
+        bits = struct.unpack('<Q', struct.pack('<d', value))[0]
+        if i == 0:
+            payload += struct.pack('<qQ', ms, bits)
+        else:
+            new_delta = ms - previous_ms
+            _write_varint(payload, _zigzag(new_delta - delta))
+            delta = new_delta
+
+            xor = bits ^ previous_bits
+            if not xor:
+                payload.append(0)
+            else:
+                raw = xor.to_bytes(8, 'big')
+                lead = min(len(raw) - len(raw.lstrip(b'\0')), 7)
+                trail = min(len(raw) - len(raw.rstrip(b'\0')), 7 - lead)
+                payload.append(0x80 | lead << 3 | trail)
+                payload += raw[lead:8 - trail]
+        previous_ms, previous_bits = ms, bits
+
+    return BLOCK_HEADER.pack(BLOCK_MAGIC, len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_payload(payload: bytes, pos: int):
+    """Точки блока, начиная с позиции сразу после имени ряда"""
+    count, pos = _read_varint(payload, pos)
+    times = np.empty(count, dtype=np.float64)
+    bits = np.empty(count, dtype=np.uint64)
+    if not count:
+        return times, bits.view(np.float64)
+
+    ms, value = struct.unpack_from('<qQ', payload, pos)
+    pos += 16
+    times[0], bits[0] = ms, value
+    delta = 0
+    for i in range(1, count):
+        zz, pos = _read_varint(payload, pos)
+        delta += _unzigzag(zz)
+        ms += delta
+        times[i] = ms
+
+        header = payload[pos]
+        pos += 1
+        if header:
+            lead, trail = (header >> 3) & 7, header & 7
+            size = 8 - lead - trail
+            value ^= int.from_bytes(payload[pos:pos + size], 'big') << (8 * trail)
+            pos += size
+        bits[i] = value
+    return times / 1000, bits.view(np.float64)
+
+
+def iter_blocks(data: bytes):
+    """(смещение конца, нагрузка) целых блоков; оборванный хвост отбрасывается"""
+    pos = 0
+    while pos + BLOCK_HEADER.size <= len(data):
+        magic, length, crc = BLOCK_HEADER.unpack_from(data, pos)
+        start = pos + BLOCK_HEADER.size
+        payload = data[start:start + length]
+        if magic != BLOCK_MAGIC or len(payload) != length or zlib.crc32(payload) != crc:
+            return
+        pos = start + length
+        yield pos, payload
+
+
+def block_name(data: bytes, pos: int) -> bytes:
+    """Имя ряда блока, начинающегося в data[pos], без проверки CRC"""
+    start = pos + BLOCK_HEADER.size + NAME_LENGTH.size
+    return data[start:start + NAME_LENGTH.unpack_from(data, pos + BLOCK_HEADER.size)[0]]
+
+
+class MetricsArchive:
+    """Архив метрик на диске, переживающий перезапуски и падения.
+
+    Точки копятся в очереди и раз в flush_interval записываются фоновым
+    потоком пачками: по блоку на ряд в конец файла сегмента. Сегмент
+    покрывает segment_seconds, поэтому удаление старых данных - это
+    удаление целых файлов старше retention. Каждый блок защищён CRC:
+    недописанный при падении хвост сегмента при чтении отбрасывается,
+    а при дозаписи обрезается.
+
+    Блок одного сброса держит лишь несколько точек ряда, и сжатие дельтами
+    на нём почти не работает. Поэтому закрытый сегмент уплотняется: все
+    блоки ряда переписываются в один (compact). Для чтения у сегментов
+    есть индекс "ряд -> блоки", и query читает и проверяет только блоки
+    нужного ряда.
+    """
+
+    def __init__(self, root: str = 'metrics_archive', segment_seconds: int = 3600,
+                 retention: float = 7 * 86400, flush_interval: float = 5.0):
+        self.root = root
+        self.segment_seconds = segment_seconds
+        self.retention = retention
+        self.flush_interval = flush_interval
+        self._pending = deque()  # (ряд, время, значение)
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._segment = None     # (начало сегмента, открытый файл)
+        self._index = {}         # {начало сегмента: [проиндексировано байт, {имя: [(смещение, длина)]}]}
+        os.makedirs(root, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="metrics-archive", daemon=True)
+        self._thread.start()
+
+    def record(self, series: str, timestamp: float, value: float):
+        """Ставит точку в очередь записи (из любого потока, без ввода-вывода)"""
+        self._pending.append((series, timestamp, float(value)))
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=5.0)
+        self.flush()
+        with self._write_lock:
+            if self._segment:
+                self._segment[1].close()
+                self._segment = None
+
+    # --- Запись ---
+
+    def _run(self):
+        self.enforce_retention()
+        try:
+            self.compact_closed()
+        except OSError as e:
+            print(f"Ошибка уплотнения архива метрик: {e}")
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Ошибка записи архива метрик: {e}")
+
+    def flush(self):
+        """Записывает накопленные точки: по блоку на (сегмент, ряд)"""
+        batches = defaultdict(lambda: ([], []))
+        while self._pending:
+            series, timestamp, value = self._pending.popleft()
+            times, values = batches[(self._segment_start(timestamp), series)]
+            times.append(timestamp)
+            values.append(value)
+        if not batches:
+            return
+
+        with self._write_lock:
+            for (segment, series), (times, values) in sorted(batches.items()):
+                self._segment_file(segment).write(encode_block(series, times, values))
+            if self._segment:
+                self._segment[1].flush()
+
+    def _segment_start(self, timestamp: float) -> int:
+        return int(timestamp // self.segment_seconds * self.segment_seconds)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.root, f"{segment}{SEGMENT_SUFFIX}")
+
+    def _segment_file(self, segment: int):
+        if self._segment and self._segment[0] == segment:
+            return self._segment[1]
+        if self._segment:
+            previous, f = self._segment
+            f.close()
+            self._segment = None
+            try:
+                self.compact(previous)
+            except OSError as e:
+                print(f"Ошибка уплотнения архива метрик: {e}")
+            self.enforce_retention()
+
+        path = self._segment_path(segment)
+        f = open(path, 'ab+')
+        # После падения в конце сегмента может остаться оборванный блок
+        f.seek(0)
+        valid = 0
+        for valid, _ in iter_blocks(f.read()):
+            pass
+        f.truncate(valid)
+        self._index.pop(segment, None)
+        self._segment = (segment, f)
+        return f
+
+    def compact_closed(self, now: float = None):
+        """Уплотняет сегменты, закрытые без уплотнения (выход или падение
+        на границе сегмента). Текущий и открытый сегменты не трогаются"""
+        current = self._segment_start(now or time.time())
+        with self._write_lock:
+            for entry in os.listdir(self.root):
+                if entry.endswith(COMPACT_SUFFIX):
+                    # Недописанная при падении копия - исходный сегмент цел
+                    os.remove(os.path.join(self.root, entry))
+        for segment in self.segments():
+            if segment < current:
+                with self._write_lock:
+                    # Открытый на запись сегмент (точки с запаздыванием)
+                    # уплотнится при переходе к следующему
+                    if not (self._segment and self._segment[0] == segment):
+                        self.compact(segment)
+
+    def compact(self, segment: int):
+        """Переписывает сегмент по одному блоку на ряд. Вызывается под
+        _write_lock; файл заменяется атомарно, так что падение посреди
+        уплотнения оставляет прежний сегмент"""
+        blocks = self._series_index(segment)[1]
+        if all(len(entries) == 1 for entries in blocks.values()):
+            return
+
+        path = self._segment_path(segment)
+        with open(path, 'rb') as f:
+            data = f.read()
+        series = defaultdict(lambda: ([], []))
+        for _, payload in iter_blocks(data):
+            size = NAME_LENGTH.unpack_from(payload)[0]
+            times, values = decode_payload(payload, NAME_LENGTH.size + size)
+            series[payload[2:2 + size].decode()][0].append(times)
+            series[payload[2:2 + size].decode()][1].append(values)
+
+        with open(path + COMPACT_SUFFIX, 'wb') as f:
+            for name in sorted(series):
+                times, values = np.concatenate(series[name][0]), np.concatenate(series[name][1])
+                order = np.argsort(times, kind='stable')
+                f.write(encode_block(name, times[order].tolist(), values[order].tolist()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + COMPACT_SUFFIX, path)
+        self._index.pop(segment, None)
+
+    def _series_index(self, segment: int):
+        """Индекс блоков сегмента по именам рядов. Вызывается под
+        _write_lock; файл только дописывается, поэтому читается лишь
+        хвост после уже проиндексированного. CRC проверяется при чтении
+        самих блоков"""
+        index = self._index.get(segment)
+        if index is None:
+            index = self._index[segment] = [0, defaultdict(list)]
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(index[0])
+            data = f.read()
+        pos = 0
+        while pos + BLOCK_HEADER.size + NAME_LENGTH.size <= len(data):
+            magic, length, _ = BLOCK_HEADER.unpack_from(data, pos)
+            end = pos + BLOCK_HEADER.size + length
+            if magic != BLOCK_MAGIC or end > len(data):
+                break
+            index[1][block_name(data, pos)].append((index[0] + pos, end - pos))
+            pos = end
+        index[0] += pos
+        return index
+
+    def enforce_retention(self, now: float = None):
+        """Удаляет сегменты, целиком вышедшие за срок хранения"""
+        cutoff = (now or time.time()) - self.retention
+        for segment in self.segments():
+            if segment + self.segment_seconds < cutoff:
+                self._index.pop(segment, None)
+                try:
+                    os.remove(self._segment_path(segment))
+                except OSError:
+                    pass
+
+    # --- Чтение ---
+
+    def segments(self) -> list:
+        """Начала сегментов на диске по возрастанию"""
+        starts = []
+        for entry in os.listdir(self.root):
+            stem, suffix = os.path.splitext(entry)
+            if suffix == SEGMENT_SUFFIX and stem.isdigit():
+                starts.append(int(stem))
+        return sorted(starts)
+
+    def query(self, series: str, start: float, end: float = None):
+        """(времена, значения) ряда в [start, end] из записанных на диск точек.
+
+        Точки, ещё ждущие записи в очереди, не возвращаются - у вызывающих
+        они и так есть в памяти.
+        """
+        end = end if end is not None else time.time()
+        name = series.encode()
+        times, values = [], []
+        for segment in self.segments():
+            if segment + self.segment_seconds < start or segment > end:
+                continue
+            # Читаются только блоки этого ряда, остальные не трогаются
+            chunks = []
+            with self._write_lock:
+                try:
+                    entries = self._series_index(segment)[1].get(name, ())
+                    if entries:
+                        with open(self._segment_path(segment), 'rb') as f:
+                            for offset, length in entries:
+                                f.seek(offset)
+                                chunks.append(f.read(length))
+                except OSError:
+                    continue
+            for chunk in chunks:
+                for _, payload in iter_blocks(chunk):
+                    block_times, block_values = decode_payload(payload, NAME_LENGTH.size + len(name))
+                    times.append(block_times)
+                    values.append(block_values)
+
+        if not times:
+            return np.empty(0), np.empty(0)
+        times, values = np.concatenate(times), np.concatenate(values)
+        order = np.argsort(times, kind='stable')
+        times, values = times[order], values[order]
+        mask = (times >= start) & (times <= end)
+        return times[mask], values[mask]
+
+
+def benchmark(hours: int = 24, processes: int = 200):
+    """Размер архива и скорость чтения при реальной нагрузке: CPU раз в
+    секунду и RSS процессов раз в 30 с, сброс каждые flush_interval секунд"""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as root:
+        archive = MetricsArchive(root, flush_interval=3600)  # сбросы делает сам цикл
+        interval = 5.0
+        rng = np.random.default_rng(0)
+        seconds = hours * 3600
+        now = time.time()
+        begin = archive._segment_start(now - seconds)
+        cpu = np.clip(np.cumsum(rng.normal(0, 1, seconds)) + 30, 0, 100).round(1)
+        rss = rng.uniform(10, 500, processes).round(1)
+
+        start = time.perf_counter()
+        points = 0
+        for second in range(seconds):
+            timestamp = begin + second
+            archive.record('cpu', timestamp, cpu[second])
+            points += 1
+            if second % 30 == 0:
+                rss += rng.normal(0, 0.5, processes).round(1)
+                for pid in range(processes):
+                    archive.record(f"rss/worker/{1000 + pid}", timestamp, rss[pid])
+                points += processes
+            if second % interval == interval - 1:
+                archive.flush()
+        # Переход в следующий сегмент уплотняет последний из записанных
+        archive.record('cpu', begin + seconds, 0.0)
+        archive.flush()
+        write_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        times, loaded = archive.query('cpu', begin, begin + seconds - 1)
+        cpu_ms = (time.perf_counter() - start) * 1000
+        archive._index.clear()
+        start = time.perf_counter()
+        archive.query('rss/worker/1000', begin, begin + seconds)
+        rss_ms = (time.perf_counter() - start) * 1000
+        archive.close()
+
+        size = sum(os.path.getsize(os.path.join(root, entry)) for entry in os.listdir(root))
+        assert np.array_equal(loaded, cpu)
+        print(f"Точек: {points}, на диске: {size / 1024:.0f} КБ ({size / points:.2f} байт/точку, "
+              f"без сжатия 16)")
+        print(f"Запись: {write_s:.1f} с; чтение CPU за {hours} ч: {cpu_ms:.0f} мс, "
+              f"одного процесса без индекса в памяти: {rss_ms:.0f} мс")
+        return size, cpu_ms, rss_ms
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,145 @@
+import time
+import numpy as np
+
+# Окна истории для графиков: подпись -> длительность в секундах
+HISTORY_WINDOWS = {
+    '1 минута': 60,
+    '1 час': 3600,
+    '24 часа': 86400
+}
+
+
+class RingBuffer:
+    """Кольцевой буфер (время, значение) на заранее выделенных массивах"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.head = 0  # индекс следующей записи
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp: float, value: float):
+        self.times[self.head] = timestamp
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def last(self):
+        if not self.count:
+            return None
+        index = (self.head - 1) % self.capacity
+        return self.times[index], self.values[index]
+
+    def ordered(self):
+        """Копия содержимого в хронологическом порядке"""
+        if self.count < self.capacity:
+            return self.times[:self.count].copy(), self.values[:self.count].copy()
+        order = np.r_[self.head:self.capacity, 0:self.head]
+        return self.times[order], self.values[order]
+
+    def _segments(self):
+        if self.count < self.capacity:
+            return ((0, self.count),)
+        return ((self.head, self.capacity), (0, self.head))
+
+    def count_since(self, start: float) -> int:
+        """Число точек с меткой времени >= start"""
+        return sum(end - begin - np.searchsorted(self.times[begin:end], start)
+                   for begin, end in self._segments())
+
+    def since(self, start: float):
+        """Точки с меткой времени >= start без копирования всего буфера"""
+        times, values = [], []
+        for begin, end in self._segments():
+            first = begin + np.searchsorted(self.times[begin:end], start)
+            times.append(self.times[first:end])
+            values.append(self.values[first:end])
+        return np.concatenate(times), np.concatenate(values)
+
+
+class MetricHistory:
+    """История одной метрики с несколькими разрешениями.
+
+    Сырые значения пишутся в буфер первого уровня, а для остальных
+    уровней по ходу копятся средние по корзинам фиксированной длины.
+    Запрос берёт самый подробный уровень, у которого в окне не слишком
+    много точек, и прореживает его LTTB до ширины графика.
+    """
+
+    # (разрешение в секундах, ёмкость)
+    LEVELS = ((1, 86400), (10, 8640), (60, 1440))
+    # Во сколько раз входные точки LTTB могут превышать число пикселей
+    OVERSAMPLE = 8
+
+    def __init__(self, levels=LEVELS):
+        self.levels = [(resolution, RingBuffer(capacity)) for resolution, capacity in levels]
+        # Накопители текущих корзин для уровней-агрегатов: [корзина, сумма, число]
+        self._pending = [[None, 0.0, 0] for _ in self.levels[1:]]
+
+    def __len__(self):
+        return len(self.levels[0][1])
+
+    def last(self):
+        last = self.levels[0][1].last()
+        return None if last is None else last[1]
+
+    def append(self, value: float, timestamp: float = None):
+        timestamp = time.time() if timestamp is None else timestamp
+        self.levels[0][1].append(timestamp, value)
+
+        for (resolution, buffer), pending in zip(self.levels[1:], self._pending):
+            bucket = int(timestamp // resolution)
+            if pending[0] is not None and bucket != pending[0]:
+                buffer.append(pending[0] * resolution, pending[1] / pending[2])
+                pending[1] = pending[2] = 0
+            pending[0] = bucket
+            pending[1] += value
+            pending[2] += 1
+
+    def query(self, window: float, max_points: int, now: float = None):
+        """Точки за последние window секунд, не более max_points штук"""
+        now = time.time() if now is None else now
+        start = now - window
+        limit = max_points * self.OVERSAMPLE
+
+        for resolution, buffer in self.levels:
+            # Уровень подходит, если покрывает окно и не слишком подробный
+            covers = buffer.count < buffer.capacity or resolution * buffer.capacity >= window
+            if covers and buffer.count_since(start) <= limit:
+                break
+        times, values = buffer.since(start)
+        return lttb(times, values, max_points)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int):
+    """Largest-Triangle-Three-Buckets: прореживание ряда до threshold точек
+    с сохранением формы (пиков и провалов)"""
+    count = len(x)
+    if threshold >= count or threshold < 3:
+        return x, y
+
+    # Края корзин для внутренних точек (первая и последняя сохраняются)
+    edges = np.linspace(1, count - 1, threshold - 1).astype(np.intp)
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = count - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Третья вершина - среднее следующей корзины
+        next_start = end
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else count
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        px, py = x[previous], y[previous]
+        areas = np.abs((px - avg_x) * (y[start:end] - py) - (px - x[start:end]) * (avg_y - py))
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+
+    return x[selected], y[selected]
@@ -1,35 +1,58 @@
+import asyncio
+import ipaddress
 import psutil
+import platform
 import socket
 import subprocess
 import re
 from typing import Dict, List, Optional, Tuple
+from icmp_ping import IcmpPinger, icmp_available
+from proc_net import ConnectionCollector, PROC_NET_TABLES
+from traceroute import format_hop, trace
 
 class NetworkDiagnostics:
+    _collector = None
+
     @staticmethod
     def get_connections() -> List[Dict]:
-        """Get all network connections"""
+        """Get all network connections.
+        On Linux TCP sockets come from a NETLINK_SOCK_DIAG dump, UDP from
+        /proc/net, and owners from a cached inode-to-PID map instead of a
+        scan of every /proc/*/fd"""
+        if NetworkDiagnostics._collector is None:
+            NetworkDiagnostics._collector = ConnectionCollector()
         connections = []
-        for conn in psutil.net_connections(kind='inet'):
-            if conn.status:
-                connections.append({
-                    'family': conn.family.name,
-                    'type': conn.type.name,
-                    'local_addr': f"{conn.laddr.ip}:{conn.laddr.port}" if conn.laddr else None,
-                    'remote_addr': f"{conn.raddr.ip}:{conn.raddr.port}" if conn.raddr else None,
-                    'status': conn.status,
-                    'pid': conn.pid
-                })
+        for conn in NetworkDiagnostics._collector.read():
+            family, kind = PROC_NET_TABLES[conn.protocol]
+            connections.append({
+                'family': family.name,
+                'type': kind.name,
+                'local_addr': conn.local_addr,
+                'remote_addr': conn.remote_addr,
+                'status': conn.status,
+                'pid': conn.pid or None
+            })
         return connections
 
+    @staticmethod
+    def ping_command(host: str, count: int = 4) -> List[str]:
+        """Command line for the system ping"""
+        if platform.system().lower() == "windows":
+            return ["ping", "-n", str(count), host]
+        return ["ping", "-c", str(count), host]
+
+    @staticmethod
+    def trace_command(host: str) -> List[str]:
+        """Command line for the system traceroute"""
+        if platform.system().lower() == "windows":
+            return ["tracert", "-d", host]
+        return ["traceroute", "-n", host]
+
     @staticmethod
     def ping_host(host: str, count: int = 4) -> Dict:
         """Ping a host and return results"""
         try:
-            if platform.system().lower() == "windows":
-                cmd = ["ping", "-n", str(count), host]
-            else:
-                cmd = ["ping", "-c", str(count), host]
-                
+            cmd = NetworkDiagnostics.ping_command(host, count)
             output = subprocess.check_output(cmd, stderr=subprocess.STDOUT, universal_newlines=True)
             return {
                 'success': True,
@@ -43,6 +66,31 @@ class NetworkDiagnostics:
                 'error': str(e)
             }
 
+    @staticmethod
+    def ping_native(host: str, count: int = 4, timeout: float = 1.0) -> Dict:
+        """Ping through ICMP sockets without spawning the system ping.
+        Same result shape as ping_host; stats as in _parse_ping"""
+        async def run():
+            async with IcmpPinger() as pinger:
+                return await pinger.ping(host, count, timeout=timeout)
+
+        try:
+            stats = asyncio.run(run())
+        except (OSError, socket.gaierror) as e:
+            return {'success': False, 'output': str(e), 'error': str(e)}
+        output = (f"{host} ({stats['address']}): {stats['packets_sent']} packets transmitted, "
+                  f"{stats['packets_received']} received, {stats['packet_loss']}% packet loss")
+        return {'success': stats['packets_received'] > 0, 'output': output, 'stats': stats}
+
+    @staticmethod
+    def sweep(network: str, count: int = 1, timeout: float = 1.0) -> Dict[str, Dict]:
+        """Ping every address of a CIDR range: {address: stats}"""
+        async def run():
+            async with IcmpPinger() as pinger:
+                return await pinger.sweep(network, count, timeout)
+
+        return asyncio.run(run())
+
     @staticmethod
     def _parse_ping(output: str) -> Dict:
         """Parse ping command output"""
@@ -63,56 +111,87 @@ class NetworkDiagnostics:
         return stats
 
     @staticmethod
-    def trace_route(host: str) -> Dict:
-        """Perform traceroute to a host"""
+    def trace_route(host: str, max_hops: int = 30) -> Dict:
+        """Perform traceroute to a host.
+        Probes all TTLs at once through ICMP sockets when they are available,
+        otherwise runs the system traceroute"""
+        if not icmp_available():
+            return NetworkDiagnostics._trace_route_command(host)
+
+        async def run():
+            async with IcmpPinger() as pinger:
+                address = await pinger.resolve(host)
+                return address, [hop async for hop in trace(pinger, address, max_hops)]
+
         try:
-            if platform.system().lower() == "windows":
-                cmd = ["tracert", "-d", host]
-            else:
-                cmd = ["traceroute", "-n", host]
-                
+            address, hops = asyncio.run(run())
+        except (OSError, socket.gaierror) as e:
+            return {'success': False, 'output': str(e), 'error': str(e)}
+        hops.sort(key=lambda hop: hop['hop'])
+        output = "\n".join([f"traceroute to {host} ({address}), {max_hops} hops max"]
+                           + [format_hop(hop) for hop in hops])
+        return {
+            'success': any(hop['reached'] for hop in hops),
+            'output': output,
+            'hops': hops
+        }
+
+    @staticmethod
+    def _trace_route_command(host: str) -> Dict:
+        try:
+            cmd = NetworkDiagnostics.trace_command(host)
             output = subprocess.check_output(cmd, stderr=subprocess.STDOUT, universal_newlines=True)
             return {
                 'success': True,
                 'output': output,
                 'hops': NetworkDiagnostics._parse_trace(output)
             }
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, OSError) as e:
             return {
                 'success': False,
-                'output': e.output,
+                'output': getattr(e, 'output', None) or str(e),
                 'error': str(e)
             }
 
     @staticmethod
     def _parse_trace(output: str) -> List[Dict]:
-        """Parse traceroute output"""
-        hops = []
-        # Windows format
-        if platform.system().lower() == "windows":
-            for line in output.split('\n')[2:]:
-                if not line.strip():
-                    continue
-                parts = line.split()
-                if len(parts) >= 5:
-                    hops.append({
-                        'hop': int(parts[0]),
-                        'ip': parts[-1],
-                        'times': [float(t.replace('<', '')) for t in parts[1:-1] if t != 'ms']
-                    })
-        # Linux format
-        else:
-            for line in output.split('\n')[1:]:
-                if not line.strip():
-                    continue
-                parts = line.split()
-                if len(parts) >= 2:
-                    hops.append({
-                        'hop': int(parts[0]),
-                        'ip': parts[1],
-                        'times': [float(t) for t in parts[2:] if t != '*']
-                    })
-        return hops
+        """Parse traceroute or tracert output"""
+        hops = (NetworkDiagnostics._parse_trace_line(line) for line in output.split('\n'))
+        return [hop for hop in hops if hop]
+
+    @staticmethod
+    def _parse_trace_line(line: str) -> Optional[Dict]:
+        """One hop line of traceroute -n or tracert -d; None for headers.
+
+        Handles lost probes ('*', "Request timed out."), several addresses
+        on one hop, '<1 ms', annotations like '!H' and names with the
+        address in brackets."""
+        parts = line.split()
+        if not parts or not parts[0].isdigit():
+            return None
+        ips, times, sent = [], [], 0
+        for token in parts[1:]:
+            token = token.strip('()[]')
+            if token == '*':
+                sent += 1
+                continue
+            try:
+                times.append(float(token.lstrip('<')))
+                sent += 1
+            except ValueError:
+                try:
+                    address = str(ipaddress.ip_address(token))
+                except ValueError:
+                    continue  # 'ms', '!H', host names, messages
+                if address not in ips:
+                    ips.append(address)
+        return {
+            'hop': int(parts[0]),
+            'ip': ips[0] if ips else None,
+            'ips': ips,
+            'times': times,
+            'sent': sent
+        }
 
     def get_network_stats(self) -> Dict:
         """Get comprehensive network statistics"""
@@ -1,13 +1,38 @@
+import time
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTreeWidget, 
                             QTreeWidgetItem, QPushButton, QLineEdit, 
-                            QTextEdit, QLabel, QHeaderView)
-from PyQt5.QtCore import Qt
+                            QTextEdit, QLabel, QHeaderView, QComboBox, QCheckBox,
+                            QTreeView)
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QBrush
+import numpy as np
+from charts import LiveChart
+from latency_monitor import LatencyMonitor, LATENCY_WINDOWS
+from metrics_history import RingBuffer
 from network_diagnostics import NetworkDiagnostics
+from network_tools import NativeTrace, StreamingTool
+from icmp_ping import icmp_available
+from traceroute import HopStats
+from connection_model import ConnectionTableModel
+from process_model import ProcessSortProxy
 
 class NetworkTab(QWidget):
-    def __init__(self):
+    # Цель, описание - регрессия задержки для оповещений бота
+    latency_alert = pyqtSignal(str, str)
+    
+    # Точек на графике задержки: 10 минут при отчёте раз в секунду
+    LATENCY_POINTS = 600
+    # Период автообновления списка соединений, с
+    CONNECTIONS_INTERVAL = 1.0
+    CONNECTION_STATES = ('ESTABLISHED', 'LISTEN', 'SYN_SENT', 'SYN_RECV', 'FIN_WAIT1', 'FIN_WAIT2',
+                         'TIME_WAIT', 'CLOSE_WAIT', 'LAST_ACK', 'CLOSING')
+    
+    def __init__(self, sampler):
         super().__init__()
+        self.sampler = sampler
         self.diagnostics = NetworkDiagnostics()
+        self.latency_history = {}  # {цель: RingBuffer p95 за минуту}
+        self.tab_active = True
         self.init_ui()
     
     def init_ui(self):
@@ -15,11 +40,38 @@ class NetworkTab(QWidget):
         self.setLayout(self.layout)
         
         # Connection monitoring
-        self.connections_tree = QTreeWidget()
-        self.connections_tree.setHeaderLabels(["Protocol", "Local Address", "Remote Address", "Status", "PID"])
-        self.connections_tree.header().setSectionResizeMode(QHeaderView.ResizeToContents)
-        self.layout.addWidget(QLabel("Active Connections:"))
-        self.layout.addWidget(self.connections_tree)
+        connections_header = QHBoxLayout()
+        self.connections_label = QLabel("Active Connections:")
+        self.connections_refresh = QPushButton("Refresh")
+        self.connections_refresh.clicked.connect(self.update_connections)
+        self.connections_auto = QCheckBox("Auto-refresh (1 s)")
+        self.connections_auto.toggled.connect(self.set_connections_auto)
+        # Отбор по состоянию и портам; с sock_diag его выполняет ядро
+        self.connections_state = QComboBox()
+        self.connections_state.addItems(["All states"] + list(self.CONNECTION_STATES))
+        self.connections_state.currentIndexChanged.connect(self.apply_connections_filter)
+        self.connections_ports = QLineEdit()
+        self.connections_ports.setPlaceholderText("Ports, e.g. 443, 8080")
+        self.connections_ports.editingFinished.connect(self.apply_connections_filter)
+        connections_header.addWidget(self.connections_label)
+        connections_header.addStretch()
+        connections_header.addWidget(self.connections_state)
+        connections_header.addWidget(self.connections_ports)
+        connections_header.addWidget(self.connections_auto)
+        connections_header.addWidget(self.connections_refresh)
+        self.layout.addLayout(connections_header)
+        
+        # Модель обновляется по разнице снимков, сортировка - в прокси
+        self.connections_model = ConnectionTableModel(self)
+        self.connections_proxy = ProcessSortProxy(self)
+        self.connections_proxy.setSourceModel(self.connections_model)
+        self.connections_view = QTreeView()
+        self.connections_view.setModel(self.connections_proxy)
+        self.connections_view.setRootIsDecorated(False)
+        self.connections_view.setUniformRowHeights(True)
+        self.connections_view.setSortingEnabled(True)
+        self.connections_view.header().setSectionResizeMode(QHeaderView.Interactive)
+        self.layout.addWidget(self.connections_view)
         
         # Network tools
         self.layout.addWidget(QLabel("\nNetwork Tools:"))
@@ -28,10 +80,11 @@ class NetworkTab(QWidget):
         ping_layout = QHBoxLayout()
         self.ping_input = QLineEdit()
         self.ping_input.setPlaceholderText("Enter host to ping")
-        ping_button = QPushButton("Ping")
-        ping_button.clicked.connect(self.run_ping)
+        self.ping_input.returnPressed.connect(self.run_ping)
+        self.ping_button = QPushButton("Ping")
+        self.ping_button.clicked.connect(self.run_ping)
         ping_layout.addWidget(self.ping_input)
-        ping_layout.addWidget(ping_button)
+        ping_layout.addWidget(self.ping_button)
         self.layout.addLayout(ping_layout)
         
         self.ping_output = QTextEdit()
@@ -42,56 +95,313 @@ class NetworkTab(QWidget):
         trace_layout = QHBoxLayout()
         self.trace_input = QLineEdit()
         self.trace_input.setPlaceholderText("Enter host for traceroute")
-        trace_button = QPushButton("Traceroute")
-        trace_button.clicked.connect(self.run_trace)
+        self.trace_input.returnPressed.connect(self.run_trace)
+        self.trace_continuous = QCheckBox("Continuous (mtr)")
+        self.trace_button = QPushButton("Traceroute")
+        self.trace_button.clicked.connect(self.run_trace)
         trace_layout.addWidget(self.trace_input)
-        trace_layout.addWidget(trace_button)
+        trace_layout.addWidget(self.trace_continuous)
+        trace_layout.addWidget(self.trace_button)
         self.layout.addLayout(trace_layout)
         
-        self.trace_output = QTextEdit()
-        self.trace_output.setReadOnly(True)
-        self.layout.addWidget(self.trace_output)
+        self.trace_tree = QTreeWidget()
+        self.trace_tree.setHeaderLabels(["Hop", "Address", "Loss, %", "Sent", "Last, ms", "Avg, ms",
+                                         "Best, ms", "Worst, ms", "StDev, ms"])
+        self.trace_tree.header().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.trace_tree.setRootIsDecorated(False)
+        self.layout.addWidget(self.trace_tree)
+        self.trace_status = QLabel("")
+        self.layout.addWidget(self.trace_status)
+        
+        # Latency monitor section
+        self.layout.addWidget(QLabel("\nLatency Monitor:"))
+        monitor_layout = QHBoxLayout()
+        self.monitor_input = QLineEdit()
+        self.monitor_input.setPlaceholderText("Enter host to monitor continuously")
+        self.monitor_input.returnPressed.connect(self.add_latency_target)
+        self.monitor_add_button = QPushButton("Add")
+        self.monitor_add_button.clicked.connect(self.add_latency_target)
+        self.monitor_remove_button = QPushButton("Remove")
+        self.monitor_remove_button.clicked.connect(self.remove_latency_target)
+        self.monitor_window = QComboBox()
+        self.monitor_window.addItems(list(LATENCY_WINDOWS))
+        monitor_layout.addWidget(self.monitor_input)
+        monitor_layout.addWidget(self.monitor_add_button)
+        monitor_layout.addWidget(self.monitor_remove_button)
+        monitor_layout.addWidget(QLabel("Window:"))
+        monitor_layout.addWidget(self.monitor_window)
+        self.layout.addLayout(monitor_layout)
+        
+        self.latency_tree = QTreeWidget()
+        self.latency_tree.setHeaderLabels(["Target", "Address", "p50, ms", "p95, ms", "p99, ms",
+                                           "Jitter, ms", "Loss, %", "Probes"])
+        self.latency_tree.header().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.latency_tree.setRootIsDecorated(False)
+        self.latency_tree.currentItemChanged.connect(lambda *args: self.update_latency_chart())
+        self.layout.addWidget(self.latency_tree)
         
+        self.latency_status = QLabel("")
+        self.layout.addWidget(self.latency_status)
+        self.latency_chart = LiveChart("p95 latency over the last minute, ms", 'm-',
+                                       capacity=self.LATENCY_POINTS, figsize=(6, 2))
+        self.layout.addWidget(self.latency_chart)
+        
+        self.latency_monitor = LatencyMonitor(self)
+        self.latency_monitor.stats_ready.connect(self.update_latency)
+        self.latency_monitor.regression.connect(self.latency_regression)
+        self.latency_monitor.error.connect(self.latency_error)
+        
+        # Утилиты работают в отдельных процессах и не блокируют GUI;
+        # ping и traceroute могут идти одновременно
+        self.ping_tool = StreamingTool(self)
+        self.ping_tool.line_ready.connect(self.ping_output.append)
+        self.ping_tool.finished.connect(self.ping_finished)
+        # Без ICMP-сокетов (нет root и ping_group_range) - системный traceroute
+        self.native_icmp = icmp_available()
+        self.trace_tool = StreamingTool(self)
+        self.trace_tool.line_ready.connect(self.trace_line)
+        self.trace_tool.finished.connect(self.trace_finished)
+        self.native_trace = NativeTrace(self)
+        self.native_trace.hop_ready.connect(self.show_hop)
+        self.native_trace.route_ready.connect(self.show_route)
+        self.native_trace.finished.connect(self.trace_finished)
+        
+        # Соединения собирает общий сервис в своём потоке; подписка на паузе,
+        # пока не нужен разовый замер или автообновление
+        self.connections_pending = False
+        self.connections_resized = False
+        self.sampler.snapshot_ready.connect(self.show_connections)
+        self.connections_subscription = self.sampler.subscribe(('connections',), None)
+        self.sampler.start()
         self.update_connections()
     
     def update_connections(self):
-        """Update the active connections list"""
-        self.connections_tree.clear()
-        connections = self.diagnostics.get_connections()
-        
-        for conn in connections:
-            item = QTreeWidgetItem(self.connections_tree)
-            item.setText(0, f"{conn['family']}/{conn['type']}")
-            item.setText(1, conn['local_addr'] or "")
-            item.setText(2, conn['remote_addr'] or "")
-            item.setText(3, conn['status'])
-            item.setText(4, str(conn['pid']) if conn['pid'] else "")
+        """Request a fresh connections list from the sampler"""
+        self.connections_pending = True
+        self.sampler.set_interval(self.connections_subscription, self.CONNECTIONS_INTERVAL)
+    
+    def set_connections_auto(self, enabled):
+        if enabled:
+            self.update_connections()
+        else:
+            self._apply_connections_interval()
+    
+    def _apply_connections_interval(self):
+        auto = self.connections_auto.isChecked() and self.tab_active
+        interval = self.CONNECTIONS_INTERVAL if auto or self.connections_pending else None
+        self.sampler.set_interval(self.connections_subscription, interval)
+    
+    def apply_connections_filter(self):
+        """Pass the state and port filter to the collector and refresh"""
+        ports = []
+        for token in self.connections_ports.text().replace(',', ' ').split():
+            if token.isdigit() and 0 < int(token) < 65536 and int(token) not in ports:
+                ports.append(int(token))
+        self.connections_ports.setText(", ".join(map(str, ports)))
+        index = self.connections_state.currentIndex()
+        states = None if index == 0 else (self.CONNECTION_STATES[index - 1],)
+        self.sampler.connection_collector.set_filter(states, ports)
+        self.update_connections()
+    
+    def show_connections(self, snapshot):
+        if 'connections' not in snapshot.updated:
+            return
+        # Разовый замер выполнен - без автообновления подписка снова на паузе
+        self.connections_pending = False
+        self._apply_connections_interval()
+        self.connections_model.apply_snapshot(snapshot.connections)
+        self.connections_label.setText(f"Active Connections: {len(snapshot.connections)} "
+                                       f"({self.sampler.connection_collector.backend})")
+        if not self.connections_resized and snapshot.connections:
+            self.connections_resized = True
+            for column in range(self.connections_model.columnCount()):
+                self.connections_view.resizeColumnToContents(column)
     
     def run_ping(self):
-        """Execute ping command"""
+        """Start ping, or cancel the one in progress"""
+        if self.ping_tool.is_running():
+            self.ping_tool.cancel()
+            return
         host = self.ping_input.text().strip()
         if not host:
             return
-            
-        result = self.diagnostics.ping_host(host)
-        output = result['output']
         
-        if result['success']:
-            stats = result['stats']
-            output += f"\n\nStatistics:\n"
-            output += f"Packet loss: {stats.get('packet_loss', 0)}%\n"
-            output += f"RTT min/avg/max/mdev = {stats.get('rtt_min', 0):.3f}/"
-            output += f"{stats.get('rtt_avg', 0):.3f}/"
-            output += f"{stats.get('rtt_max', 0):.3f}/"
-            output += f"{stats.get('rtt_mdev', 0):.3f} ms"
+        self.ping_output.clear()
+        self.ping_button.setText("Stop")
+        self.ping_tool.start(self.diagnostics.ping_command(host))
+    
+    def ping_finished(self, exit_code, output):
+        self.ping_button.setText("Ping")
+        if self.ping_tool.cancelled:
+            self.ping_output.append("\n[Cancelled]")
+            return
+        if exit_code != 0:
+            return
         
-        self.ping_output.setPlainText(output)
+        stats = self.diagnostics._parse_ping(output)
+        text = f"\nStatistics:\n"
+        text += f"Packet loss: {stats.get('packet_loss', 0)}%\n"
+        text += f"RTT min/avg/max/mdev = {stats.get('rtt_min', 0):.3f}/"
+        text += f"{stats.get('rtt_avg', 0):.3f}/"
+        text += f"{stats.get('rtt_max', 0):.3f}/"
+        text += f"{stats.get('rtt_mdev', 0):.3f} ms"
+        self.ping_output.append(text)
     
     def run_trace(self):
-        """Execute traceroute command"""
+        """Start traceroute, or cancel the one in progress"""
+        for tool in (self.native_trace, self.trace_tool):
+            if tool.is_running():
+                tool.cancel()
+                return
         host = self.trace_input.text().strip()
         if not host:
             return
+        
+        self.trace_tree.clear()
+        continuous = self.trace_continuous.isChecked()
+        if self.native_icmp:
+            self.trace_status.setText(f"Tracing {host}...")
+            self.native_trace.start(host, continuous)
+        elif continuous:
+            self.trace_status.setText("Continuous mode needs ICMP sockets "
+                                      "(root or net.ipv4.ping_group_range)")
+            return
+        else:
+            self.trace_status.setText(f"Running {self.diagnostics.trace_command(host)[0]}...")
+            self.trace_tool.start(self.diagnostics.trace_command(host))
+        self.trace_button.setText("Stop")
+    
+    def trace_line(self, line):
+        """Line of the system traceroute output"""
+        hop = self.diagnostics._parse_trace_line(line)
+        if hop:
+            self.show_hop(HopStats.from_hop(hop).as_dict())
+        elif line.strip():
+            self.trace_status.setText(line.strip())
+    
+    def _hop_item(self, hop):
+        """Row of the hop; hops may arrive out of order"""
+        for index in range(self.trace_tree.topLevelItemCount()):
+            item = self.trace_tree.topLevelItem(index)
+            number = int(item.text(0))
+            if number == hop:
+                return item
+            if number > hop:
+                item = QTreeWidgetItem()
+                self.trace_tree.insertTopLevelItem(index, item)
+                return item
+        return QTreeWidgetItem(self.trace_tree)
+    
+    def show_hop(self, row):
+        item = self._hop_item(row['hop'])
+        item.setText(0, str(row['hop']))
+        address = ", ".join(row['ips']) if row['ips'] else "*"
+        if row['unreachable']:
+            address += " (unreachable)"
+        item.setText(1, address)
+        item.setText(2, f"{row['loss']:.0f}")
+        item.setText(3, str(row['sent']))
+        for column, key in ((4, 'last'), (5, 'avg'), (6, 'best'), (7, 'worst'), (8, 'stdev')):
+            item.setText(column, f"{row[key]:.2f}" if row['received'] else "-")
+    
+    def show_route(self, rows):
+        """mtr cycle: statistics of every hop on the route"""
+        while self.trace_tree.topLevelItemCount() > len(rows):
+            self.trace_tree.takeTopLevelItem(self.trace_tree.topLevelItemCount() - 1)
+        for row in rows:
+            self.show_hop(row)
+        cycles = max((row['sent'] for row in rows), default=0)
+        self.trace_status.setText(f"{self.trace_input.text().strip()}: {cycles} cycles")
+    
+    def trace_finished(self, exit_code, output):
+        self.trace_button.setText("Traceroute")
+        tool = self.sender()
+        if tool is not None and tool.cancelled:
+            self.trace_status.setText(self.trace_status.text() + " [Cancelled]")
+        elif tool is self.native_trace:
+            self.trace_status.setText(output)
+        elif exit_code == 0:
+            self.trace_status.setText(f"Traceroute finished: {self.trace_tree.topLevelItemCount()} hops")
+        else:
+            self.trace_status.setText(output.splitlines()[-1] if output else "Traceroute failed")
+    
+    def set_tab_active(self, active):
+        # Замеры и оповещения идут и в фоне, пропускается только отрисовка;
+        # автообновление соединений в фоне останавливается
+        self.tab_active = active
+        self._apply_connections_interval()
+        if active:
+            self.update_latency_chart()
+    
+    def add_latency_target(self):
+        host = self.monitor_input.text().strip()
+        if not host or host in self.latency_history:
+            return
+        self.latency_history[host] = RingBuffer(self.LATENCY_POINTS)
+        item = QTreeWidgetItem(self.latency_tree, [host, "resolving..."])
+        self.latency_tree.setCurrentItem(item)
+        self.monitor_input.clear()
+        self.latency_monitor.add_target(host)
+    
+    def remove_latency_target(self):
+        item = self.latency_tree.currentItem()
+        if item is None:
+            return
+        host = item.text(0)
+        self.latency_monitor.remove_target(host)
+        self.latency_history.pop(host, None)
+        self.latency_tree.takeTopLevelItem(self.latency_tree.indexOfTopLevelItem(item))
+        self.update_latency_chart()
+    
+    def _latency_item(self, host):
+        for index in range(self.latency_tree.topLevelItemCount()):
+            item = self.latency_tree.topLevelItem(index)
+            if item.text(0) == host:
+                return item
+        return None
+    
+    def update_latency(self, report):
+        """Statistics of all monitored targets from LatencyMonitor"""
+        window = self.monitor_window.currentText()
+        for host, entry in report.items():
+            item = self._latency_item(host)
+            history = self.latency_history.get(host)
+            if item is None or history is None:
+                continue
+            minute = entry['1m']
+            if 'p95' in minute:
+                history.append(time.time(), minute['p95'])
             
-        result = self.diagnostics.trace_route(host)
-        self.trace_output.setPlainText(result['output'])
\ No newline at end of file
+            stats = entry[window]
+            item.setText(1, entry['address'])
+            for column, key in ((2, 'p50'), (3, 'p95'), (4, 'p99'), (5, 'jitter')):
+                item.setText(column, f"{stats[key]:.2f}" if key in stats else "-")
+            item.setText(6, f"{stats['loss']:.1f}")
+            item.setText(7, str(stats['sent']))
+            color = QBrush(QColor(255, 200, 200)) if entry['regressed'] else QBrush()
+            for column in range(self.latency_tree.columnCount()):
+                item.setBackground(column, color)
+        
+        if self.tab_active:
+            self.update_latency_chart()
+    
+    def update_latency_chart(self):
+        item = self.latency_tree.currentItem()
+        history = self.latency_history.get(item.text(0)) if item is not None else None
+        if history is None or not len(history):
+            self.latency_chart.set_data([], [], "")
+            return
+        _, values = history.ordered()
+        # Ось Y подстраивается под худшее значение на графике
+        self.latency_chart.set_ylim(0, max(10.0, float(values.max()) * 1.2))
+        self.latency_chart.set_data(np.arange(len(values)), values, f"{values[-1]:.1f} ms")
+    
+    def latency_regression(self, host, message):
+        self.latency_status.setText(f"⚠ {time.strftime('%H:%M:%S')} {host}: {message}")
+        self.latency_alert.emit(host, message)
+    
+    def latency_error(self, host, message):
+        self.latency_status.setText(f"{host}: {message}" if host else message)
+        item = self._latency_item(host) if host else None
+        if item is not None:
+            item.setText(1, "error")
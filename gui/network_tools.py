@@ -0,0 +1,162 @@
+import asyncio
+import socket
+import sys
+import threading
+import time
+
+from PyQt5.QtCore import QObject, QProcess, pyqtSignal
+
+from icmp_ping import IcmpPinger
+from traceroute import HopStats, MtrSession, trace
+
+# Консольные утилиты Windows пишут в OEM-кодировке
+CONSOLE_ENCODING = 'oem' if sys.platform == 'win32' else 'utf-8'
+
+
+class StreamingTool(QObject):
+    """Запуск консольной утилиты (ping, traceroute) через QProcess.
+
+    Вывод не ждёт завершения процесса: каждая полная строка сразу
+    уходит сигналом line_ready, поэтому GUI не замирает и видит ход
+    работы. Экземпляров может работать сколько угодно одновременно;
+    cancel() прерывает процесс, finished получает код -1.
+    """
+
+    line_ready = pyqtSignal(str)
+    finished = pyqtSignal(int, str)  # код выхода (-1 - отменено или не запустилось), весь вывод
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.process = QProcess(self)
+        self.process.setProcessChannelMode(QProcess.MergedChannels)
+        self.process.readyReadStandardOutput.connect(self._read_output)
+        self.process.finished.connect(self._on_finished)
+        self.process.errorOccurred.connect(self._on_error)
+        self._partial = ""
+        self._lines = []
+        self.cancelled = False
+
+    def is_running(self) -> bool:
+        return self.process.state() != QProcess.NotRunning
+
+    def start(self, command):
+        """command - список аргументов, первый - программа"""
+        if self.is_running():
+            return
+        self._partial = ""
+        self._lines = []
+        self.cancelled = False
+        self.process.start(command[0], command[1:])
+
+    def cancel(self):
+        if self.is_running():
+            self.cancelled = True
+            self.process.kill()
+
+    def _read_output(self):
+        text = self._partial + bytes(self.process.readAllStandardOutput()).decode(CONSOLE_ENCODING, errors='replace')
+        *lines, self._partial = text.replace('\r\n', '\n').split('\n')
+        for line in lines:
+            self._lines.append(line)
+            self.line_ready.emit(line)
+
+    def _on_finished(self, exit_code, exit_status):
+        self._read_output()
+        if self._partial:
+            self._lines.append(self._partial)
+            self.line_ready.emit(self._partial)
+            self._partial = ""
+        crashed = self.cancelled or exit_status != QProcess.NormalExit
+        self.finished.emit(-1 if crashed else exit_code, "\n".join(self._lines))
+
+    def _on_error(self, error):
+        # Программа не найдена или нет прав - finished от QProcess не придёт
+        if error == QProcess.FailedToStart:
+            message = f"Failed to start {self.process.program()}: {self.process.errorString()}"
+            self.line_ready.emit(message)
+            self.finished.emit(-1, message)
+
+
+class NativeTrace(QObject):
+    """Трассировка через ICMP-сокеты в фоновом потоке asyncio.
+
+    Разовый режим шлёт пробы всех TTL сразу и отдаёт шаги hop_ready по
+    мере ответа (не обязательно по порядку). Режим mtr повторяет циклы
+    раз в interval секунд и после каждого отдаёт route_ready - все шаги
+    с накопленной статистикой. Интерфейс как у StreamingTool: start,
+    cancel, is_running, cancelled и finished (-1 - отменено или ошибка).
+    """
+
+    hop_ready = pyqtSignal(dict)    # HopStats.as_dict() одного шага
+    route_ready = pyqtSignal(list)  # mtr: шаги маршрута по порядку
+    finished = pyqtSignal(int, str)  # код (0 - готово, -1 - отменено или ошибка), итог
+
+    def __init__(self, parent=None, max_hops: int = 30, timeout: float = 2.0, interval: float = 1.0):
+        super().__init__(parent)
+        self.max_hops = max_hops
+        self.timeout = timeout
+        self.interval = interval
+        self.cancelled = False
+        self._thread = None
+        self._loop = None
+        self._task = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, host: str, continuous: bool = False):
+        if self.is_running():
+            return
+        self.cancelled = False
+        self._thread = threading.Thread(target=self._run, args=(host, continuous),
+                                        name="traceroute", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        if not self.is_running():
+            return
+        self.cancelled = True
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None:
+            loop.call_soon_threadsafe(task.cancel)
+
+    def _run(self, host, continuous):
+        code, message = asyncio.run(self._main(host, continuous))
+        self._loop = self._task = None
+        self.finished.emit(code, message)
+
+    async def _main(self, host, continuous):
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        hops = []
+        try:
+            # Отмена могла прийти до того, как задача стала известна
+            if self.cancelled:
+                raise asyncio.CancelledError
+            async with IcmpPinger() as pinger:
+                address = await pinger.resolve(host)
+                if continuous:
+                    # Циклы mtr идут до отмены
+                    await self._mtr(pinger, address)
+                async for hop in trace(pinger, address, self.max_hops, timeout=self.timeout):
+                    hops.append(hop)
+                    self.hop_ready.emit(HopStats.from_hop(hop).as_dict())
+        except asyncio.CancelledError:
+            return -1, "Cancelled"
+        except (OSError, socket.gaierror) as e:
+            return -1, f"Trace to {host} failed: {e}"
+
+        last = max(hops, key=lambda hop: hop['hop'], default=None)
+        if last is not None and last['reached']:
+            return 0, f"{host} ({address}) reached in {last['hop']} hops"
+        if last is not None and last['unreachable']:
+            return 0, f"{host} ({address}) unreachable after hop {last['hop']} ({last['ip']})"
+        return 0, f"{host} ({address}) not reached within {self.max_hops} hops"
+
+    async def _mtr(self, pinger, address):
+        session = MtrSession(pinger, address, self.max_hops, self.timeout)
+        while True:
+            started = time.monotonic()
+            await session.run_cycle()
+            self.route_ready.emit(session.rows())
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
@@ -0,0 +1,125 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional
+
+try:
+    import pwd
+except ImportError:  # Windows
+    pwd = None
+
+# Режимы группировки для выпадающего списка: подпись -> режим
+GROUP_MODES = {
+    "Без группировки": None,
+    "Дерево процессов": 'tree',
+    "По имени": 'name',
+    "По пользователю": 'user',
+    "По cgroup": 'cgroup',
+}
+
+
+@dataclass
+class ProcessGroup:
+    """Узел сгруппированного представления: группа или отдельный процесс.
+
+    rss_mb и pss_mb - суммы по всем процессам узла (для дерева - по
+    поддереву). PSS известен только для top-N процессов, поэтому
+    pss_mb - сумма известных значений или None, если их нет.
+    """
+    key: str
+    label: str
+    pid: Optional[int] = None
+    count: int = 0
+    rss_mb: float = 0.0
+    pss_mb: Optional[float] = None
+    children: list = field(default_factory=list)
+
+    def add(self, count: int, rss_mb: float, pss_mb: Optional[float]):
+        self.count += count
+        self.rss_mb += rss_mb
+        if pss_mb is not None:
+            self.pss_mb = pss_mb if self.pss_mb is None else self.pss_mb + pss_mb
+
+
+@lru_cache(maxsize=256)
+def user_name(uid: int) -> str:
+    if uid < 0:
+        return "?"
+    if pwd is not None:
+        try:
+            return pwd.getpwuid(uid).pw_name
+        except KeyError:
+            pass
+    return str(uid)
+
+
+def _leaf(pid: int, name: str, rss_mb: float, details) -> ProcessGroup:
+    node = ProcessGroup(key=f"pid:{pid}", label=name, pid=pid)
+    node.add(1, rss_mb, details.get(pid, (None, None))[0])
+    return node
+
+
+def build_tree(processes, details) -> list:
+    """Дерево процессов с суммами по поддеревьям за O(n).
+
+    Индекс PPID -> дети строится одним проходом; корни - процессы, чей
+    родитель не попал в снимок. Суммы накапливаются от листьев к корням
+    в порядке, обратном обходу в глубину, без рекурсии.
+    """
+    pids = processes.pids.tolist()
+    ppids = processes.ppids.tolist()
+    rss_mb = processes.rss_mb.tolist()
+
+    nodes = [_leaf(pid, name, rss, details) for pid, name, rss in zip(pids, processes.names, rss_mb)]
+    position = {pid: i for i, pid in enumerate(pids)}
+    parents = [position.get(ppid) if ppid != pid else None for pid, ppid in zip(pids, ppids)]
+
+    roots = []
+    for i, parent in enumerate(parents):
+        if parent is None:
+            roots.append(nodes[i])
+        else:
+            nodes[parent].children.append(nodes[i])
+
+    # Обход в глубину: родитель всегда раньше детей
+    order = []
+    stack = [i for i, parent in enumerate(parents) if parent is None]
+    while stack:
+        i = stack.pop()
+        order.append(i)
+        stack.extend(position[child.pid] for child in nodes[i].children)
+
+    for i in reversed(order):
+        parent = parents[i]
+        if parent is not None:
+            node = nodes[i]
+            nodes[parent].add(node.count, node.rss_mb, node.pss_mb)
+    return roots
+
+
+def group_by(processes, details, mode: str) -> list:
+    """Группы по имени, пользователю или cgroup; процессы - дочерние узлы"""
+    if mode == 'name':
+        keys = processes.names
+    elif mode == 'user':
+        keys = [user_name(uid) for uid in processes.uids.tolist()]
+    elif mode == 'cgroup':
+        keys = [cgroup or "?" for cgroup in processes.cgroups]
+    else:
+        raise ValueError(f"Неизвестный режим группировки: {mode}")
+
+    groups = {}
+    for key, (pid, name, rss) in zip(keys, processes.processes()):
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = ProcessGroup(key=f"{mode}:{key}", label=key)
+        leaf = _leaf(pid, name, rss, details)
+        group.children.append(leaf)
+        group.add(1, leaf.rss_mb, leaf.pss_mb)
+    return list(groups.values())
+
+
+def aggregate(processes, details, mode: str) -> list:
+    """Узлы верхнего уровня для режима группировки"""
+    if mode == 'tree':
+        return build_tree(processes, details)
+    return group_by(processes, details, mode)
@@ -0,0 +1,98 @@
+import threading
+import numpy as np
+
+
+class ProcessHistoryStore:
+    """Колоночная история памяти процессов.
+
+    Под каждый процесс выделяется слот - строка в общих массивах
+    времени и RSS фиксированной длины, запись идёт по кругу. Процесс
+    определяется парой (PID, время запуска): если PID достался новому
+    процессу, слот очищается, и его история не склеивается с чужой.
+    Слоты освобождают только завершившиеся процессы (evict_missing());
+    когда живых процессов больше, чем слотов, массивы удваиваются, так
+    что их размер следует за числом процессов в системе.
+    """
+
+    def __init__(self, slots: int = 4096, depth: int = 100):
+        self.slots = slots
+        self.depth = depth
+        self.times = np.zeros((slots, depth), dtype=np.float64)
+        self.rss_mb = np.zeros((slots, depth), dtype=np.float32)
+        self.heads = np.zeros(slots, dtype=np.int32)
+        self.counts = np.zeros(slots, dtype=np.int32)
+        self.starttimes = np.full(slots, np.nan)
+
+        self._index = {}  # {pid: slot}
+        self._free = list(range(slots - 1, -1, -1))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, pid):
+        return pid in self._index
+
+    def _grow(self):
+        """Удваивает число слотов; новые слоты свободны"""
+        old = self.slots
+        self.slots *= 2
+        self.times = np.concatenate([self.times, np.zeros_like(self.times)])
+        self.rss_mb = np.concatenate([self.rss_mb, np.zeros_like(self.rss_mb)])
+        self.heads = np.concatenate([self.heads, np.zeros_like(self.heads)])
+        self.counts = np.concatenate([self.counts, np.zeros_like(self.counts)])
+        self.starttimes = np.concatenate([self.starttimes, np.full(old, np.nan)])
+        self._free.extend(range(self.slots - 1, old - 1, -1))
+
+    def _slot_for(self, pid: int, starttime) -> int:
+        slot = self._index.get(pid)
+        if slot is None:
+            if not self._free:
+                self._grow()
+            slot = self._index[pid] = self._free.pop()
+        elif starttime is None or self.starttimes[slot] == starttime:
+            return slot
+        # Новый процесс или PID, переиспользованный другим процессом
+        self.heads[slot] = 0
+        self.counts[slot] = 0
+        self.starttimes[slot] = np.nan if starttime is None else starttime
+        return slot
+
+    def append(self, pid: int, timestamp: float, rss_mb: float, starttime: float = None):
+        """Добавляет точку в историю процесса; starttime отличает
+        процесс от предыдущего владельца того же PID"""
+        with self._lock:
+            slot = self._slot_for(pid, starttime)
+            head = self.heads[slot]
+            self.times[slot, head] = timestamp
+            self.rss_mb[slot, head] = rss_mb
+            self.heads[slot] = (head + 1) % self.depth
+            self.counts[slot] = min(self.counts[slot] + 1, self.depth)
+
+    def evict(self, pid: int):
+        with self._lock:
+            self._release(pid)
+
+    def _release(self, pid: int):
+        slot = self._index.pop(pid, None)
+        if slot is not None:
+            self.counts[slot] = 0
+            self._free.append(slot)
+
+    def evict_missing(self, alive_pids):
+        """Освобождает слоты процессов, которых нет среди alive_pids"""
+        alive = set(alive_pids)
+        with self._lock:
+            for pid in [pid for pid in self._index if pid not in alive]:
+                self._release(pid)
+
+    def snapshot(self, pid: int):
+        """Согласованная копия истории процесса: (times, rss_mb) по времени"""
+        with self._lock:
+            slot = self._index.get(pid)
+            if slot is None:
+                return np.empty(0), np.empty(0, dtype=np.float32)
+            count = self.counts[slot]
+            head = self.heads[slot]
+            order = (np.arange(head - count, head) % self.depth)
+            return self.times[slot, order], self.rss_mb[slot, order]
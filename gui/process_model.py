@@ -0,0 +1,246 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PyQt5.QtWidgets import QTreeWidget, QTreeWidgetItem, QHeaderView
+from PyQt5.QtGui import QColor
+
+# Роль с "сырым" значением ячейки для сортировки (числа - как числа)
+SORT_ROLE = Qt.UserRole + 1
+
+
+class DiffTableModel(QAbstractTableModel):
+    """Модель таблицы, обновляемая по разнице снимков.
+
+    apply_snapshot() сравнивает новый снимок с текущим по ключу строки и
+    выдаёт только нужные сигналы: удаление исчезнувших строк, вставку
+    новых и dataChanged для изменившихся значений. Сортировка делается
+    прокси-моделью, поэтому порядок строк здесь не важен.
+    """
+
+    COLUMNS = ()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []      # строки - списки значений по COLUMNS
+        self._row_of = {}    # {ключ: индекс строки}
+
+    @staticmethod
+    def row_key(row):
+        """Ключ, по которому строки сопоставляются между снимками"""
+        return row[0]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self._rows[index.row()][index.column()]
+        if role == Qt.DisplayRole:
+            return self.format_value(index.column(), value)
+        if role == SORT_ROLE:
+            return self.sort_value(index.column(), value)
+        return None
+
+    @staticmethod
+    def format_value(column, value):
+        return "—" if value is None else str(value)
+
+    @staticmethod
+    def sort_value(column, value):
+        return value
+
+    @staticmethod
+    def _same(row, new):
+        """Совпадают ли значения строки со снимком с точностью отображения"""
+        for old, value in zip(row, new):
+            if isinstance(old, float) and isinstance(value, float):
+                if round(old, 1) != round(value, 1):
+                    return False
+            elif old != value:
+                return False
+        return True
+
+    def apply_snapshot(self, rows):
+        """Применяет снимок (последовательность строк) инкрементально"""
+        key = self.row_key
+        incoming = {key(row): row for row in rows}
+
+        # 1. Удаляем исчезнувшие строки непрерывными диапазонами с конца
+        removed = sorted((index for row_key, index in self._row_of.items() if row_key not in incoming),
+                         reverse=True)
+        if removed:
+            for first, last in self._ranges(removed):
+                self.beginRemoveRows(QModelIndex(), first, last)
+                del self._rows[first:last + 1]
+                self.endRemoveRows()
+            self._row_of = {key(row): index for index, row in enumerate(self._rows)}
+
+        # 2. Обновляем изменившиеся строки. Данные меняем диапазон за
+        # диапазоном прямо перед сигналом: прокси пересортировывает строки,
+        # считая остальные неизменными
+        changed = []
+        for index, row in enumerate(self._rows):
+            if not self._same(row, incoming[key(row)]):
+                changed.append(index)
+        for first, last in self._ranges(changed):
+            for index in range(first, last + 1):
+                row = self._rows[index]
+                row[:] = incoming[key(row)]
+            self.dataChanged.emit(self.index(first, 0), self.index(last, self.columnCount() - 1),
+                                  [Qt.DisplayRole, SORT_ROLE])
+
+        # 3. Добавляем новые строки в конец
+        added = [list(row) for row_key, row in incoming.items() if row_key not in self._row_of]
+        if added:
+            start = len(self._rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(added) - 1)
+            for offset, row in enumerate(added):
+                self._rows.append(row)
+                self._row_of[key(row)] = start + offset
+            self.endInsertRows()
+
+    @staticmethod
+    def _ranges(rows):
+        """Группирует отсортированные индексы строк в диапазоны (first, last)"""
+        ranges = []
+        for row in rows:
+            if ranges and abs(row - ranges[-1][1]) == 1:
+                ranges[-1][1] = row
+            else:
+                ranges.append([row, row])
+        return [(min(first, last), max(first, last)) for first, last in ranges]
+
+
+class ProcessTableModel(DiffTableModel):
+    """Модель таблицы процессов; строки сопоставляются по PID"""
+
+    COLUMNS = ("PID", "Имя процесса", "RSS (МБ)", "PSS (МБ)", "USS (МБ)")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._highlighted = {}  # {pid: подсказка} - подозрение на утечку
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        pid = self._rows[index.row()][0]
+        if role == Qt.BackgroundRole and pid in self._highlighted:
+            return QColor(255, 220, 200)
+        if role == Qt.ToolTipRole and pid in self._highlighted:
+            return self._highlighted[pid]
+        return super().data(index, role)
+
+    @staticmethod
+    def format_value(column, value):
+        if value is None:
+            return "—"
+        if column >= 2:
+            return f"{value:.1f}"
+        return str(value)
+
+    @staticmethod
+    def sort_value(column, value):
+        # PSS/USS известны не для всех процессов - неизвестные в конец
+        return -1.0 if value is None else value
+
+    def process_at(self, row: int):
+        """(pid, name) процесса в строке исходной модели"""
+        pid, name = self._rows[row][:2]
+        return pid, name
+
+    def set_highlighted(self, leaks: dict):
+        """Подсвечивает процессы {pid: LeakInfo}, сигналя только об изменившихся строках"""
+        highlighted = {pid: f"Утечка? {leak.slope_mb_per_min:+.2f} МБ/мин" for pid, leak in leaks.items()}
+        affected = set(highlighted) ^ set(self._highlighted)
+        affected |= {pid for pid in highlighted if self._highlighted.get(pid) != highlighted[pid]}
+        self._highlighted = highlighted
+        rows = sorted(self._row_of[pid] for pid in affected if pid in self._row_of)
+        for first, last in self._ranges(rows):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, self.columnCount() - 1),
+                                  [Qt.BackgroundRole, Qt.ToolTipRole])
+
+
+class ProcessSortProxy(QSortFilterProxyModel):
+    """Сортировка по сырым значениям с поддержкой обновлений на лету"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(SORT_ROLE)
+        self.setDynamicSortFilter(True)
+
+
+class _GroupItem(QTreeWidgetItem):
+    """Элемент дерева групп с числовой сортировкой"""
+
+    def __lt__(self, other):
+        column = self.treeWidget().sortColumn() if self.treeWidget() else 0
+        mine, theirs = self.data(column, SORT_ROLE), other.data(column, SORT_ROLE)
+        if mine is None or theirs is None:
+            return super().__lt__(other)
+        return mine < theirs
+
+
+class ProcessGroupTree(QTreeWidget):
+    """Сгруппированное представление процессов (см. process_groups).
+
+    Дерево перестраивается целиком на каждый снимок, но раскрытые узлы
+    и выделение восстанавливаются по ключам групп.
+    """
+
+    COLUMNS = ("Группа / процесс", "Процессов", "RSS (МБ)", "PSS (МБ)")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setHeaderLabels(self.COLUMNS)
+        self.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.setSortingEnabled(True)
+        self.sortByColumn(2, Qt.DescendingOrder)
+
+    def show_groups(self, roots):
+        expanded, selected = set(), None
+        stack = [self.topLevelItem(i) for i in range(self.topLevelItemCount())]
+        while stack:
+            item = stack.pop()
+            if item.isExpanded():
+                expanded.add(item.data(0, Qt.UserRole))
+            if item.isSelected():
+                selected = item.data(0, Qt.UserRole)
+            stack.extend(item.child(i) for i in range(item.childCount()))
+
+        self.setUpdatesEnabled(False)
+        self.setSortingEnabled(False)
+        self.clear()
+        stack = [(self.invisibleRootItem(), node) for node in roots]
+        while stack:
+            parent, node = stack.pop()
+            item = _GroupItem(parent)
+            label = f"{node.label} ({node.pid})" if node.pid is not None else node.label
+            values = (label, node.count, node.rss_mb, node.pss_mb)
+            for column, value in enumerate(values):
+                text = value if column == 0 else ProcessTableModel.format_value(column, value)
+                item.setText(column, str(text))
+                item.setData(column, SORT_ROLE, value if value is not None else -1.0)
+            item.setData(0, Qt.UserRole, node.key)
+            item.setData(1, Qt.UserRole, node.pid)
+            if node.key in expanded:
+                item.setExpanded(True)
+            if node.key == selected:
+                item.setSelected(True)
+            stack.extend((item, child) for child in node.children)
+        self.setSortingEnabled(True)
+        self.setUpdatesEnabled(True)
+
+    @staticmethod
+    def process_of(item):
+        """(pid, name) процесса в элементе или None для группы"""
+        pid = item.data(1, Qt.UserRole)
+        if pid is None:
+            return None
+        return pid, item.text(0).rsplit(' (', 1)[0]
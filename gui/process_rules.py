@@ -0,0 +1,138 @@
+import fnmatch
+import re
+
+import numpy as np
+import psutil
+
+from process_groups import user_name
+
+# Символы, превращающие имя в шаблон
+GLOB_CHARS = set('*?[')
+
+
+class _Rule:
+    """Правило после компиляции: предикаты по полям и действие"""
+
+    __slots__ = ('index', 'exclude', 'threshold', 'name', 'name_glob', 'cmdline', 'user', 'cgroup')
+
+    def __init__(self, index: int, spec: dict):
+        self.index = index
+        self.exclude = spec.get('action', 'exclude') == 'exclude'
+        self.threshold = spec.get('threshold')
+        name = spec.get('name')
+        # Точное имя сравнивается без регулярного выражения
+        is_glob = bool(name) and bool(GLOB_CHARS & set(name))
+        self.name = name if name and not is_glob else None
+        self.name_glob = re.compile(fnmatch.translate(name)).match if is_glob else None
+        self.cmdline = re.compile(spec['cmdline']).search if spec.get('cmdline') else None
+        self.user = spec.get('user')
+        cgroup = spec.get('cgroup')
+        self.cgroup = re.compile(fnmatch.translate(cgroup)).match if cgroup else None
+
+    def matches(self, name, user, cgroup, cmdline) -> bool:
+        return ((self.name is None or self.name == name)
+                and (self.name_glob is None or self.name_glob(name) is not None)
+                and (self.user is None or self.user == user)
+                and (self.cgroup is None or self.cgroup(cgroup) is not None)
+                and (self.cmdline is None or self.cmdline(cmdline()) is not None))
+
+
+class ProcessRules:
+    """Скомпилированные правила отбора процессов для оповещений.
+
+    Правило - словарь с действием ('include' или 'exclude'), условиями
+    name (glob), cmdline (regex), user, cgroup (glob) и необязательным
+    собственным порогом threshold в МБ. Срабатывает первое подходящее
+    правило; процессы без правила получают общий порог. Белый список из
+    настроек превращается в exclude-правила по точному имени.
+
+    Правила только с точным именем (типичный белый список из сотен
+    записей) ищутся в словаре за O(1), остальные проверяются по порядку
+    до первого совпадения. Решение запоминается по (имя, хэш cmdline,
+    uid, cgroup), поэтому долгоживущие процессы на каждом снимке стоят
+    одного поиска в словаре, а командная строка читается только если её
+    проверяет какое-нибудь правило.
+    """
+
+    CACHE_LIMIT = 8192
+
+    def __init__(self, rules=(), default_threshold: float = 500):
+        self.default_threshold = default_threshold
+        self._exact = {}    # {имя: первое правило только с этим именем}
+        self._generic = []  # остальные правила по порядку
+        for index, spec in enumerate(rules):
+            rule = _Rule(index, spec)
+            name = spec.get('name')
+            exact = (name and not GLOB_CHARS & set(name)
+                     and not any(spec.get(key) for key in ('cmdline', 'user', 'cgroup')))
+            if exact:
+                self._exact.setdefault(name, rule)
+            else:
+                self._generic.append(rule)
+        self._cache = {}  # {(имя, хэш cmdline, uid, cgroup): порог или nan}
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> 'ProcessRules':
+        whitelist = [{'action': 'exclude', 'name': name} for name in settings.get('whitelist', [])]
+        return cls(whitelist + list(settings.get('rules', [])), settings.get('threshold', 500))
+
+    def threshold_for(self, pid: int, name: str, cmdline_hash: int, uid: int, cgroup: str) -> float:
+        """Порог процесса в МБ; nan - процесс исключён"""
+        key = (name, cmdline_hash, uid, cgroup)
+        threshold = self._cache.get(key)
+        if threshold is not None:
+            return threshold
+
+        rule = self._exact.get(name)
+        user = user_name(uid)
+        cmdline = _lazy_cmdline(pid)
+        for candidate in self._generic:
+            if rule is not None and candidate.index > rule.index:
+                break
+            if candidate.matches(name, user, cgroup, cmdline):
+                rule = candidate
+                break
+
+        if rule is None:
+            threshold = float(self.default_threshold)
+        elif rule.exclude:
+            threshold = float('nan')
+        else:
+            threshold = float(rule.threshold if rule.threshold is not None else self.default_threshold)
+
+        if len(self._cache) >= self.CACHE_LIMIT:
+            self._cache.clear()
+        self._cache[key] = threshold
+        return threshold
+
+    def thresholds(self, processes) -> np.ndarray:
+        """Пороги для всех процессов снимка за один проход (nan - исключён)"""
+        return np.fromiter(
+            (self.threshold_for(pid, name, cmdline_hash, uid, cgroup)
+             for pid, name, cmdline_hash, uid, cgroup in zip(
+                 processes.pids.tolist(), processes.names, processes.cmdline_hashes.tolist(),
+                 processes.uids.tolist(), processes.cgroups)),
+            dtype=np.float64, count=len(processes))
+
+    def over_threshold(self, processes) -> np.ndarray:
+        """Индексы процессов, превысивших свой порог"""
+        with np.errstate(invalid='ignore'):
+            return np.flatnonzero(processes.rss_mb > self.thresholds(processes))
+
+    def excluded(self, processes) -> np.ndarray:
+        """Маска исключённых правилами процессов"""
+        return np.isnan(self.thresholds(processes))
+
+
+def _lazy_cmdline(pid: int):
+    """Командная строка читается при первом обращении и не чаще раза"""
+    value = []
+
+    def cmdline():
+        if not value:
+            try:
+                value.append(' '.join(psutil.Process(pid).cmdline()))
+            except (psutil.Error, OSError):
+                value.append('')
+        return value[0]
+    return cmdline
@@ -0,0 +1,257 @@
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+import psutil
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from cpu_collector import CpuStatsCollector
+from proc_reader import ProcReader, ProcessSnapshot
+from memory_details import MemoryDetailCache
+from disk_info import DiskInfoCollector
+from proc_net import ConnectionCollector
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Неизменяемый снимок состояния системы.
+
+    Каждый вид данных обновляется со своим периодом, поэтому в снимке
+    хранится и время последнего замера каждого вида (sampled), и набор
+    видов, обновлённых именно этим снимком (updated).
+    """
+    timestamp: float = 0.0
+    cpu: Mapping = field(default_factory=lambda: MappingProxyType({}))
+    memory: Mapping = field(default_factory=lambda: MappingProxyType({}))
+    processes: Optional[ProcessSnapshot] = None
+    # {pid: (pss_mb, uss_mb)} для top-N процессов по RSS
+    memory_details: Mapping = field(default_factory=lambda: MappingProxyType({}))
+    # Разделы дисков: кортеж словарей DiskInfoCollector.get_partitions()
+    disk: tuple = ()
+    # {интерфейс: {'rx_rate', 'tx_rate' (байт/с), 'rx_total', 'tx_total', 'errors', 'drops'}}
+    network: Mapping = field(default_factory=lambda: MappingProxyType({}))
+    # {устройство: DiskHealth или None}
+    health: Mapping = field(default_factory=lambda: MappingProxyType({}))
+    # Сокеты TCP/UDP: кортеж proc_net.Connection
+    connections: tuple = ()
+    sampled: Mapping = field(default_factory=lambda: MappingProxyType({}))
+    updated: frozenset = field(default_factory=frozenset)
+
+
+def _freeze(data: dict) -> Mapping:
+    """Делает словарь и вложенные массивы NumPy доступными только для чтения"""
+    for value in data.values():
+        if hasattr(value, 'setflags'):
+            value.setflags(write=False)
+    return MappingProxyType(data)
+
+
+class SamplingService(QObject):
+    """Единый фоновый сборщик метрик для вкладок, оповещений и бота.
+
+    Потребитель подписывается на нужные виды данных с желаемым периодом;
+    каждый вид замеряется один раз за минимальный из запрошенных
+    периодов, сколько бы потребителей его ни ждали. Результат публикуется
+    неизменяемым Snapshot: сигналом snapshot_ready для GUI и через
+    latest()/wait_for() для фоновых потоков.
+    """
+
+    # Порядок важен: memory_details строится по снимку processes,
+    # health - по списку разделов disk
+    KINDS = ('cpu', 'memory', 'processes', 'memory_details', 'disk', 'network', 'health',
+             'connections')
+
+    snapshot_ready = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._tokens = itertools.count(1)
+        self._subscriptions = {}  # {token: (kinds, interval)}
+        self._due = {kind: 0.0 for kind in self.KINDS}
+        self._latest = Snapshot()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+        self.cpu_stats = CpuStatsCollector()
+        self.proc_reader = ProcReader()
+        self.memory_detail_cache = MemoryDetailCache()
+        self.health_analyzer = None  # создаётся при первом замере: ищет smartctl
+        self.connection_collector = ConnectionCollector()
+        self._net_previous = None    # (время, счётчики по интерфейсам)
+
+    # --- Подписки ---
+
+    def subscribe(self, kinds, interval: Optional[float]) -> int:
+        """Запрашивает замер kinds не реже чем раз в interval секунд.
+        interval=None - подписка на паузе (данные не нужны)"""
+        with self._condition:
+            token = next(self._tokens)
+            self._subscriptions[token] = (frozenset(kinds), interval)
+            self._reschedule(kinds)
+            return token
+
+    def set_interval(self, token: int, interval: Optional[float]):
+        with self._condition:
+            kinds, _ = self._subscriptions[token]
+            self._subscriptions[token] = (kinds, interval)
+            self._reschedule(kinds)
+
+    def unsubscribe(self, token: int):
+        with self._condition:
+            self._subscriptions.pop(token, None)
+            self._condition.notify_all()
+
+    def _reschedule(self, kinds):
+        # Новый или ускорившийся подписчик не должен ждать старого периода
+        for kind in kinds:
+            interval = self.interval_for(kind)
+            if interval is not None:
+                last = self._latest.sampled.get(kind, 0.0)
+                self._due[kind] = min(self._due[kind], last + interval)
+        self._condition.notify_all()
+
+    def interval_for(self, kind: str) -> Optional[float]:
+        """Текущий период замера вида: минимум по активным подпискам"""
+        intervals = [interval for kinds, interval in self._subscriptions.values()
+                     if kind in kinds and interval is not None]
+        return min(intervals) if intervals else None
+
+    # --- Чтение ---
+
+    def latest(self) -> Snapshot:
+        return self._latest
+
+    def wait_for(self, kind: str, not_before: float, timeout: float) -> Optional[Snapshot]:
+        """Ждёт снимок, где kind замерен не раньше not_before; None по таймауту"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._latest.sampled.get(kind, 0.0) < not_before:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._running:
+                    return None
+                self._condition.wait(remaining)
+            return self._latest
+
+    # --- Цикл сбора ---
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+        self.proc_reader.close()
+
+    def _sample(self, kind: str, values: dict):
+        if kind == 'cpu':
+            return _freeze(self.cpu_stats.collect())
+        if kind == 'memory':
+            mem = psutil.virtual_memory()
+            return _freeze({'total': mem.total, 'available': mem.available,
+                            'used': mem.used, 'percent': mem.percent})
+        if kind == 'processes':
+            snapshot = self.proc_reader.read()
+            snapshot.measure_cpu(self._latest.processes)
+            for array in (snapshot.pids, snapshot.ppids, snapshot.starttimes, snapshot.rss,
+                          snapshot.cpu_ticks, snapshot.uids, snapshot.cmdline_hashes, snapshot.cpu_percent):
+                array.setflags(write=False)
+            return snapshot
+        if kind == 'memory_details':
+            processes = values.get('processes') or self._latest.processes or self.proc_reader.read()
+            return MappingProxyType(self.memory_detail_cache.update(processes))
+        if kind == 'disk':
+            return tuple(MappingProxyType(part) for part in DiskInfoCollector.get_partitions())
+        if kind == 'network':
+            return self._sample_network()
+        if kind == 'health':
+            return self._sample_health(values.get('disk') or self._latest.disk)
+        if kind == 'connections':
+            return tuple(self.connection_collector.read())
+
+    def _sample_network(self) -> Mapping:
+        now = time.time()
+        counters = psutil.net_io_counters(pernic=True)
+        previous_time, previous = self._net_previous or (now, counters)
+        self._net_previous = (now, counters)
+        elapsed = now - previous_time
+        stats = {}
+        for nic, io in counters.items():
+            before = previous.get(nic, io)
+            stats[nic] = MappingProxyType({
+                'rx_rate': (io.bytes_recv - before.bytes_recv) / elapsed if elapsed > 0 else 0.0,
+                'tx_rate': (io.bytes_sent - before.bytes_sent) / elapsed if elapsed > 0 else 0.0,
+                'rx_total': io.bytes_recv,
+                'tx_total': io.bytes_sent,
+                'errors': io.errin + io.errout,
+                'drops': io.dropin + io.dropout
+            })
+        return MappingProxyType(stats)
+
+    def _sample_health(self, partitions) -> Mapping:
+        # smartctl медленный - вид опрашивается с большим периодом
+        if self.health_analyzer is None:
+            from disk_health import DiskHealthAnalyzer
+            self.health_analyzer = DiskHealthAnalyzer()
+        devices = dict.fromkeys(part['device'] for part in partitions if part.get('device'))
+        return MappingProxyType({device: self.health_analyzer.get_health(device) for device in devices})
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                now = time.time()
+                due = [kind for kind in self.KINDS
+                       if self.interval_for(kind) is not None and self._due[kind] <= now]
+                if not due:
+                    pending = [self._due[kind] for kind in self.KINDS if self.interval_for(kind) is not None]
+                    self._condition.wait(min(pending) - now if pending else None)
+                    continue
+
+            # Замеры идут без блокировки - подписки можно менять параллельно
+            values = {}
+            for kind in due:
+                try:
+                    values[kind] = self._sample(kind, values)
+                except Exception as e:
+                    print(f"Ошибка сбора '{kind}': {e}")
+            now = time.time()
+
+            with self._condition:
+                previous = self._latest
+                sampled = dict(previous.sampled)
+                for kind in values:
+                    sampled[kind] = now
+                for kind in due:
+                    interval = self.interval_for(kind)
+                    self._due[kind] = now + (interval if interval is not None else 0.0)
+                self._latest = Snapshot(
+                    timestamp=now,
+                    cpu=values.get('cpu', previous.cpu),
+                    memory=values.get('memory', previous.memory),
+                    processes=values.get('processes', previous.processes),
+                    memory_details=values.get('memory_details', previous.memory_details),
+                    disk=values.get('disk', previous.disk),
+                    network=values.get('network', previous.network),
+                    health=values.get('health', previous.health),
+                    connections=values.get('connections', previous.connections),
+                    sampled=MappingProxyType(sampled),
+                    updated=frozenset(values)
+                )
+                self._condition.notify_all()
+            try:
+                self.snapshot_ready.emit(self._latest)
+            except RuntimeError:
+                # QObject уже удалён (выход из приложения)
+                return
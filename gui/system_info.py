@@ -1,8 +1,24 @@
 import platform
 import psutil
 import socket
+import time
+
+# Группы рассылки NETLINK_ROUTE: изменения интерфейсов и адресов
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+
 
 class SystemInfoCollector:
+    # Период обновления адресов, если netlink недоступен (не Linux)
+    NETWORK_REFRESH_FALLBACK = 30
+
+    def __init__(self):
+        self._static_info = None
+        self._network_info = None
+        self._network_time = 0.0
+        self._netlink = self._open_netlink()
+
     @staticmethod
     def bytes_to_gb(bytes_value: int) -> float:
         """Convert bytes to gigabytes"""
@@ -61,11 +77,72 @@ class SystemInfoCollector:
         
         return network_info
     
-    def collect_all(self) -> dict:
-        """Collect all system information"""
+    @staticmethod
+    def _open_netlink():
+        """Open a non-blocking NETLINK_ROUTE socket subscribed to link/address changes"""
+        if not hasattr(socket, 'AF_NETLINK'):
+            return None
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.setblocking(False)
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+            return sock
+        except OSError:
+            return None
+
+    def _network_changed(self) -> bool:
+        """Drain pending netlink notifications; True if any interface changed"""
+        if self._netlink is None:
+            return time.monotonic() - self._network_time > self.NETWORK_REFRESH_FALLBACK
+        changed = False
+        while True:
+            try:
+                if not self._netlink.recv(65536):
+                    break
+                changed = True
+            except BlockingIOError:
+                break
+            except OSError:
+                # Переполнение буфера сокета: изменений было много
+                changed = True
+                break
+        return changed
+
+    def invalidate(self):
+        """Drop cached static facts and interface addresses"""
+        self._static_info = None
+        self._network_info = None
+
+    def get_static_info(self) -> dict:
+        """OS facts and core counts, collected once until invalidate()"""
+        if self._static_info is None:
+            self._static_info = {
+                'os': self.get_os_info(),
+                'cpu': {
+                    'physical_cores': psutil.cpu_count(logical=False),
+                    'logical_cores': psutil.cpu_count(logical=True)
+                }
+            }
+        return self._static_info
+
+    def get_cached_network_info(self) -> dict:
+        """Interface addresses, re-read only after a netlink change"""
+        if self._network_changed() or self._network_info is None:
+            self._network_info = self.get_network_info()
+            self._network_time = time.monotonic()
+        return self._network_info
+
+    def compose(self, cpu: dict, memory: dict) -> dict:
+        """Combine cached static facts and addresses with sampled CPU/memory"""
+        static = self.get_static_info()
         return {
-            'os': self.get_os_info(),
-            'cpu': self.get_cpu_info(),
-            'memory': self.get_memory_info(),
-            'network': self.get_network_info()
-        }
\ No newline at end of file
+            'os': static['os'],
+            'cpu': {**static['cpu'], **cpu},
+            'memory': memory,
+            'network': self.get_cached_network_info()
+        }
+
+    def collect_all(self) -> dict:
+        """Collect all system information. The tabs compose the sampler's
+        snapshot instead; this standalone path keeps no CPU delta state"""
+        return self.compose(self.get_cpu_info(), self.get_memory_info())
\ No newline at end of file
@@ -1,21 +1,34 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QSplitter, QTextEdit
-from PyQt5.QtCore import QTimer, Qt
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-from collections import deque
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QSplitter, QTextEdit, QComboBox, QLabel
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QTextCursor
+import time
 import psutil
 import platform
 import socket
 from system_info import SystemInfoCollector
+from charts import LiveChart, CoreHeatStrip
+from metrics_history import MetricHistory, HISTORY_WINDOWS
+from sampling_service import SamplingService
+from metrics_archive import MetricsArchive
 
 class SystemTab(QWidget):
-    def __init__(self):
+    # Период сбора, сек: на экране и в фоне (история продолжает копиться)
+    ACTIVE_INTERVAL = 1.0
+    BACKGROUND_INTERVAL = 5.0
+
+    def __init__(self, sampler: SamplingService = None, archive: MetricsArchive = None):
         super().__init__()
+        self.sampler = sampler or SamplingService()
+        self.archive = archive
         self.info_collector = SystemInfoCollector()
-        # Очереди для хранения истории значений
-        self.cpu_history = deque(maxlen=60)
-        self.mem_history = deque(maxlen=60)
+        # История значений с несколькими разрешениями (до 24 часов)
+        self.cpu_history = MetricHistory()
+        self.mem_history = MetricHistory()
+        self.load_archived_history()
+        self.history_window = HISTORY_WINDOWS['1 минута']
+        self.tab_active = True
+        # Строки, показанные в info_text в прошлый раз
+        self.info_lines = []
         self.init_ui()
     
     def init_ui(self):
@@ -31,42 +44,44 @@ class SystemTab(QWidget):
         
         # Нижняя часть - графики
         graph_widget = QWidget()
-        graph_layout = QHBoxLayout(graph_widget)
+        graph_box = QVBoxLayout(graph_widget)
+        
+        # Выбор окна истории
+        window_layout = QHBoxLayout()
+        window_layout.addWidget(QLabel("Окно истории:"))
+        self.window_selector = QComboBox()
+        self.window_selector.addItems(HISTORY_WINDOWS.keys())
+        self.window_selector.currentTextChanged.connect(self.set_history_window)
+        window_layout.addWidget(self.window_selector)
+        window_layout.addStretch()
+        graph_box.addLayout(window_layout)
+        
+        graph_layout = QHBoxLayout()
+        graph_box.addLayout(graph_layout)
         
         # График CPU
-        self.cpu_fig = Figure(figsize=(6, 3))
-        self.cpu_canvas = FigureCanvas(self.cpu_fig)
-        self.cpu_ax = self.cpu_fig.add_subplot(111)
-        self.cpu_ax.set_title('Использование CPU (%)')
-        self.cpu_ax.set_ylim(0, 100)
-        self.cpu_ax.set_xlim(0, 60)
-        self.cpu_ax.grid(True)
-        self.cpu_line, = self.cpu_ax.plot([], [], 'b-')
-        graph_layout.addWidget(self.cpu_canvas)
+        self.cpu_chart = LiveChart('Использование CPU (%)', 'b-')
+        self.cpu_chart.set_xlim(-self.history_window, 0)
+        graph_layout.addWidget(self.cpu_chart)
         
         # График памяти
-        self.mem_fig = Figure(figsize=(6, 3))
-        self.mem_canvas = FigureCanvas(self.mem_fig)
-        self.mem_ax = self.mem_fig.add_subplot(111)
-        self.mem_ax.set_title('Использование памяти (%)')
-        self.mem_ax.set_ylim(0, 100)
-        self.mem_ax.set_xlim(0, 60)
-        self.mem_ax.grid(True)
-        self.mem_line, = self.mem_ax.plot([], [], 'r-')
-        graph_layout.addWidget(self.mem_canvas)
+        self.mem_chart = LiveChart('Использование памяти (%)', 'r-')
+        self.mem_chart.set_xlim(-self.history_window, 0)
+        graph_layout.addWidget(self.mem_chart)
         
         splitter.addWidget(graph_widget)
-        splitter.setSizes([300, 200])
         
-        main_layout.addWidget(splitter)
+        # Полоса загрузки по ядрам
+        self.core_strip = CoreHeatStrip()
+        splitter.addWidget(self.core_strip)
+        splitter.setSizes([300, 200, 40])
         
-        # Настройка таймера для обновления данных
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_info)
-        self.timer.start(1000)  # Обновление каждую секунду
+        main_layout.addWidget(splitter)
         
-        # Первоначальное обновление
-        self.update_info()
+        # Данные приходят от общего сервиса сбора
+        self.sampler.snapshot_ready.connect(self.update_info)
+        self.subscription = self.sampler.subscribe(('cpu', 'memory'), self.ACTIVE_INTERVAL)
+        self.sampler.start()
     
     def format_info(self, info: dict) -> str:
         """Format system information for display"""
@@ -87,6 +102,16 @@ class SystemTab(QWidget):
         text.append(f"Physical cores: {cpu_info['physical_cores']}")
         text.append(f"Logical cores: {cpu_info['logical_cores']}")
         text.append(f"Current usage: {cpu_info['usage_percent']}%")
+        load_avg = cpu_info['load_avg']
+        text.append(f"Load average: {load_avg[0]:.2f} {load_avg[1]:.2f} {load_avg[2]:.2f}")
+        text.append(f"Context switches: {cpu_info['ctx_switches_per_sec']:.0f}/s")
+        text.append(f"Interrupts: {cpu_info['interrupts_per_sec']:.0f}/s")
+        if cpu_info['freq_mhz'] is not None and len(cpu_info['freq_mhz']):
+            freq = cpu_info['freq_mhz']
+            text.append(f"Frequency: {freq.min():.0f}-{freq.max():.0f} MHz")
+        text.append(f"Max core: {cpu_info['busy'].max(initial=0):.1f}% "
+                    f"(iowait {cpu_info['iowait'].max(initial=0):.1f}%, "
+                    f"steal {cpu_info['steal'].max(initial=0):.1f}%)")
         
         # Memory Info
         mem_info = info['memory']
@@ -109,36 +134,85 @@ class SystemTab(QWidget):
         
         return "\n".join(text)
     
-    def update_info(self):
-        """Обновление информации и графиков"""
-        # Сбор данных
-        info = self.info_collector.collect_all()
-        cpu_percent = info['cpu']['usage_percent']
-        mem_percent = info['memory']['percent']
-        
+    def update_info(self, snapshot):
+        """Обновление информации и графиков по снимку сервиса сбора"""
+        if 'cpu' not in snapshot.updated or not snapshot.memory:
+            return
         # Обновление истории
-        self.cpu_history.append(cpu_percent)
-        self.mem_history.append(mem_percent)
+        self.cpu_history.append(snapshot.cpu['usage_percent'], snapshot.timestamp)
+        self.mem_history.append(snapshot.memory['percent'], snapshot.timestamp)
+        if self.archive:
+            self.archive.record('cpu', snapshot.timestamp, snapshot.cpu['usage_percent'])
+            self.archive.record('memory', snapshot.timestamp, snapshot.memory['percent'])
+        
+        # Скрытая вкладка только копит историю
+        if not self.tab_active:
+            return
+        
+        info = self.info_collector.compose(snapshot.cpu, snapshot.memory)
+        self.core_strip.set_values(info['cpu']['busy'])
         
         # Обновление текстовой информации
-        self.info_text.setPlainText(self.format_info(info))
+        self.render_info(self.format_info(info).split("\n"))
         
         # Обновление графиков
         self.update_cpu_plot()
         self.update_mem_plot()
 
+    def load_archived_history(self):
+        """Подгружает из архива историю до запуска (в том числе до падения)"""
+        if not self.archive:
+            return
+        start = time.time() - max(HISTORY_WINDOWS.values())
+        for series, history in (('cpu', self.cpu_history), ('memory', self.mem_history)):
+            times, values = self.archive.query(series, start)
+            for timestamp, value in zip(times.tolist(), values.tolist()):
+                history.append(value, timestamp)
+
+    def set_tab_active(self, active: bool):
+        """Вызывается TabScheduler при смене видимости вкладки"""
+        self.tab_active = active
+        self.sampler.set_interval(self.subscription,
+                                  self.ACTIVE_INTERVAL if active else self.BACKGROUND_INTERVAL)
+        if active:
+            self.update_cpu_plot()
+            self.update_mem_plot()
+
+    def render_info(self, lines: list):
+        """Перерисовывает в info_text только изменившиеся строки"""
+        if len(lines) != len(self.info_lines):
+            # Изменилась структура (например, интерфейсы) - полная замена
+            self.info_text.setPlainText("\n".join(lines))
+        else:
+            document = self.info_text.document()
+            for number, (old, new) in enumerate(zip(self.info_lines, lines)):
+                if old == new:
+                    continue
+                cursor = QTextCursor(document.findBlockByNumber(number))
+                cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+                cursor.insertText(new)
+        self.info_lines = lines
+
+    def set_history_window(self, label: str):
+        """Смена окна истории графиков"""
+        self.history_window = HISTORY_WINDOWS[label]
+        for chart in (self.cpu_chart, self.mem_chart):
+            chart.set_xlim(-self.history_window, 0)
+        self.update_cpu_plot()
+        self.update_mem_plot()
+
+    def plot_history(self, chart: LiveChart, history: MetricHistory):
+        """Рисует окно истории, прореженное LTTB до ширины графика"""
+        if not len(history):
+            return
+        now = time.time()
+        times, values = history.query(self.history_window, chart.pixel_width(), now)
+        chart.set_data(times - now, values, f'{history.last()}%')
+
     def update_cpu_plot(self):
         """Обновление графика использования CPU"""
-        if self.cpu_history:
-            self.cpu_ax.set_title(f'Использование CPU: {self.cpu_history[-1]}%')
-            self.cpu_line.set_data(range(len(self.cpu_history)), list(self.cpu_history))
-            self.cpu_ax.set_xlim(0, max(10, len(self.cpu_history)))
-            self.cpu_canvas.draw()
+        self.plot_history(self.cpu_chart, self.cpu_history)
 
     def update_mem_plot(self):
         """Обновление графика использования памяти"""
-        if self.mem_history:
-            self.mem_ax.set_title(f'Использование памяти: {self.mem_history[-1]}%')
-            self.mem_line.set_data(range(len(self.mem_history)), list(self.mem_history))
-            self.mem_ax.set_xlim(0, max(10, len(self.mem_history)))
-            self.mem_canvas.draw()
\ No newline at end of file
+        self.plot_history(self.mem_chart, self.mem_history)
@@ -0,0 +1,40 @@
+from PyQt5.QtCore import QObject, QEvent
+
+
+class TabScheduler(QObject):
+    """Сообщает вкладкам, видны ли они пользователю.
+
+    Видимой считается только текущая вкладка, и то пока окно не свёрнуто.
+    Вкладка, которой это важно, реализует set_tab_active(active) и сама
+    решает, что делать в фоне: остановить таймеры или замедлить сбор
+    данных, не тратя время на отрисовку.
+    """
+
+    def __init__(self, window, tabs):
+        super().__init__(window)
+        self.window = window
+        self.tabs = tabs
+        self._active = {}
+
+        tabs.currentChanged.connect(self.update_visibility)
+        window.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if obj is self.window and event.type() in (QEvent.WindowStateChange, QEvent.Show, QEvent.Hide):
+            self.update_visibility()
+        return False
+
+    def update_visibility(self, *args):
+        """Пересчитывает активность всех вкладок"""
+        window_visible = self.window.isVisible() and not self.window.isMinimized()
+        current = self.tabs.currentWidget()
+
+        for index in range(self.tabs.count()):
+            tab = self.tabs.widget(index)
+            active = window_visible and tab is current
+            # Уведомляем только об изменениях
+            if self._active.get(index) == active:
+                continue
+            self._active[index] = active
+            if hasattr(tab, 'set_tab_active'):
+                tab.set_tab_active(active)
@@ -0,0 +1,269 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_URL = "https://api.telegram.org"
+
+
+class TelegramError(Exception):
+    """Bot API ответил ошибкой, которую нет смысла повторять"""
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate токенов в секунду, запас capacity.
+
+    acquire() резервирует токен (счётчик может уйти в минус) и спит
+    ровно столько, сколько нужно до его появления, поэтому очередь из
+    нескольких потоков обслуживается по порядку без активного ожидания.
+    penalize() запрещает отправку на время retry_after после HTTP 429.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Занимает токен; возвращает, сколько секунд нужно подождать"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate, self._blocked_until - now)
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+    def penalize(self, seconds: float):
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+class TelegramClient:
+    """HTTP-клиент Bot API с пулом соединений и учётом лимитов Telegram.
+
+    Один requests.Session на клиента держит keep-alive соединения, так
+    что TCP и TLS рукопожатия не повторяются на каждое сообщение. Все
+    запросы идут с таймаутами; сетевые ошибки и 5xx повторяются с
+    экспоненциальной задержкой со случайным разбросом, а 429 - через
+    retry_after из ответа. Таймаут чтения повторяется только у
+    идемпотентных методов: отправку сообщения Telegram к этому моменту,
+    скорее всего, уже принял, и повтор её продублирует. Отправка
+    сообщений проходит через общий ограничитель (30 в секунду) и
+    ограничитель чата (1 в секунду для личных чатов, 20 в минуту для
+    групп).
+    """
+
+    GLOBAL_RATE = 30.0
+    PRIVATE_CHAT_RATE = (1.0, 1.0)   # (токенов в секунду, запас)
+    GROUP_CHAT_RATE = (20 / 60, 3.0)
+    # Методы, повтор которых после отправленного запроса создаёт дубликат
+    NON_IDEMPOTENT = frozenset({'sendMessage', 'sendPhoto'})
+
+    def __init__(self, token: str, base_url: str = API_URL, timeout=(5.0, 10.0),
+                 retries: int = 3, backoff: float = 0.5, pool_size: int = 4,
+                 rate_limits: bool = True):
+        self.token = token
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout  # (соединение, чтение)
+        self.retries = retries
+        self.backoff = backoff
+        self.rate_limits = rate_limits
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._global_bucket = TokenBucket(self.GLOBAL_RATE, self.GLOBAL_RATE)
+        self._chat_buckets = {}  # {chat_id: TokenBucket}
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        with self._lock:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                # У групп и каналов id отрицательный
+                rate, capacity = self.GROUP_CHAT_RATE if str(chat_id).startswith('-') else self.PRIVATE_CHAT_RATE
+                bucket = self._chat_buckets[chat_id] = TokenBucket(rate, capacity)
+            return bucket
+
+    def call(self, method: str, params: dict = None, chat_id=None, read_timeout: float = None,
+             files: dict = None, retry_read_timeout: bool = None) -> dict:
+        """Вызов метода Bot API; возвращает поле result.
+
+        retry_read_timeout - повторять ли запрос после таймаута чтения
+        (None - только для методов не из NON_IDEMPOTENT). Бросает
+        TelegramError при отказе API и requests.RequestException, если
+        сеть не ответила и после всех повторов.
+        """
+        if retry_read_timeout is None:
+            retry_read_timeout = method not in self.NON_IDEMPOTENT
+        url = f"{self.base_url}/bot{self.token}/{method}"
+        timeout = (self.timeout[0], read_timeout or self.timeout[1])
+        buckets = [self._global_bucket] if chat_id is not None else []
+        if chat_id is not None:
+            buckets.append(self._chat_bucket(chat_id))
+
+        # Токен лимита тратится на сообщение, а не на каждый сетевой повтор
+        need_token = self.rate_limits
+        for attempt in range(self.retries + 1):
+            if need_token:
+                for bucket in buckets:
+                    bucket.acquire()
+                need_token = False
+            try:
+                response = self.session.post(url, data=params, files=files, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # ConnectTimeout - наследник ConnectionError: запрос не ушёл
+                read_timeout_error = not isinstance(e, requests.ConnectionError)
+                if attempt == self.retries or (read_timeout_error and not retry_read_timeout):
+                    raise
+                self._sleep_backoff(attempt)
+                continue
+
+            if response.status_code == 429:
+                retry_after = self._retry_after(response)
+                for bucket in buckets or [self._global_bucket]:
+                    bucket.penalize(retry_after)
+                if attempt == self.retries:
+                    raise TelegramError(f"{method}: превышен лимит запросов (retry_after={retry_after})")
+                if buckets and self.rate_limits:
+                    need_token = True  # ограничитель сам выдержит паузу
+                else:
+                    time.sleep(retry_after)
+                continue
+            if response.status_code >= 500:
+                if attempt == self.retries:
+                    raise TelegramError(f"{method}: HTTP {response.status_code}")
+                self._sleep_backoff(attempt)
+                continue
+
+            try:
+                data = response.json()
+            except ValueError:
+                raise TelegramError(f"{method}: некорректный ответ HTTP {response.status_code}")
+            if not data.get('ok'):
+                raise TelegramError(f"{method}: {data.get('description', response.status_code)}")
+            return data.get('result')
+
+    def _sleep_backoff(self, attempt: int):
+        # Разброс не даёт нескольким потокам повторять запросы синхронно
+        time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    @staticmethod
+    def _retry_after(response) -> float:
+        try:
+            return float(response.json().get('parameters', {}).get('retry_after', 1))
+        except (ValueError, AttributeError):
+            return 1.0
+
+    def send_message(self, chat_id, text: str) -> bool:
+        try:
+            self.call('sendMessage', {'chat_id': chat_id, 'text': text}, chat_id=chat_id)
+            return True
+        except (TelegramError, requests.RequestException) as e:
+            print(f"Ошибка отправки: {e}")
+            return False
+
+    def send_photo(self, chat_id, png: bytes, caption: str = None) -> bool:
+        """Отправка PNG; подпись Telegram ограничивает 1024 символами"""
+        params = {'chat_id': chat_id}
+        if caption:
+            params['caption'] = caption[:1024]
+        try:
+            self.call('sendPhoto', params, chat_id=chat_id,
+                      files={'photo': ('chart.png', png, 'image/png')})
+            return True
+        except (TelegramError, requests.RequestException) as e:
+            print(f"Ошибка отправки изображения: {e}")
+            return False
+
+    def get_updates(self, offset: int, timeout: int = 30) -> list:
+        """Long polling: соединение держится timeout секунд"""
+        return self.call('getUpdates', {'offset': offset, 'timeout': timeout},
+                         read_timeout=timeout + 5) or []
+
+
+def run_stub_server(latency: float = 0.0, limit_every: int = 0):
+    """Локальная замена Bot API для замеров: отвечает ok на любой метод.
+    limit_every > 0 - каждый такой запрос получает 429 с retry_after=1.
+    Возвращает (сервер, базовый URL)"""
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    counter = {'requests': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            with lock:
+                counter['requests'] += 1
+                limited = limit_every and counter['requests'] % limit_every == 0
+            if latency:
+                time.sleep(latency)
+            if limited:
+                status, body = 429, {'ok': False, 'error_code': 429, 'parameters': {'retry_after': 1}}
+            else:
+                status, body = 200, {'ok': True, 'result': {'message_id': counter['requests']}}
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def benchmark(messages: int = 300, latency: float = 0.002):
+    """Пропускная способность и задержка: requests.post без сессии
+    против TelegramClient (ограничители отключены, чтобы мерить транспорт)"""
+    import statistics
+
+    server, base_url = run_stub_server(latency)
+    try:
+        def measure(send):
+            latencies = []
+            start = time.perf_counter()
+            for i in range(messages):
+                began = time.perf_counter()
+                send(i)
+                latencies.append((time.perf_counter() - began) * 1000)
+            total = time.perf_counter() - start
+            return messages / total, statistics.median(latencies), sorted(latencies)[int(messages * 0.99) - 1]
+
+        url = f"{base_url}/botTOKEN/sendMessage"
+        plain = measure(lambda i: requests.post(url, data={'chat_id': 1, 'text': str(i)}, timeout=5))
+        client = TelegramClient('TOKEN', base_url, rate_limits=False)
+        pooled = measure(lambda i: client.send_message(1, str(i)))
+        client.close()
+
+        for label, (rate, median, p99) in (("requests.post", plain), ("TelegramClient", pooled)):
+            print(f"{label:15s} {rate:7.0f} сообщ/с, медиана {median:.2f} мс, p99 {p99:.2f} мс")
+        return plain, pooled
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -5,15 +5,30 @@ import requests
 import json
 import os
 from PyQt5.QtCore import QObject, pyqtSignal
+from sampling_service import SamplingService
+from alert_dispatcher import AlertDispatcher, AlertEvent
+from process_rules import ProcessRules
+import bot_reports
+from chart_renderer import ChartRenderer, parse_window, CHART_SERIES
+from cooldown_store import CooldownStore, cooldown_key
+from telegram_client import TelegramClient, TelegramError
 
 
 class TelegramBotManager(QObject):
     """Расширенный класс для управления Telegram ботом"""
+    # Периоды фонового сбора данных для команд /top, /disk, /net и /health, сек.
+    # Команды отвечают из последнего снимка и сами ничего не опрашивают
+    REPORT_INTERVAL = 60
+    HEALTH_INTERVAL = 1800
     update_status_signal = pyqtSignal(bool)  # Сигнал статуса мониторинга
     alert_signal = pyqtSignal(str, str)  # Сигнал уведомлений (заголовок, сообщение)
 
-    def __init__(self, settings_path="telegram_settings.json"):
+    def __init__(self, settings_path="telegram_settings.json", sampler: SamplingService = None,
+                 archive=None):
         super().__init__()
+        self.sampler = sampler or SamplingService()
+        # Графики истории из архива метрик для /chart и уведомлений
+        self.charts = ChartRenderer(archive)
         self.settings_path = settings_path
         self.settings = self.load_settings()
         self.bot_thread = None
@@ -21,7 +36,24 @@ class TelegramBotManager(QObject):
         self.is_running = False
         self.last_update_id = 0
         self._monitoring_active = False
-        self.notification_cooldown = {}  # {process_key: last_notification_time}
+        # Время последних уведомлений с истечением и ограничением размера
+        self.notification_cooldown = CooldownStore(self.settings['cooldown_time'],
+                                                   self.settings['cooldown_max_entries'])
+        self._client = None
+        self.rules = ProcessRules.from_settings(self.settings)
+        self.report_subscriptions = []
+        # Уведомления уходят через очередь с дайджестами, не блокируя мониторинг
+        self.alerts = AlertDispatcher(self.send_alert,
+                                      digest_interval=self.settings['digest_interval'])
+
+    @property
+    def client(self) -> TelegramClient:
+        """Общий HTTP-клиент Bot API; пересоздаётся при смене токена"""
+        if self._client is None or self._client.token != self.settings['bot_token']:
+            if self._client is not None:
+                self._client.close()
+            self._client = TelegramClient(self.settings['bot_token'])
+        return self._client
 
     def load_settings(self):
         """Загрузка настроек с дефолтными значениями"""
@@ -32,7 +64,15 @@ class TelegramBotManager(QObject):
             'interval': 30,  # Интервал проверки в секундах
             'auto_start': False,  # Автозапуск мониторинга
             'whitelist': [],  # Исключенные процессы
-            'cooldown_time': 3600  # Время между уведомлениями (1 час)
+            'rules': [],  # Правила отбора процессов (см. ProcessRules)
+            'cooldown_time': 3600,  # Время между уведомлениями (1 час)
+            'cooldown_key': 'name',  # Ключ кулдауна: name, cmdline или cgroup
+            'cooldown_max_entries': 1024,  # Предел числа ключей кулдауна
+            'leak_window': 600,  # Окно детектора утечек, сек
+            'leak_min_slope': 1.0,  # Минимальный рост, МБ/мин
+            'leak_min_score': 0.8,  # Доля замеров с ростом памяти
+            'digest_interval': 60,  # Период сводки повторных уведомлений, сек
+            'alert_charts': True  # Прикладывать к уведомлениям график CPU и памяти
         }
 
         if os.path.exists(self.settings_path):
@@ -57,8 +97,13 @@ class TelegramBotManager(QObject):
         else:
             self.stop_monitoring()
 
+    def reload_rules(self):
+        """Перекомпилирует правила после изменения настроек"""
+        self.rules = ProcessRules.from_settings(self.settings)
+
     def save_settings(self):
         """Сохранение настроек в файл"""
+        self.reload_rules()
         try:
             os.makedirs(os.path.dirname(self.settings_path), exist_ok=True)
             with open(self.settings_path, 'w') as f:
@@ -78,6 +123,11 @@ class TelegramBotManager(QObject):
             return True
 
         self.is_running = True
+        self.report_subscriptions = [
+            self.sampler.subscribe(('processes', 'disk', 'network'), self.REPORT_INTERVAL),
+            self.sampler.subscribe(('disk', 'health'), self.HEALTH_INTERVAL)
+        ]
+        self.sampler.start()
         self.bot_thread = threading.Thread(target=self.bot_loop, daemon=True)
         self.bot_thread.start()
 
@@ -91,6 +141,9 @@ class TelegramBotManager(QObject):
         """Полная остановка бота и мониторинга"""
         self.is_running = False
         self.monitoring_active = False
+        for subscription in self.report_subscriptions:
+            self.sampler.unsubscribe(subscription)
+        self.report_subscriptions = []
 
         if self.bot_thread and self.bot_thread.is_alive():
             self.bot_thread.join(timeout=1.0)
@@ -113,83 +166,98 @@ class TelegramBotManager(QObject):
 
     def monitor_loop(self):
         """Основной цикл мониторинга потребления памяти"""
+        self.sampler.start()
+        subscription = self.sampler.subscribe(('processes',), self.settings['interval'])
+        last_sampled = 0.0
         while self._monitoring_active:
             try:
-                # Сбор информации о процессах
-                processes = []
-                for proc in psutil.process_iter(['pid', 'name', 'memory_info']):
-                    try:
-                        mem_mb = proc.info['memory_info'].rss / (1024 * 1024)
-                        if mem_mb > self.settings['threshold']:
-                            processes.append({
-                                'name': proc.info['name'],
-                                'pid': proc.info['pid'],
-                                'memory': f"{mem_mb:.2f} MB"
-                            })
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        continue
-
-                # Фильтрация белого списка
-                processes = [p for p in processes
-                             if p['name'] not in self.settings['whitelist']]
-
-                # Отправка уведомлений с кулдауном
-                current_time = time.time()
-                for proc in processes:
-                    process_key = f"{proc['name']}_{proc['pid']}"
-
-                    # Проверка времени последнего уведомления
-                    last_notified = self.notification_cooldown.get(process_key, 0)
-                    if current_time - last_notified > self.settings['cooldown_time']:
-                        message = (
-                            f"⚠️ Высокое потребление памяти!\n"
-                            f"Процесс: {proc['name']}\n"
-                            f"PID: {proc['pid']}\n"
-                            f"Память: {proc['memory']}"
-                        )
-                        self.send_telegram_message(message)
-                        self.notification_cooldown[process_key] = current_time
-
-                time.sleep(self.settings['interval'])
+                self.sampler.set_interval(subscription, self.settings['interval'])
+                snapshot = self.sampler.wait_for('processes', last_sampled + self.settings['interval'], timeout=1.0)
+                if snapshot is None or snapshot.processes is None:
+                    continue
+                last_sampled = snapshot.sampled['processes']
+
+                # Правила (белый список, собственные пороги) применяются
+                # одним проходом по снимку
+                processes = snapshot.processes
+                self.notification_cooldown.ttl = self.settings['cooldown_time']
+                for i in self.rules.over_threshold(processes).tolist():
+                    name, pid = processes.names[i], int(processes.pids[i])
+
+                    # Ключ не зависит от PID: перезапущенный сервис остаётся в кулдауне
+                    process_key = cooldown_key(self.settings['cooldown_key'], name,
+                                               int(processes.cmdline_hashes[i]), processes.cgroups[i])
+                    if self.notification_cooldown.allow(process_key):
+                        memory = f"{processes.rss[i] / (1024 * 1024):.2f} MB"
+                        self.alerts.submit(AlertEvent(
+                            rule='threshold',
+                            key=process_key,
+                            title="⚠️ Высокое потребление памяти!",
+                            text=(
+                                f"Процесс: {name}\n"
+                                f"PID: {pid}\n"
+                                f"Память: {memory}"
+                            ),
+                            summary=f"{name} ({pid}): {memory}"
+                        ))
 
             except Exception as e:
                 print(f"Ошибка мониторинга: {e}")
                 time.sleep(10)
 
+        self.sampler.unsubscribe(subscription)
+
     def send_telegram_message(self, message):
         """Отправка сообщения через Telegram API"""
-        if not self.settings.get('chat_id'):
+        if not self.settings.get('bot_token') or not self.settings.get('chat_id'):
             return False
 
-        try:
-            url = f"https://api.telegram.org/bot{self.settings['bot_token']}/sendMessage"
-            response = requests.post(url, data={
-                'chat_id': self.settings['chat_id'],
-                'text': message
-            })
-            return response.json().get('ok', False)
-        except Exception as e:
-            print(f"Ошибка отправки: {e}")
+        return self.client.send_message(self.settings['chat_id'], message)
+
+    def send_alert(self, message):
+        """Уведомление с графиком CPU и памяти за последний час, если он есть"""
+        if not self.settings.get('bot_token') or not self.settings.get('chat_id'):
             return False
+        # График рисуется, только когда его есть куда отправить
+        png = self.charts.render('system', 3600) if self.settings.get('alert_charts') else None
+        if png is None:
+            return self.send_telegram_message(message)
+        if len(message) <= 1024:
+            return self.client.send_photo(self.settings['chat_id'], png, message)
+        # Длинный дайджест не помещается в подпись - текст отдельно
+        return self.send_telegram_message(message) and self.client.send_photo(self.settings['chat_id'], png)
+
+    def send_chart(self, chat_id, args):
+        """/chart [system|cpu|memory] [15m|6h|1d]"""
+        metric = next((arg for arg in args if arg in CHART_SERIES), 'system')
+        window = next((parse_window(arg) for arg in args if arg not in CHART_SERIES), 3600)
+        png = self.charts.render(metric, window)
+        if png is None:
+            self.client.send_message(chat_id, "⏳ В архиве метрик пока нет данных за этот период")
+        else:
+            self.client.send_photo(chat_id, png)
+
+    def report_for(self, command: str, args):
+        """Ответ на команду-отчёт из последнего снимка или None"""
+        snapshot = self.sampler.latest()
+        if command == '/top':
+            count = int(args[0]) if args and args[0].isdigit() else 10
+            return bot_reports.format_top(snapshot, count)
+        if command == '/disk':
+            return bot_reports.format_disk(snapshot)
+        if command == '/net':
+            return bot_reports.format_net(snapshot)
+        if command == '/health':
+            return bot_reports.format_health(snapshot)
+        return None
 
     def bot_loop(self):
         """Цикл обработки команд Telegram бота"""
-        base_url = f"https://api.telegram.org/bot{self.settings['bot_token']}/"
-
         while self.is_running:
             try:
-                response = requests.get(
-                    f"{base_url}getUpdates",
-                    params={'timeout': 30, 'offset': self.last_update_id + 1},
-                    timeout=35
-                )
-                data = response.json()
-
-                if not data.get('ok'):
-                    time.sleep(5)
-                    continue
+                updates = self.client.get_updates(self.last_update_id + 1, timeout=30)
 
-                for update in data['result']:
+                for update in updates:
                     self.last_update_id = update['update_id']
                     message = update.get('message', {})
                     text = message.get('text', '').strip().lower()
@@ -198,6 +266,16 @@ class TelegramBotManager(QObject):
                         continue
 
                     chat_id = message['chat']['id']
+                    # "/top 5" или "/top@имя_бота" в группах
+                    command, *args = text.split()
+                    command = command.split('@')[0]
+                    if command == '/chart':
+                        self.send_chart(chat_id, args)
+                        continue
+                    report = self.report_for(command, args)
+                    if report is not None:
+                        self.client.send_message(chat_id, report)
+                        continue
 
                     # Обработка команд
                     if text == '/start':
@@ -206,7 +284,8 @@ class TelegramBotManager(QObject):
                         self.monitoring_active = True
                         self.send_telegram_message(
                             "✅ Мониторинг запущен!\n"
-                            "Бот будет присылать уведомления о процессах с высоким потреблением памяти."
+                            "Бот будет присылать уведомления о процессах с высоким потреблением памяти.\n"
+                            "Отчёты: /top [N], /disk, /net, /health, /chart [cpu|memory] [1h]"
                         )
 
                     elif text == '/stop':
@@ -220,6 +299,7 @@ class TelegramBotManager(QObject):
                             f"• Интервал: {self.settings['interval']} сек\n"
                             f"• Кулдаун: {self.settings['cooldown_time'] // 60} мин\n"
                             f"• Белый список: {', '.join(self.settings['whitelist']) or 'нет'}\n"
+                            f"• Правил отбора: {len(self.settings['rules'])}\n"
                             f"• Мониторинг: {'АКТИВЕН' if self.monitoring_active else 'неактивен'}"
                         )
                         self.send_telegram_message(status)
@@ -275,6 +355,9 @@ class TelegramBotManager(QObject):
             except requests.RequestException as e:
                 print(f"Ошибка сети: {e}")
                 time.sleep(10)
+            except TelegramError as e:
+                print(f"Ошибка Bot API: {e}")
+                time.sleep(5)
             except Exception as e:
                 print(f"Ошибка бота: {e}")
                 time.sleep(5)
\ No newline at end of file
@@ -0,0 +1,203 @@
+import asyncio
+import math
+from typing import Dict, List, Optional
+
+from icmp_ping import ICMP_DEST_UNREACHABLE, ICMP_ECHO_REPLY, IcmpPinger
+
+
+class HopStats:
+    """Статистика шага маршрута в стиле mtr при постоянной памяти:
+    счётчики, последнее/лучшее/худшее и среднее с дисперсией (Уэлфорд)"""
+
+    MAX_ADDRESSES = 4  # балансировщики дают на шаге несколько адресов
+
+    def __init__(self, hop: int):
+        self.hop = hop
+        self.sent = 0
+        self.received = 0
+        self.last = math.nan
+        self.best = math.inf
+        self.worst = 0.0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.addresses = []  # недавние первыми
+        self.reached = False
+        self.unreachable = False
+
+    @classmethod
+    def from_hop(cls, hop: Dict) -> 'HopStats':
+        """Из шага trace() или NetworkDiagnostics._parse_trace"""
+        stats = cls(hop['hop'])
+        for address in reversed(hop.get('ips') or ([hop['ip']] if hop.get('ip') else [])):
+            stats._add_address(address)
+        for rtt in hop['times']:
+            stats.add(rtt)
+        stats.sent = max(hop.get('sent', 0), len(hop['times']))
+        stats.reached = hop.get('reached', False)
+        stats.unreachable = hop.get('unreachable', False)
+        return stats
+
+    def _add_address(self, address: str):
+        if address in self.addresses:
+            self.addresses.remove(address)
+        self.addresses.insert(0, address)
+        del self.addresses[self.MAX_ADDRESSES:]
+
+    def add(self, rtt: Optional[float], responder: Optional[str] = None):
+        """Результат пробы: RTT в мс или None - ответа не было"""
+        self.sent += 1
+        if rtt is None:
+            return
+        self.received += 1
+        self.last = rtt
+        self.best = min(self.best, rtt)
+        self.worst = max(self.worst, rtt)
+        delta = rtt - self.mean
+        self.mean += delta / self.received
+        self._m2 += delta * (rtt - self.mean)
+        if responder:
+            self._add_address(responder)
+
+    def as_dict(self) -> Dict:
+        received = self.received
+        return {
+            'hop': self.hop,
+            'ip': self.addresses[0] if self.addresses else None,
+            'ips': list(self.addresses),
+            'sent': self.sent,
+            'received': received,
+            'loss': 100.0 * (self.sent - received) / self.sent if self.sent else 0.0,
+            'last': self.last,
+            'avg': self.mean if received else math.nan,
+            'best': self.best if received else math.nan,
+            'worst': self.worst if received else math.nan,
+            'stdev': math.sqrt(self._m2 / received) if received else math.nan,
+            'reached': self.reached,
+            'unreachable': self.unreachable,
+        }
+
+
+def format_hop(hop: Dict) -> str:
+    """Строка шага в духе traceroute -n: адреса, времена, '*' за потери"""
+    lost = max(hop.get('sent', 0) - len(hop['times']), 0)
+    fields = list(hop['ips']) + [f"{rtt:.3f} ms" for rtt in hop['times']] + ['*'] * lost
+    if hop.get('unreachable'):
+        fields.append('!H')
+    return f"{hop['hop']:2d}  " + "  ".join(fields)
+
+
+async def _probe_hop(pinger: IcmpPinger, address: str, ttl: int, queries: int,
+                     timeout: float, spacing: float) -> Dict:
+    """queries проб с одним TTL; пробы разных шагов идут одновременно"""
+    async def one(index):
+        if index:
+            # Маршрутизаторы ограничивают частоту time exceeded - не шлём пачкой
+            await asyncio.sleep(index * spacing)
+        return await pinger.probe(address, timeout, ttl)
+
+    replies = await asyncio.gather(*(one(index) for index in range(queries)))
+    ips = []
+    for reply in replies:
+        if reply is not None and reply.responder not in ips:
+            ips.append(reply.responder)
+    return {
+        'hop': ttl,
+        'ip': ips[0] if ips else None,
+        'ips': ips,
+        'times': [reply.rtt for reply in replies if reply is not None],
+        'sent': queries,
+        'reached': any(reply is not None and reply.kind == ICMP_ECHO_REPLY for reply in replies),
+        'unreachable': any(reply is not None and reply.kind == ICMP_DEST_UNREACHABLE for reply in replies),
+    }
+
+
+async def trace(pinger: IcmpPinger, address: str, max_hops: int = 30, queries: int = 3,
+                timeout: float = 2.0, spacing: float = 0.05):
+    """Трассировка с пробами всех TTL сразу; асинхронный генератор шагов.
+
+    Шаги выдаются по мере готовности, не обязательно по порядку.
+    Промежуточный маршрутизатор выдаётся сразу; шаг без ответов или с
+    ответом самого адреса - только когда готовы все шаги ниже: до этого
+    неизвестно, не лежит ли он уже за концом маршрута. Как только конец
+    найден, пробы дальних TTL отменяются.
+    """
+    tasks = {asyncio.ensure_future(_probe_hop(pinger, address, ttl, queries, timeout, spacing)): ttl
+             for ttl in range(1, max_hops + 1)}
+    results = {}
+    emitted = set()
+    end = None  # TTL, на котором маршрут закончился
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled():
+                    results[tasks[task]] = task.result()
+
+            lower_done = 0  # все шаги до этого TTL включительно готовы
+            while lower_done + 1 in results:
+                lower_done += 1
+            for ttl in sorted(results):
+                if ttl in emitted or (end is not None and ttl > end):
+                    continue
+                hop = results[ttl]
+                final = hop['reached'] or hop['unreachable']
+                if (hop['ips'] and not final) or ttl <= lower_done:
+                    emitted.add(ttl)
+                    yield hop
+                    if final:
+                        end = ttl
+            if end is not None:
+                for task in pending:
+                    if tasks[task] > end:
+                        task.cancel()
+                pending = {task for task in pending if tasks[task] <= end}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class MtrSession:
+    """Непрерывная трассировка в стиле mtr.
+
+    Каждый цикл - по одной пробе на все TTL одновременно; результаты
+    копятся в HopStats шага. Когда конец маршрута найден, дальние TTL
+    больше не опрашиваются, пока маршрут не удлинится.
+    """
+
+    def __init__(self, pinger: IcmpPinger, address: str, max_hops: int = 30, timeout: float = 2.0):
+        self.pinger = pinger
+        self.address = address
+        self.max_hops = max_hops
+        self.timeout = timeout
+        self.hops = {}  # {TTL: HopStats}
+        self.end = None
+        self.cycles = 0
+
+    async def run_cycle(self):
+        last = self.max_hops if self.end is None else self.end
+        replies = await asyncio.gather(*(self.pinger.probe(self.address, self.timeout, ttl)
+                                         for ttl in range(1, last + 1)))
+        self.cycles += 1
+        final = [ttl for ttl, reply in enumerate(replies, start=1)
+                 if reply is not None and reply.kind in (ICMP_ECHO_REPLY, ICMP_DEST_UNREACHABLE)]
+        if final:
+            self.end = final[0]
+        elif self.end is not None and replies[-1] is not None:
+            # На прежнем последнем шаге теперь маршрутизатор - маршрут удлинился
+            self.end = None
+        for ttl, reply in enumerate(replies, start=1):
+            stats = self.hops.get(ttl)
+            if stats is None:
+                stats = self.hops[ttl] = HopStats(ttl)
+            stats.add(reply.rtt if reply else None, reply.responder if reply else None)
+            if reply is not None:
+                stats.reached = reply.kind == ICMP_ECHO_REPLY
+                stats.unreachable = reply.kind == ICMP_DEST_UNREACHABLE
+        # Шаги за концом маршрута - повторы самого адреса
+        if self.end is not None:
+            for ttl in [ttl for ttl in self.hops if ttl > self.end]:
+                del self.hops[ttl]
+
+    def rows(self) -> List[Dict]:
+        return [self.hops[ttl].as_dict() for ttl in sorted(self.hops)]
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Модули приложения импортируют друг друга как модули верхнего уровня
+# (так их запускает main.py и собирает PyInstaller)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gui'))
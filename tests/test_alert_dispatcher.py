@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+
+import pytest
+
+from alert_dispatcher import AlertDispatcher, AlertEvent
+from tgBotManager import TelegramBotManager
+
+
+class Outbox:
+    """Отправленные тексты с ожиданием нужного их числа"""
+
+    def __init__(self):
+        self.texts = []
+        self._changed = threading.Condition()
+
+    def __call__(self, text):
+        with self._changed:
+            self.texts.append(text)
+            self._changed.notify_all()
+        return True
+
+    def wait(self, count, timeout=2.0):
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.texts) >= count, timeout)
+        return self.texts
+
+
+def event(key, rule='leak'):
+    return AlertEvent(rule=rule, key=key, title="Утечка", text=f"Процесс {key}", summary=f"{key}: рост")
+
+
+@pytest.fixture
+def outbox():
+    return Outbox()
+
+
+def test_first_event_goes_out_at_once(outbox):
+    dispatcher = AlertDispatcher(outbox, digest_interval=60)
+    dispatcher.submit(event('a'))
+    assert outbox.wait(1) == ["Утечка\nПроцесс a"]
+    dispatcher.stop()
+
+
+def test_followers_are_coalesced_into_one_digest(outbox):
+    dispatcher = AlertDispatcher(outbox, digest_interval=0.3)
+    dispatcher.submit(event('a'))
+    outbox.wait(1)
+    for key in ('b', 'c', 'b'):
+        dispatcher.submit(event(key))
+    # Повтор ключа заменяет событие, а не добавляет строку
+    texts = outbox.wait(2)
+    assert texts[1] == "Утечка — 2 шт.\n• b: рост\n• c: рост"
+    time.sleep(0.4)
+    assert len(outbox.texts) == 2
+    dispatcher.stop()
+
+
+def test_rules_have_separate_digests(outbox):
+    dispatcher = AlertDispatcher(outbox, digest_interval=60)
+    dispatcher.submit(event('a', rule='leak'))
+    dispatcher.submit(event('b', rule='threshold'))
+    assert sorted(outbox.wait(2)) == ["Утечка\nПроцесс a", "Утечка\nПроцесс b"]
+    dispatcher.stop()
+
+
+def test_stop_flushes_pending_digest(outbox):
+    dispatcher = AlertDispatcher(outbox, digest_interval=60, max_items=2)
+    dispatcher.submit(event('a'))
+    outbox.wait(1)
+    for key in 'bcde':
+        dispatcher.submit(event(key))
+    dispatcher.stop()
+    assert outbox.texts[1] == "Утечка — 4 шт.\n• b: рост\n• c: рост\n… и ещё 2"
+    assert not any(thread.is_alive() for thread in dispatcher._threads)
+
+
+def test_send_errors_do_not_stop_delivery(outbox):
+    calls = []
+
+    def flaky(text):
+        calls.append(text)
+        if len(calls) == 1:
+            raise OSError("network down")
+        outbox(text)
+
+    dispatcher = AlertDispatcher(flaky, digest_interval=0)
+    dispatcher.submit(event('a'))
+    dispatcher.submit(event('b', rule='threshold'))
+    assert len(outbox.wait(1)) == 1
+    dispatcher.stop()
+
+
+def test_full_queue_drops_events(outbox):
+    dispatcher = AlertDispatcher(outbox, digest_interval=60, max_queue=1)
+    dispatcher.stop()  # поток разбора остановлен - очередь никто не читает
+    assert dispatcher.submit(event('a'))
+    assert not dispatcher.submit(event('b'))
+    assert dispatcher.dropped == 1
+
+
+class FakeClient:
+    """Клиент Bot API, записывающий отправку вместо сети"""
+
+    def __init__(self, token):
+        self.token = token
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+        return True
+
+    def send_photo(self, chat_id, png, caption=None):
+        self.sent.append((chat_id, caption))
+        return True
+
+    def close(self):
+        pass
+
+
+def bot_manager(tmp_path, **settings):
+    path = tmp_path / 'telegram_settings.json'
+    path.write_text(json.dumps({'bot_token': '', 'chat_id': '', 'alert_charts': False,
+                                'digest_interval': 60, **settings}))
+    manager = TelegramBotManager(str(path))
+    manager._client = FakeClient(manager.settings['bot_token'])
+    return manager
+
+
+@pytest.mark.parametrize('settings', [{}, {'bot_token': 'token'}, {'chat_id': '42'}])
+def test_unconfigured_bot_sends_nothing(tmp_path, settings):
+    manager = bot_manager(tmp_path, **settings)
+    client = manager._client
+    manager.alerts.submit(event('a'))
+    manager.alerts.stop()
+    assert client.sent == []
+
+
+def test_configured_bot_delivers_through_client(tmp_path):
+    manager = bot_manager(tmp_path, bot_token='token', chat_id='42')
+    client = manager._client
+    manager.alerts.submit(event('a'))
+    manager.alerts.submit(event('b'))
+    manager.alerts.stop()
+    assert client.sent == [('42', "Утечка\nПроцесс a"), ('42', "Утечка\nПроцесс b")]
@@ -0,0 +1,60 @@
+import pytest
+
+from cooldown_store import CooldownStore, cooldown_key
+
+
+def test_repeat_is_blocked_until_ttl_expires():
+    store = CooldownStore(ttl=60)
+    assert store.allow('a', now=1000)
+    assert not store.allow('a', now=1030)
+    # Граница включительна: ровно через ttl ещё кулдаун
+    assert not store.allow('a', now=1060)
+    assert store.allow('a', now=1060.5)
+
+
+def test_blocked_attempt_does_not_extend_cooldown():
+    store = CooldownStore(ttl=60)
+    store.allow('a', now=0)
+    assert not store.allow('a', now=59)
+    assert store.allow('a', now=61)
+
+
+def test_expired_entries_are_dropped():
+    store = CooldownStore(ttl=10)
+    for i in range(5):
+        store.allow(f'k{i}', now=i)
+    assert len(store) == 5
+    store.allow('new', now=13)
+    # Истекли k0..k2 (13 - 2 > 10), остались k3, k4 и новый
+    assert len(store) == 3
+    assert not store.allow('k3', now=13)
+
+
+def test_lru_eviction_at_max_size():
+    store = CooldownStore(ttl=3600, max_size=3)
+    for i, key in enumerate('abcd'):
+        assert store.allow(key, now=i)
+    assert len(store) == 3
+    # Вытеснена самая давняя запись
+    assert store.allow('a', now=10)
+    assert not store.allow('c', now=10)
+    assert not store.allow('d', now=10)
+
+
+def test_clear():
+    store = CooldownStore()
+    store.allow('a', now=0)
+    store.clear()
+    assert len(store) == 0
+    assert store.allow('a', now=1)
+
+
+@pytest.mark.parametrize('mode, cgroup, expected', [
+    ('name', '/system.slice/nginx.service', 'name:nginx'),
+    ('cmdline', '', 'cmd:00abcdef'),
+    ('cgroup', '/system.slice/nginx.service', 'cg:/system.slice/nginx.service'),
+    # Без cgroup (не Linux) - по имени
+    ('cgroup', '', 'name:nginx'),
+])
+def test_cooldown_key(mode, cgroup, expected):
+    assert cooldown_key(mode, 'nginx', 0xabcdef, cgroup) == expected
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from latency_monitor import LatencyHistogram
+
+H = LatencyHistogram
+
+
+def test_small_values_are_exact():
+    for us in range(2 * H.SUB_COUNT):
+        assert H.bucket_index(us) == us
+        assert H.bucket_lower(us) == us
+
+
+def test_value_lies_inside_its_bucket():
+    values = list(range(5000)) + [2 ** k + d for k in range(12, 36) for d in (-1, 0, 1)]
+    for us in values:
+        index = H.bucket_index(us)
+        assert H.bucket_lower(index) <= us < H.bucket_lower(index + 1)
+
+
+def test_bucket_bounds_are_contiguous_and_monotonic():
+    lowers = [H.bucket_lower(i) for i in range(H.bucket_index(60_000_000) + 2)]
+    assert all(b > a for a, b in zip(lowers, lowers[1:]))
+    for index, lower in enumerate(lowers[:-1]):
+        assert H.bucket_index(lower) == index
+        assert H.bucket_index(lowers[index + 1] - 1) == index
+
+
+def test_relative_bucket_width():
+    for index in range(2 * H.SUB_COUNT, H.bucket_index(60_000_000)):
+        lower, upper = H.bucket_lower(index), H.bucket_lower(index + 1)
+        assert (upper - lower) / lower <= 1 / H.SUB_COUNT
+
+
+def test_quantiles_of_uniform_distribution():
+    histogram = H(slot_seconds=10, slots=6)
+    rtts = np.linspace(1.0, 100.0, 1000)
+    for i, rtt in enumerate(rtts):
+        histogram.record(i * 0.01, float(rtt))
+    stats = histogram.stats(60, now=10)
+    assert stats['sent'] == stats['received'] == 1000
+    assert stats['loss'] == 0.0
+    for name, q in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+        assert stats[name] == pytest.approx(np.quantile(rtts, q), rel=1 / H.SUB_COUNT)
+
+
+def test_loss_and_jitter():
+    histogram = H(slot_seconds=10, slots=6)
+    for i, rtt in enumerate([10.0, None, 20.0, 10.0, None]):
+        histogram.record(i, rtt)
+    stats = histogram.stats(60, now=5)
+    assert (stats['sent'], stats['received']) == (5, 3)
+    assert stats['loss'] == pytest.approx(40.0)
+    # |20 - 10| и |10 - 20|: потерянные пробы джиттер не разрывают
+    assert stats['jitter'] == pytest.approx(10.0)
+
+
+def test_no_replies():
+    histogram = H()
+    histogram.record(0, None)
+    stats = histogram.stats(60, now=1)
+    assert stats == {'sent': 1, 'received': 0, 'loss': 100.0}
+
+
+def test_values_above_max_land_in_last_bucket():
+    histogram = H(max_ms=1000)
+    histogram.record(0, 5000.0)
+    assert histogram.counts[:, -1].sum() == 1
+    assert histogram.stats(60, now=1)['p50'] <= 1100
+
+
+def test_windows_and_offset():
+    histogram = H(slot_seconds=10, slots=6)
+    for t in range(0, 60):
+        histogram.record(t, 100.0 if t < 30 else 1.0)
+    recent = histogram.stats(30, now=59)
+    earlier = histogram.stats(30, now=59, offset=30)
+    assert recent['sent'] == earlier['sent'] == 30
+    assert recent['p50'] == pytest.approx(1.0, rel=0.05)
+    assert earlier['p50'] == pytest.approx(100.0, rel=0.05)
+
+
+def test_ring_reuses_expired_slots():
+    histogram = H(slot_seconds=10, slots=3)
+    histogram.record(0, 50.0)
+    histogram.record(15, 50.0)
+    # Кадр 3 занимает строку кадра 0 и стирает его
+    histogram.record(30, 5.0)
+    assert histogram.stats(30, now=35)['sent'] == 2
+    assert histogram.stats(100, now=35)['sent'] == 2
+    assert histogram.stats(10, now=35)['p50'] == pytest.approx(5.0, rel=0.05)
+    # Окно, целиком ушедшее из кольца, пусто
+    assert histogram.stats(10, now=100)['sent'] == 0
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from leak_detector import LeakDetector
+
+
+def feed(detector, values, pid=1, starttime=0.0, step=30.0, start=0.0):
+    """Замеры раз в step секунд; результаты update() по порядку"""
+    return [detector.update(pid, starttime, start + i * step, value) for i, value in enumerate(values)]
+
+
+def test_constant_slope_alerts_once():
+    detector = LeakDetector(window=10, min_slope=1.0, min_score=0.8)
+    # 2 МБ за 30 с - 4 МБ/мин
+    results = feed(detector, [100 + 2 * i for i in range(30)])
+    alerts = [(i, r) for i, r in enumerate(results) if r is not None]
+    # Сигнал, как только окно заполнилось, и больше не повторяется
+    assert [i for i, _ in alerts] == [9]
+    info = alerts[0][1]
+    assert info.pid == 1
+    assert info.slope_mb_per_min == pytest.approx(4.0)
+    assert info.growth_score == pytest.approx(1.0)
+    assert info.growth_mb == pytest.approx(18.0)
+    assert detector.flagged()[1].slope_mb_per_min == pytest.approx(4.0)
+
+
+def test_flat_series_does_not_alert():
+    detector = LeakDetector(window=10)
+    assert not any(feed(detector, [250.0] * 40))
+    assert detector.flagged() == {}
+
+
+def test_noisy_series_does_not_alert():
+    rng = random.Random(1)
+    detector = LeakDetector(window=20, min_slope=1.0, min_score=0.8)
+    assert not any(feed(detector, [300 + rng.uniform(-20, 20) for _ in range(200)]))
+
+
+def test_steep_but_irregular_growth_needs_score():
+    detector = LeakDetector(window=10, min_slope=1.0, min_score=0.8)
+    # Рост ступенями: наклон большой, но память растёт лишь на каждом третьем шаге
+    values = [100 + 30 * (i // 3) for i in range(30)]
+    assert not any(feed(detector, values))
+
+
+def test_window_eviction_clears_flag():
+    detector = LeakDetector(window=10, min_slope=1.0, min_score=0.8)
+    growth = [100 + 2 * i for i in range(10)]
+    assert feed(detector, growth)[-1] is not None
+    # Плато вытесняет рост из окна - подозрение снимается
+    flat = feed(detector, [growth[-1]] * 10, start=300.0)
+    assert not any(flat)
+    assert detector.flagged() == {}
+    # Новый эпизод роста снова даёт сигнал
+    results = feed(detector, [growth[-1] + 2 * i for i in range(1, 11)], start=600.0)
+    assert sum(r is not None for r in results) == 1
+
+
+def test_sums_stay_exact_over_long_runs():
+    detector = LeakDetector(window=10, min_slope=1.0, min_score=0.8)
+    feed(detector, [500.0] * 5000)
+    # После тысяч вытеснений окно считается так же, как свежее
+    results = feed(detector, [500 + 2 * i for i in range(1, 11)], start=5000 * 30.0)
+    assert sum(r is not None for r in results) == 1
+    # Окно целиком из роста: наклон точно как у свежего ряда
+    assert detector.flagged()[1].slope_mb_per_min == pytest.approx(4.0)
+
+
+def test_reused_pid_is_a_new_process():
+    detector = LeakDetector(window=10, min_slope=1.0, min_score=0.8)
+    feed(detector, [100 + 2 * i for i in range(5)], starttime=10.0)
+    # Другой процесс с тем же PID: его окно не продолжает чужое
+    assert not any(feed(detector, [300 + 2 * i for i in range(9)], starttime=20.0, start=150.0))
+
+
+def test_forget_missing():
+    detector = LeakDetector(window=5)
+    feed(detector, [100 + 5 * i for i in range(5)], pid=1)
+    feed(detector, [100.0] * 5, pid=2)
+    assert set(detector.flagged()) == {1}
+    detector.forget_missing([(2, 0.0)])
+    assert detector.flagged() == {}
+    assert list(detector._series) == [(2, 0.0)]
@@ -0,0 +1,151 @@
+import math
+import os
+import time
+
+import numpy as np
+import pytest
+
+from metrics_archive import (BLOCK_HEADER, NAME_LENGTH, MetricsArchive, decode_payload, encode_block,
+                             iter_blocks)
+
+
+def decode(block: bytes):
+    (_, payload), = iter_blocks(block)
+    size = NAME_LENGTH.unpack_from(payload)[0]
+    return payload[NAME_LENGTH.size:NAME_LENGTH.size + size].decode(), \
+        decode_payload(payload, NAME_LENGTH.size + size)
+
+
+@pytest.mark.parametrize('times, values', [
+    ([1700000000.0], [42.5]),
+    ([1700000000.0 + i for i in range(100)], [30.0] * 100),
+    # Неравномерный шаг и откат назад: дельта дельт со знаком
+    ([10.0, 10.5, 13.25, 12.0, 100.0], [0.0, -1.5, 1e300, 5e-324, 99.9]),
+    ([0.001 * i for i in range(50)], [math.sin(i) for i in range(50)]),
+])
+def test_block_round_trip(times, values):
+    name, (decoded_times, decoded_values) = decode(encode_block('rss/имя/42', times, values))
+    assert name == 'rss/имя/42'
+    assert decoded_times == pytest.approx(times, abs=1e-3)
+    # Значения восстанавливаются бит в бит
+    assert decoded_values.tobytes() == np.asarray(values, dtype=np.float64).tobytes()
+
+
+def test_special_values_round_trip():
+    values = [float('inf'), float('-inf'), -0.0, 0.0, float('nan')]
+    _, (_, decoded) = decode(encode_block('x', [1.0, 2.0, 3.0, 4.0, 5.0], values))
+    assert decoded.tobytes() == np.asarray(values, dtype=np.float64).tobytes()
+
+
+def test_empty_block():
+    _, (times, values) = decode(encode_block('x', [], []))
+    assert len(times) == len(values) == 0
+
+
+def test_regular_series_compresses():
+    count = 3600
+    block = encode_block('cpu', [1700000000.0 + i for i in range(count)], [25.0] * count)
+    # Равномерное время и неизменное значение - по два байта на точку
+    assert len(block) < count * 2 + 64
+
+
+def test_crc_mismatch_stops_iteration():
+    first = encode_block('a', [1.0, 2.0], [1.0, 2.0])
+    second = bytearray(encode_block('b', [1.0, 2.0], [3.0, 4.0]))
+    second[BLOCK_HEADER.size + 4] ^= 0xFF
+    blocks = list(iter_blocks(first + bytes(second) + encode_block('c', [1.0], [1.0])))
+    assert [end for end, _ in blocks] == [len(first)]
+
+
+@pytest.mark.parametrize('cut', [1, BLOCK_HEADER.size, BLOCK_HEADER.size + 3])
+def test_torn_tail_is_ignored(cut):
+    first = encode_block('a', [1.0], [1.0])
+    second = encode_block('a', [2.0], [2.0])
+    blocks = list(iter_blocks(first + second[:-cut]))
+    assert len(blocks) == 1
+
+
+def test_bad_magic_stops_iteration():
+    block = bytearray(encode_block('a', [1.0], [1.0]))
+    block[0] = 0
+    assert list(iter_blocks(bytes(block))) == []
+
+
+# Недавнее начало минутного сегмента: при смене сегмента архив удаляет
+# вышедшие за срок хранения, отсчитывая его от текущего времени
+BASE = int(time.time()) // 3600 * 3600 - 3600
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = MetricsArchive(str(tmp_path), segment_seconds=60, flush_interval=3600)
+    yield archive
+    archive.close()
+
+
+def test_query_across_flushes_and_segments(archive):
+    for second in range(150):
+        archive.record('a', BASE + second, second)
+        archive.record('b', BASE + second, -second)
+        if second % 5 == 4:
+            archive.flush()
+    archive.flush()
+
+    times, values = archive.query('a', BASE, BASE + 149)
+    assert times.tolist() == list(range(BASE, BASE + 150))
+    assert values.tolist() == list(range(150))
+    times, _ = archive.query('b', BASE + 50.5, BASE + 70)
+    assert times.tolist() == list(range(BASE + 51, BASE + 71))
+    assert len(archive.query('missing', 0, BASE + 3600)[0]) == 0
+
+
+def test_leaving_segment_compacts_it(archive, tmp_path):
+    for second in range(60):
+        archive.record('a', BASE + second, float(second))
+        archive.flush()
+    path = tmp_path / f'{BASE}.seg'
+    assert len(list(iter_blocks(path.read_bytes()))) == 60
+
+    archive.record('a', BASE + 60, 60.0)
+    archive.flush()
+    assert len(list(iter_blocks(path.read_bytes()))) == 1
+    assert archive.query('a', BASE, BASE + 60)[1].tolist() == [float(i) for i in range(61)]
+
+
+def test_index_follows_appends_to_open_segment(archive):
+    archive.record('a', BASE, 1.0)
+    archive.flush()
+    assert archive.query('a', BASE, BASE + 59)[1].tolist() == [1.0]
+    archive.record('a', BASE + 1, 2.0)
+    archive.flush()
+    assert archive.query('a', BASE, BASE + 59)[1].tolist() == [1.0, 2.0]
+
+
+def test_reopen_truncates_torn_tail_and_compacts(tmp_path):
+    archive = MetricsArchive(str(tmp_path), segment_seconds=60, flush_interval=3600)
+    for second in range(10):
+        archive.record('a', BASE + second, float(second))
+        archive.flush()
+    archive.close()
+    path = tmp_path / f'{BASE}.seg'
+    with open(path, 'ab') as f:
+        f.write(encode_block('a', [BASE + 10.0], [10.0])[:-2])
+    (tmp_path / f'{BASE}.seg.tmp').write_bytes(b'leftover')
+
+    # Уплотнение закрытых сегментов выполняет поток записи при старте
+    MetricsArchive(str(tmp_path), segment_seconds=60, flush_interval=3600).close()
+    assert sorted(os.listdir(tmp_path)) == [f'{BASE}.seg']
+    assert len(list(iter_blocks(path.read_bytes()))) == 1
+
+    archive = MetricsArchive(str(tmp_path), segment_seconds=60, flush_interval=3600)
+    assert archive.query('a', BASE, BASE + 59)[1].tolist() == [float(i) for i in range(10)]
+    archive.close()
+
+
+def test_retention_removes_old_segments(archive):
+    archive.record('a', BASE, 1.0)
+    archive.record('a', BASE + 120, 2.0)
+    archive.flush()
+    archive.enforce_retention(now=BASE + archive.retention + 61)
+    assert archive.segments() == [BASE + 120]
+    assert archive.query('a', BASE, BASE + 180)[1].tolist() == [2.0]
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from metrics_history import MetricHistory, RingBuffer, lttb
+
+
+def test_ring_buffer_keeps_last_capacity_points_in_order():
+    buffer = RingBuffer(4)
+    for i in range(6):
+        buffer.append(float(i), i * 10.0)
+
+    times, values = buffer.ordered()
+    assert len(buffer) == 4
+    assert times.tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert values.tolist() == [20.0, 30.0, 40.0, 50.0]
+    assert buffer.last() == (5.0, 50.0)
+
+
+def test_ring_buffer_empty():
+    buffer = RingBuffer(3)
+    assert buffer.last() is None
+    times, values = buffer.ordered()
+    assert len(times) == len(values) == 0
+
+
+@pytest.mark.parametrize('appended', [2, 3, 7])
+def test_ring_buffer_since_matches_ordered(appended):
+    buffer = RingBuffer(3)
+    for i in range(appended):
+        buffer.append(float(i), float(i))
+    all_times, _ = buffer.ordered()
+
+    for start in np.arange(-1.0, appended + 1.0, 0.5):
+        times, values = buffer.since(start)
+        expected = all_times[all_times >= start]
+        assert times.tolist() == expected.tolist()
+        assert values.tolist() == expected.tolist()
+        assert buffer.count_since(start) == len(expected)
+
+
+def test_lttb_short_series_returned_as_is():
+    x = np.arange(5.0)
+    y = x * 2
+    out_x, out_y = lttb(x, y, 10)
+    assert out_x is x and out_y is y
+    # Меньше трёх точек алгоритм не определён - ряд не трогается
+    assert lttb(x, y, 2)[0] is x
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000.0)
+    y = np.zeros(1000)
+    y[137] = 100.0
+    y[612] = -50.0
+
+    out_x, out_y = lttb(x, y, 50)
+    assert len(out_x) == 50
+    assert out_x[0] == 0 and out_x[-1] == 999
+    assert np.all(np.diff(out_x) > 0)
+    assert 137 in out_x and 612 in out_x
+    # Точки берутся из исходного ряда, а не интерполируются
+    assert np.array_equal(out_y, y[out_x.astype(int)])
+
+
+def test_metric_history_uses_coarser_level_for_long_windows():
+    history = MetricHistory(levels=((1, 7200), (60, 120)))
+    for second in range(7200):
+        history.append(float(second % 60), timestamp=float(second))
+
+    times, _ = history.query(60, max_points=100, now=7199.0)
+    # Окно включает свою левую границу
+    assert times.tolist() == list(range(7139, 7200))
+
+    # За два часа сырых точек больше max_points * OVERSAMPLE - берётся
+    # уровень минутных средних
+    times, values = history.query(7200, max_points=100, now=7199.0)
+    assert len(times) <= 120
+    assert np.allclose(values, 29.5)
@@ -0,0 +1,193 @@
+import os
+
+import pytest
+
+import proc_net
+from proc_net import ConnectionCollector, SocketOwners, decode_address
+
+HEADER = "  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n"
+
+
+def row(sl, local, remote, state, inode, uid=1000, tx=0, rx=0):
+    """Строка /proc/net/tcp: адреса в виде 'HEX:PORT'"""
+    return (f"{sl:4d}: {local} {remote} {state} {tx:08X}:{rx:08X} 00:00000000 00000000 "
+            f"{uid:5d}        0 {inode} 1 0000000000000000 100 0 0 10 0\n")
+
+
+class FakeProc:
+    """Дерево /proc с процессами, их сокетами и таблицами /proc/net"""
+
+    def __init__(self, root):
+        self.root = root
+        (root / 'net').mkdir()
+        (root / 'self').mkdir()  # не PID - пропускается
+        self.tables({})
+
+    def add_process(self, pid, comm, *inodes):
+        (self.root / str(pid) / 'fd').mkdir(parents=True)
+        (self.root / str(pid) / 'comm').write_text(comm + '\n')
+        os.symlink('/dev/null', self.root / str(pid) / 'fd' / '0')
+        for inode in inodes:
+            self.add_socket(pid, inode)
+
+    def add_socket(self, pid, inode):
+        fd_dir = self.root / str(pid) / 'fd'
+        fd = max(int(entry) for entry in os.listdir(fd_dir)) + 1
+        os.symlink(f'socket:[{inode}]', fd_dir / str(fd))
+
+    def remove_process(self, pid):
+        directory = self.root / str(pid)
+        for entry in (directory / 'fd').iterdir():
+            entry.unlink()
+        (directory / 'fd').rmdir()
+        (directory / 'comm').unlink()
+        directory.rmdir()
+
+    def tables(self, rows):
+        for protocol in ('tcp', 'tcp6', 'udp', 'udp6'):
+            (self.root / 'net' / protocol).write_text(HEADER + ''.join(rows.get(protocol, [])))
+
+
+@pytest.fixture
+def proc(tmp_path):
+    proc = FakeProc(tmp_path)
+    proc.add_process(10, 'sshd', 100, 101)
+    proc.add_process(20, 'nginx', 200)
+    return proc
+
+
+@pytest.fixture
+def collector(proc, monkeypatch):
+    monkeypatch.setattr(proc_net.sys, 'platform', 'linux')
+    proc.tables({
+        'tcp': [row(0, '00000000:0016', '00000000:0000', '0A', 100),
+                row(1, '0100007F:0016', '0100007F:D431', '01', 101, tx=5, rx=7),
+                row(2, '0100007F:0050', '0100007F:D432', '06', 0)],
+        'tcp6': [row(0, '00000000000000000000000001000000:01BB', '00000000000000000000000000000000:0000',
+                     '0A', 200)],
+        'udp': [row(0, '00000000:0035', '00000000:0000', '07', 300, uid=0)],
+    })
+    return ConnectionCollector(str(proc.root), rescan_budget=1.0)
+
+
+@pytest.mark.parametrize('address, port, expected', [
+    (b'0100007F', b'0016', '127.0.0.1:22'),
+    (b'00000000', b'0000', '0.0.0.0:0'),
+    (b'00000000000000000000000001000000', b'01BB', '::1:443'),
+    (b'0000000000000000FFFF00000100007F', b'0050', '::ffff:127.0.0.1:80'),
+])
+def test_decode_address(address, port, expected):
+    assert decode_address(address, port) == expected
+
+
+# --- SocketOwners ---
+
+def test_initial_scan_maps_inodes(proc):
+    owners = SocketOwners(str(proc.root))
+    owners.update([100, 101, 200])
+    assert owners.owner(100) == (10, 'sshd')
+    assert owners.owner(200) == (20, 'nginx')
+    assert owners.owner(999) == (0, '')
+
+
+def test_new_and_exited_processes(proc):
+    owners = SocketOwners(str(proc.root))
+    owners.update([100, 200])
+    proc.remove_process(20)
+    proc.add_process(30, 'redis', 300)
+    owners.update([100, 300])
+    assert owners.owner_pid(200) == 0
+    assert owners.owner(300) == (30, 'redis')
+
+
+def test_socket_opened_by_known_process_is_rescanned(proc):
+    owners = SocketOwners(str(proc.root), rescan_budget=1.0)
+    owners.update([100])
+    proc.add_socket(20, 201)
+    owners.update([100, 201])
+    assert owners.owner_pid(201) == 20
+
+
+def test_no_rescan_without_budget(proc):
+    owners = SocketOwners(str(proc.root), rescan_budget=0.0)
+    owners.update([100])
+    proc.add_socket(20, 201)
+    owners.update([100, 201])
+    assert owners.owner_pid(201) == 0
+
+
+def test_unresolvable_inode_is_given_up_after_full_round(proc):
+    owners = SocketOwners(str(proc.root), rescan_budget=1.0)
+    owners.update([100])
+    # Владелец в другом пространстве имён PID: его fd не видны
+    owners.update([100, 999])
+    scans = owners._scans
+    assert scans == 2  # один полный круг по двум процессам
+    for _ in range(3):
+        owners.update([100, 999])
+    assert owners._scans == scans
+
+
+def test_closed_socket_loses_owner(proc):
+    owners = SocketOwners(str(proc.root), rescan_budget=1.0)
+    owners.update([100, 101])
+    (proc.root / '10' / 'fd' / '2').unlink()  # fd 2 - сокет 101
+    owners.update([100, 555])  # неизвестный inode запускает перечитывание
+    assert owners.owner_pid(101) == 0
+    assert owners.owner_pid(100) == 10
+
+
+# --- ConnectionCollector ---
+
+def test_reads_tables_with_owners(collector):
+    assert collector.backend == '/proc/net'
+    connections = {(conn.protocol, conn.local_addr): conn for conn in collector.read()}
+    assert len(connections) == 5
+
+    listen = connections[('tcp', '0.0.0.0:22')]
+    assert (listen.status, listen.remote_addr, listen.pid, listen.process) == ('LISTEN', None, 10, 'sshd')
+    established = connections[('tcp', '127.0.0.1:22')]
+    assert established.remote_addr == '127.0.0.1:54321'
+    assert (established.tx_queue, established.rx_queue, established.uid) == (5, 7, 1000)
+    assert established.rtt_ms is None
+    time_wait = connections[('tcp', '127.0.0.1:80')]
+    assert (time_wait.status, time_wait.pid, time_wait.inode) == ('TIME_WAIT', 0, 0)
+    assert connections[('tcp6', '::1:443')].process == 'nginx'
+    udp = connections[('udp', '0.0.0.0:53')]
+    assert (udp.status, udp.pid) == ('NONE', 0)
+
+
+def test_unchanged_rows_reuse_connections(collector):
+    first = {conn.local_addr: conn for conn in collector.read()}
+    second = {conn.local_addr: conn for conn in collector.read()}
+    assert all(second[address] is first[address] for address in first)
+
+
+def test_socket_changing_owner_rebuilds_row(collector, proc):
+    before = {conn.inode: conn for conn in collector.read()}[200]
+    assert before.pid == 20
+    # Сокет унаследован процессом, пережившим своего родителя
+    proc.remove_process(20)
+    proc.add_process(21, 'nginx-worker', 200)
+    after = {conn.inode: conn for conn in collector.read()}[200]
+    assert after is not before
+    assert (after.pid, after.process) == (21, 'nginx-worker')
+
+
+def test_filters(collector):
+    collector.set_filter(states=['LISTEN'])
+    assert sorted(conn.local_addr for conn in collector.read()) == ['0.0.0.0:22', '::1:443']
+    collector.set_filter(ports=[53, 54321])
+    assert sorted(conn.local_addr for conn in collector.read()) == ['0.0.0.0:53', '127.0.0.1:22']
+
+
+def test_missing_table_is_skipped(collector, proc):
+    (proc.root / 'net' / 'tcp6').unlink()
+    assert all(conn.protocol != 'tcp6' for conn in collector.read())
+
+
+def test_psutil_backend_off_linux(proc, monkeypatch):
+    monkeypatch.setattr(proc_net.sys, 'platform', 'win32')
+    collector = ConnectionCollector(str(proc.root))
+    assert collector.backend == 'psutil'
+    assert collector.owners is None
@@ -0,0 +1,102 @@
+import zlib
+
+import pytest
+
+import proc_reader
+from proc_reader import PAGE_SIZE, ProcessSnapshot, ProcReader
+
+
+def stat_line(pid, comm, ppid=1, utime=0, stime=0, starttime=1000, rss_pages=0):
+    """Строка /proc/<pid>/stat: после "(comm) " идут поля state (0),
+    ppid (1), ..., utime (11), stime (12), starttime (19), rss (21)"""
+    fields = ['S', str(ppid)] + ['0'] * 9 + [str(utime), str(stime)] + ['0'] * 6 + \
+             [str(starttime), '0', str(rss_pages)] + ['0'] * 10
+    return f"{pid} ({comm}) {' '.join(fields)}\n"
+
+
+@pytest.fixture
+def proc_root(tmp_path):
+    def add(pid, comm, cmdline=b'', cgroup='0::/user.slice\n', **stat):
+        directory = tmp_path / str(pid)
+        directory.mkdir()
+        (directory / 'stat').write_text(stat_line(pid, comm, **stat))
+        (directory / 'cmdline').write_bytes(cmdline)
+        (directory / 'cgroup').write_text(cgroup)
+
+    add(1, 'init', cmdline=b'/sbin/init\0', utime=5, stime=2, starttime=10, rss_pages=100)
+    # Пробелы и скобки в comm: разбор идёт от последней ')'
+    add(42, 'weird ) name', cmdline=b'./weird\0', ppid=1, starttime=500, rss_pages=3)
+    # comm обрезан ядром до 15 символов - полное имя берётся из cmdline
+    add(77, 'very-long-proce', cmdline=b'/usr/bin/very-long-process-name\0--flag\0',
+        cgroup='5:memory:/legacy\n1:cpu:/other\n')
+    (tmp_path / 'self').mkdir()  # не PID - пропускается
+    (tmp_path / 'meminfo').write_text('')
+    return tmp_path
+
+
+@pytest.fixture
+def reader(proc_root, monkeypatch):
+    monkeypatch.setattr(proc_reader.sys, 'platform', 'linux')
+    reader = ProcReader(str(proc_root))
+    yield reader
+    reader.close()
+
+
+def test_reads_stat_fields(reader):
+    snapshot = reader.read()
+    by_pid = {pid: i for i, pid in enumerate(snapshot.pids.tolist())}
+    assert sorted(by_pid) == [1, 42, 77]
+
+    init = by_pid[1]
+    assert snapshot.names[init] == 'init'
+    assert snapshot.ppids[init] == 1
+    assert snapshot.cpu_ticks[init] == 7
+    assert snapshot.starttimes[init] == 10
+    assert snapshot.rss[init] == 100 * PAGE_SIZE
+    assert snapshot.cgroups[init] == '/user.slice'
+    assert snapshot.cmdline_hashes[init] == zlib.crc32(b'/sbin/init\0')
+
+
+def test_comm_with_spaces_and_parentheses(reader):
+    snapshot = reader.read()
+    index = snapshot.index_of(42)
+    assert snapshot.names[index] == 'weird ) name'
+    assert snapshot.starttimes[index] == 500
+    assert snapshot.rss[index] == 3 * PAGE_SIZE
+
+
+def test_truncated_comm_and_cgroup_v1(reader):
+    snapshot = reader.read()
+    index = snapshot.index_of(77)
+    assert snapshot.names[index] == 'very-long-process-name'
+    assert snapshot.cgroups[index] == '/legacy'
+
+
+def test_second_read_reuses_descriptors_and_drops_exited(reader, proc_root):
+    reader.read()
+    reader.read()
+    assert set(reader._fds) == {1, 42, 77}
+
+    for entry in (proc_root / '42').iterdir():
+        entry.unlink()
+    (proc_root / '42').rmdir()
+    snapshot = reader.read()
+    assert 42 not in snapshot.pids.tolist()
+    assert 42 not in reader._fds
+
+
+def test_malformed_stat_is_skipped(reader, proc_root):
+    (proc_root / '42' / 'stat').write_text('42 (broken) S 1\n')
+    snapshot = reader.read()
+    assert sorted(snapshot.pids.tolist()) == [1, 77]
+
+
+def test_measure_cpu_matches_by_pid_and_starttime():
+    previous = ProcessSnapshot(100.0, [1, 2, 3], [0, 1, 1], [10, 20, 30], [0, 0, 0], [100, 200, 300],
+                               ['a', 'b', 'c'])
+    # PID 2 переиспользован (другой starttime), PID 4 - новый
+    current = ProcessSnapshot(102.0, [3, 2, 1, 4], [1, 1, 0, 1], [30, 99, 10, 40], [0] * 4,
+                              [300 + 2 * proc_reader.CLK_TCK, 5, 100 + proc_reader.CLK_TCK, 50],
+                              ['c', 'b', 'a', 'd'])
+    current.measure_cpu(previous)
+    assert current.cpu_percent.tolist() == pytest.approx([100.0, 0.0, 50.0, 0.0])
@@ -0,0 +1,55 @@
+import numpy as np
+
+from process_history import ProcessHistoryStore
+
+
+def test_history_in_time_order_after_wraparound():
+    store = ProcessHistoryStore(slots=4, depth=5)
+    for i in range(12):
+        store.append(1, float(i), i * 10.0, starttime=100.0)
+    times, rss = store.snapshot(1)
+    assert times.tolist() == [7.0, 8.0, 9.0, 10.0, 11.0]
+    assert rss.tolist() == [70.0, 80.0, 90.0, 100.0, 110.0]
+
+
+def test_unknown_pid_is_empty():
+    times, rss = ProcessHistoryStore(slots=2, depth=3).snapshot(42)
+    assert len(times) == len(rss) == 0
+
+
+def test_reused_pid_starts_fresh_history():
+    store = ProcessHistoryStore(slots=4, depth=10)
+    for i in range(5):
+        store.append(7, float(i), 500.0, starttime=100.0)
+    # Тот же PID у процесса, запущенного позже
+    store.append(7, 5.0, 20.0, starttime=900.0)
+    store.append(7, 6.0, 21.0, starttime=900.0)
+    times, rss = store.snapshot(7)
+    assert times.tolist() == [5.0, 6.0]
+    assert rss.tolist() == [20.0, 21.0]
+
+
+def test_live_processes_are_never_evicted():
+    store = ProcessHistoryStore(slots=2, depth=3)
+    for timestamp in (1.0, 2.0):
+        for pid in range(5):
+            store.append(pid, timestamp, float(pid), starttime=0.0)
+    assert len(store) == 5
+    assert store.slots >= 5
+    for pid in range(5):
+        times, rss = store.snapshot(pid)
+        assert times.tolist() == [1.0, 2.0]
+        assert np.all(rss == pid)
+
+
+def test_exited_processes_free_slots():
+    store = ProcessHistoryStore(slots=2, depth=3)
+    store.append(1, 1.0, 1.0)
+    store.append(2, 1.0, 2.0)
+    store.evict_missing([2])
+    assert 1 not in store and 2 in store
+    store.append(3, 2.0, 3.0)
+    # Освободившийся слот переиспользован без роста и без старых точек
+    assert store.slots == 2
+    assert store.snapshot(3)[0].tolist() == [2.0]
+    assert store.snapshot(2)[0].tolist() == [1.0]
@@ -0,0 +1,148 @@
+import os
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import pytest
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+
+from connection_model import ConnectionTableModel
+from leak_detector import LeakInfo
+from proc_net import Connection
+from process_model import SORT_ROLE, ProcessSortProxy, ProcessTableModel
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+class Signals:
+    """Сигналы модели в порядке испускания"""
+
+    def __init__(self, model):
+        self.events = []
+        model.rowsRemoved.connect(lambda parent, first, last: self.events.append(('removed', first, last)))
+        model.rowsInserted.connect(lambda parent, first, last: self.events.append(('inserted', first, last)))
+        model.dataChanged.connect(lambda top, bottom, roles: self.events.append(
+            ('changed', top.row(), bottom.row(), tuple(roles))))
+
+    def take(self):
+        events, self.events = self.events, []
+        return events
+
+
+def contents(model):
+    """Строки модели в виде исходных значений, отсортированные по ключу"""
+    assert len(model._rows) == model.rowCount()
+    return sorted(tuple(row) for row in model._rows)
+
+
+def process(pid, rss, pss=None):
+    return (pid, f"proc{pid}", rss, pss, None)
+
+
+@pytest.fixture
+def model(app):
+    model = ProcessTableModel()
+    model.apply_snapshot([process(pid, float(pid)) for pid in range(1, 7)])
+    return model
+
+
+def test_first_snapshot_is_one_insert(app):
+    model = ProcessTableModel()
+    signals = Signals(model)
+    model.apply_snapshot([process(pid, 10.0) for pid in (5, 3, 9)])
+    assert signals.take() == [('inserted', 0, 2)]
+    assert model.rowCount() == 3
+
+
+def test_unchanged_snapshot_emits_nothing(model):
+    signals = Signals(model)
+    # Разница меньше точности отображения - тоже без сигнала
+    model.apply_snapshot([process(pid, pid + 0.01) for pid in range(1, 7)])
+    assert signals.take() == []
+
+
+def test_changed_rows_in_contiguous_ranges(model):
+    signals = Signals(model)
+    rss = {pid: float(pid) for pid in range(1, 7)}
+    rss.update({2: 50.0, 3: 60.0, 5: 70.0})
+    model.apply_snapshot([process(pid, value) for pid, value in rss.items()])
+    roles = (Qt.DisplayRole, SORT_ROLE)
+    assert signals.take() == [('changed', 1, 2, roles), ('changed', 4, 4, roles)]
+    assert model.data(model.index(1, 2)) == "50.0"
+
+
+def test_removed_rows_from_the_end(model):
+    signals = Signals(model)
+    model.apply_snapshot([process(pid, float(pid)) for pid in (1, 4, 6)])
+    assert signals.take() == [('removed', 4, 4), ('removed', 1, 2)]
+    assert contents(model) == sorted(process(pid, float(pid)) for pid in (1, 4, 6))
+    assert [model.process_at(row)[0] for row in range(3)] == [1, 4, 6]
+
+
+def test_mixed_update(model):
+    signals = Signals(model)
+    snapshot = [process(1, 1.0), process(3, 33.0), process(6, 6.0), process(7, 7.0), process(8, 8.0, 4.0)]
+    model.apply_snapshot(snapshot)
+    events = signals.take()
+    assert [event[0] for event in events] == ['removed', 'removed', 'changed', 'inserted']
+    assert events[-1] == ('inserted', 3, 4)
+    assert contents(model) == sorted(snapshot)
+    # Индекс ключей согласован со строками после всех шагов
+    model.apply_snapshot(snapshot)
+    assert signals.take() == []
+
+
+def test_formatting_of_missing_values(model):
+    assert model.data(model.index(0, 3)) == "—"
+    assert model.data(model.index(0, 3), SORT_ROLE) == -1.0
+
+
+def test_proxy_follows_updates(model):
+    proxy = ProcessSortProxy()
+    proxy.setSourceModel(model)
+    proxy.sort(2, Qt.DescendingOrder)
+
+    def order():
+        return [proxy.data(proxy.index(row, 0)) for row in range(proxy.rowCount())]
+
+    assert order() == ['6', '5', '4', '3', '2', '1']
+    model.apply_snapshot([process(pid, 100.0 if pid == 2 else float(pid)) for pid in (1, 2, 3, 5, 9)])
+    assert order() == ['2', '9', '5', '3', '1']
+
+
+def test_highlighting_signals_only_affected_rows(model):
+    signals = Signals(model)
+    leak = LeakInfo(3, 2.0, 1.0, 20.0)
+    model.set_highlighted({3: leak, 42: leak})
+    roles = (Qt.BackgroundRole, Qt.ToolTipRole)
+    assert signals.take() == [('changed', 2, 2, roles)]
+    assert model.data(model.index(2, 0), Qt.ToolTipRole) == "Утечка? +2.00 МБ/мин"
+    model.set_highlighted({3: leak})
+    assert signals.take() == []
+    model.set_highlighted({})
+    assert signals.take() == [('changed', 2, 2, roles)]
+    assert model.data(model.index(2, 0), Qt.BackgroundRole) is None
+
+
+def connection(local, status='ESTABLISHED', pid=10, inode=100, rtt=None):
+    return Connection('tcp', local, '10.0.0.1:443', status, pid, 'curl', 0, 0,
+                      rtt, None, None, None, None, inode, 1000)
+
+
+def test_connection_rows_keyed_by_addresses_and_inode(app):
+    model = ConnectionTableModel()
+    model.apply_snapshot([connection('10.0.0.2:5000'), connection('10.0.0.2:5001', inode=101)])
+    signals = Signals(model)
+    # Смена состояния и владельца - обновление строки, а не пересоздание
+    model.apply_snapshot([connection('10.0.0.2:5000', status='CLOSE_WAIT', pid=11, rtt=1.5),
+                          connection('10.0.0.2:5001', inode=101)])
+    assert [event[:3] for event in signals.take()] == [('changed', 0, 0)]
+    assert model.connection_at(0) == ('tcp', '10.0.0.2:5000', '10.0.0.1:443', 11)
+    assert model.data(model.index(0, ConnectionTableModel.RTT_COLUMN)) == "1.50"
+    assert model.data(model.index(1, ConnectionTableModel.RTT_COLUMN)) == ""
+    # Тот же адрес с новым inode - другой сокет
+    model.apply_snapshot([connection('10.0.0.2:5000', inode=200), connection('10.0.0.2:5001', inode=101)])
+    assert [event[0] for event in signals.take()] == ['removed', 'inserted']
@@ -0,0 +1,131 @@
+import math
+
+import numpy as np
+import pytest
+
+import process_rules
+from proc_reader import ProcessSnapshot
+from process_rules import ProcessRules
+
+MB = 1024 * 1024
+
+CMDLINES = {
+    1: '/usr/bin/python3 -m http.server',
+    2: '/usr/bin/python3 /opt/batch/job.py --nightly',
+    3: '/usr/sbin/nginx -g daemon off;',
+}
+
+
+@pytest.fixture(autouse=True)
+def cmdlines(monkeypatch):
+    """Командные строки из таблицы вместо /proc; reads - прочитанные PID"""
+    reads = []
+
+    def lazy(pid):
+        def cmdline():
+            reads.append(pid)
+            return CMDLINES.get(pid, '')
+        return cmdline
+    monkeypatch.setattr(process_rules, '_lazy_cmdline', lazy)
+    return reads
+
+
+def threshold(rules, pid=1, name='python3', cmdline_hash=None, uid=-1, cgroup=''):
+    # Решения кэшируются по хэшу командной строки: по умолчанию у
+    # каждого PID из таблицы своя
+    cmdline_hash = pid if cmdline_hash is None else cmdline_hash
+    return rules.threshold_for(pid, name, cmdline_hash, uid, cgroup)
+
+
+def test_default_threshold_without_rules():
+    assert threshold(ProcessRules(default_threshold=300)) == 300
+
+
+def test_whitelist_excludes_by_exact_name():
+    rules = ProcessRules.from_settings({'whitelist': ['chrome', 'code'], 'threshold': 200})
+    assert math.isnan(threshold(rules, name='chrome'))
+    assert threshold(rules, name='chromium') == 200
+
+
+def test_first_matching_rule_wins():
+    rules = ProcessRules([
+        {'action': 'include', 'name': 'python*', 'cmdline': r'job\.py', 'threshold': 4000},
+        {'action': 'exclude', 'name': 'python3'},
+    ])
+    assert threshold(rules, pid=2) == 4000
+    assert math.isnan(threshold(rules, pid=1))
+
+
+def test_earlier_generic_rule_beats_later_exact_name():
+    rules = ProcessRules([
+        {'action': 'include', 'cmdline': 'http.server', 'threshold': 50},
+        {'action': 'exclude', 'name': 'python3'},
+    ])
+    assert threshold(rules, pid=1) == 50
+    assert math.isnan(threshold(rules, pid=2))
+
+
+def test_exact_name_is_not_a_pattern():
+    rules = ProcessRules([{'action': 'exclude', 'name': 'nginx'}])
+    assert math.isnan(threshold(rules, name='nginx'))
+    assert threshold(rules, name='nginx-worker') == 500
+
+
+@pytest.mark.parametrize('pattern, name, excluded', [
+    ('chrom*', 'chromium', True),
+    ('chrom*', 'xchrome', False),
+    ('kworker/?:?', 'kworker/0:1', True),
+    ('[abc]sh', 'bsh', True),
+    ('[abc]sh', 'zsh', False),
+])
+def test_name_glob(pattern, name, excluded):
+    rules = ProcessRules([{'action': 'exclude', 'name': pattern}])
+    assert math.isnan(threshold(rules, name=name)) == excluded
+
+
+def test_include_without_threshold_uses_default():
+    rules = ProcessRules([{'action': 'include', 'name': 'python3'}], default_threshold=700)
+    assert threshold(rules) == 700
+
+
+def test_user_and_cgroup_conditions():
+    rules = ProcessRules([
+        {'action': 'exclude', 'user': 'root', 'cgroup': '/system.slice/*'},
+    ])
+    assert math.isnan(threshold(rules, uid=0, cgroup='/system.slice/nginx.service'))
+    assert threshold(rules, uid=0, cgroup='/user.slice/session-1.scope') == 500
+
+
+def test_cmdline_read_only_when_a_rule_needs_it(cmdlines):
+    rules = ProcessRules([{'action': 'exclude', 'name': 'nginx'},
+                          {'action': 'exclude', 'name': 'java*'}])
+    threshold(rules, pid=3, name='nginx')
+    threshold(rules, pid=1, name='python3')
+    assert cmdlines == []
+
+    rules = ProcessRules([{'action': 'exclude', 'cmdline': 'daemon off'}])
+    assert math.isnan(threshold(rules, pid=3, name='nginx'))
+    assert cmdlines == [3]
+
+
+def test_decision_cached_by_identity(cmdlines):
+    rules = ProcessRules([{'action': 'exclude', 'cmdline': 'http'}])
+    assert math.isnan(threshold(rules, pid=1, cmdline_hash=7))
+    # Тот же сервис под новым PID - без повторного чтения командной строки
+    assert math.isnan(threshold(rules, pid=100, cmdline_hash=7))
+    assert cmdlines == [1]
+
+
+def test_snapshot_thresholds_and_exclusions():
+    snapshot = ProcessSnapshot(
+        timestamp=0, pids=[1, 2, 3], ppids=[0, 0, 0], starttimes=[0, 0, 0],
+        rss=[600 * MB, 600 * MB, 600 * MB], cpu_ticks=[0, 0, 0],
+        names=['python3', 'python3', 'nginx'], cmdline_hashes=[1, 2, 3])
+    rules = ProcessRules([
+        {'action': 'include', 'cmdline': r'job\.py', 'threshold': 1000},
+        {'action': 'exclude', 'name': 'nginx'},
+    ], default_threshold=500)
+
+    np.testing.assert_array_equal(rules.thresholds(snapshot), [500, 1000, np.nan])
+    assert rules.over_threshold(snapshot).tolist() == [0]
+    assert rules.excluded(snapshot).tolist() == [False, False, True]
@@ -0,0 +1,187 @@
+import errno
+import socket
+import struct
+
+import pytest
+
+from sock_diag import (ALL_STATES, BC_OP, DIAG_MSG, DIAG_REQUEST, INET_DIAG_CONG, INET_DIAG_INFO,
+                       INET_DIAG_REQ_BYTECODE, NLM_F_DUMP, NLM_F_REQUEST, NLMSG_DONE, NLMSG_ERROR,
+                       NLMSG_HEADER, RTA_HEADER, SOCK_DIAG_BY_FAMILY, SockDiag, port_filter)
+
+
+def attribute(kind: int, value: bytes) -> bytes:
+    data = RTA_HEADER.pack(RTA_HEADER.size + len(value), kind) + value
+    return data.ljust((len(data) + 3) & ~3, b'\0')
+
+
+def tcp_info(size: int = 232, rtt=1500, rttvar=250, cwnd=10, retrans=3, acked=4096, received=8192) -> bytes:
+    info = bytearray(size)
+    for offset, fmt, value in ((68, 'I', rtt), (72, 'I', rttvar), (80, 'I', cwnd),
+                               (100, 'I', retrans), (120, 'Q', acked), (128, 'Q', received)):
+        if offset + struct.calcsize(fmt) <= size:
+            struct.pack_into('=' + fmt, info, offset, value)
+    return bytes(info)
+
+
+def diag_msg(family=socket.AF_INET, state=1, local=('127.0.0.1', 8080), remote=('127.0.0.1', 40000),
+             rqueue=0, wqueue=0, uid=1000, inode=12345, attributes=b'') -> bytes:
+    src = socket.inet_pton(family, local[0]).ljust(16, b'\0')
+    dst = socket.inet_pton(family, remote[0]).ljust(16, b'\0')
+    return DIAG_MSG.pack(family, state, 0, 0, socket.htons(local[1]), socket.htons(remote[1]),
+                         src, dst, 0, 0, rqueue, wqueue, uid, inode) + attributes
+
+
+def netlink(kind: int, payload: bytes, sequence: int) -> bytes:
+    data = NLMSG_HEADER.pack(NLMSG_HEADER.size + len(payload), kind, 0, sequence, 0) + payload
+    return data.ljust((len(data) + 3) & ~3, b'\0')
+
+
+def parse(payload: bytes):
+    data = b'\xff' * 8 + payload
+    return SockDiag._parse(data, 8, len(data))
+
+
+# --- Байткод фильтра ---
+
+def test_port_filter_single_port():
+    assert port_filter([80]).hex() == "070c1000000000005000000001041000080c10000000000050000000"
+
+
+def test_port_filter_is_or_chain():
+    program = port_filter([80, 443])
+    assert len(program) == 4 * 12 + 3 * 4
+    ops = []
+    pos = 0
+    while pos < len(program):
+        code, yes, no = BC_OP.unpack_from(program, pos)
+        ops.append((pos, code, yes, no))
+        pos += yes
+    assert [op[1] for op in ops] == [7, 1, 8, 1, 7, 1, 8]
+    for pos, code, yes, no in ops:
+        if code == 1:
+            # JMP при успехе условия ведёт ровно в конец программы
+            assert pos + no == len(program)
+        else:
+            # Промах условия перепрыгивает свой JMP к следующему условию
+            assert no == 16
+    ports = [struct.unpack_from('=i', program, pos + 8)[0] for pos, code, _, _ in ops if code != 1]
+    assert ports == [80, 80, 443, 443]
+
+
+def test_no_ports_no_bytecode():
+    assert port_filter([]) == b''
+
+
+# --- Разбор inet_diag_msg ---
+
+def test_parse_ipv4_with_tcp_info_and_congestion():
+    result = parse(diag_msg(rqueue=5, wqueue=7, attributes=attribute(INET_DIAG_INFO, tcp_info())
+                            + attribute(INET_DIAG_CONG, b'cubic\0')))
+    assert (result.status, result.local_ip, result.local_port, result.remote_ip, result.remote_port) == \
+        ('ESTABLISHED', '127.0.0.1', 8080, '127.0.0.1', 40000)
+    assert (result.rx_queue, result.tx_queue, result.uid, result.inode) == (5, 7, 1000, 12345)
+    assert result.rtt_ms == 1.5
+    assert result.rttvar_ms == 0.25
+    assert (result.cwnd, result.retransmits, result.bytes_acked, result.bytes_received) == (10, 3, 4096, 8192)
+    assert result.congestion == 'cubic'
+
+
+def test_parse_ipv6():
+    result = parse(diag_msg(family=socket.AF_INET6, state=10, local=('::1', 443), remote=('::', 0)))
+    assert (result.family, result.status, result.local_ip, result.local_port, result.remote_ip) == \
+        (socket.AF_INET6, 'LISTEN', '::1', 443, '::')
+
+
+def test_parse_short_tcp_info_from_old_kernel():
+    # Структура обрывается на tcpi_total_retrans: остальное - нули
+    result = parse(diag_msg(attributes=attribute(INET_DIAG_INFO, tcp_info(size=104))))
+    assert (result.rtt_ms, result.cwnd, result.retransmits) == (1.5, 10, 3)
+    assert (result.bytes_acked, result.bytes_received) == (0, 0)
+
+
+def test_parse_without_tcp_info():
+    result = parse(diag_msg(state=6))
+    assert result.status == 'TIME_WAIT'
+    assert result.rtt_ms is result.cwnd is result.bytes_acked is None
+    assert result.congestion == ''
+
+
+# --- Запрос и приём через подставной сокет ---
+
+class FakeSocket:
+    def __init__(self, replies=()):
+        self.sent = []
+        self.replies = list(replies)
+
+    def sendto(self, data, address):
+        self.sent.append(data)
+
+    def recv(self, size):
+        return self.replies.pop(0)
+
+
+def fake_diag(replies=()) -> SockDiag:
+    diag = SockDiag.__new__(SockDiag)
+    diag.sock = FakeSocket(replies)
+    diag._sequence = 0
+    return diag
+
+
+def test_request_packing():
+    diag = fake_diag()
+    bytecode = port_filter([22])
+    diag._request(socket.AF_INET6, ALL_STATES, bytecode)
+    data, = diag.sock.sent
+    length, kind, flags, sequence, _ = NLMSG_HEADER.unpack_from(data)
+    assert (length, kind, flags, sequence) == (len(data), SOCK_DIAG_BY_FAMILY, NLM_F_REQUEST | NLM_F_DUMP, 1)
+    family, protocol, extensions, states = DIAG_REQUEST.unpack_from(data, NLMSG_HEADER.size)
+    assert (family, protocol, states) == (socket.AF_INET6, socket.IPPROTO_TCP, ALL_STATES)
+    assert extensions == (1 << (INET_DIAG_INFO - 1)) | (1 << (INET_DIAG_CONG - 1))
+    offset = NLMSG_HEADER.size + DIAG_REQUEST.size
+    assert RTA_HEADER.unpack_from(data, offset) == (RTA_HEADER.size + len(bytecode), INET_DIAG_REQ_BYTECODE)
+    assert data[offset + RTA_HEADER.size:] == bytecode
+
+
+def test_request_without_ports_has_no_bytecode():
+    diag = fake_diag()
+    diag._request(socket.AF_INET, 1 << 10, b'')
+    assert len(diag.sock.sent[0]) == NLMSG_HEADER.size + DIAG_REQUEST.size
+
+
+def test_receive_across_reads_until_done():
+    diag = fake_diag()
+    diag._sequence = 5
+    diag.sock.replies = [
+        netlink(SOCK_DIAG_BY_FAMILY, diag_msg(inode=1), 5) + netlink(SOCK_DIAG_BY_FAMILY, diag_msg(inode=2), 5),
+        # Ответ на прошлый запрос не смешивается с текущим
+        netlink(SOCK_DIAG_BY_FAMILY, diag_msg(inode=99), 4) + netlink(SOCK_DIAG_BY_FAMILY, diag_msg(inode=3), 5),
+        netlink(NLMSG_DONE, struct.pack('=i', 0), 5),
+    ]
+    assert [s.inode for s in diag._receive()] == [1, 2, 3]
+    assert diag.sock.replies == []
+
+
+def test_receive_error():
+    diag = fake_diag()
+    diag._sequence = 1
+    diag.sock.replies = [netlink(NLMSG_ERROR, struct.pack('=i', -errno.EINVAL) + bytes(16), 1)]
+    with pytest.raises(OSError) as error:
+        diag._receive()
+    assert error.value.errno == errno.EINVAL
+
+
+# --- Живой дамп ---
+
+@pytest.mark.skipif(not SockDiag.available(), reason="NETLINK_SOCK_DIAG недоступен")
+def test_live_dump_finds_listening_socket():
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen()
+    port = server.getsockname()[1]
+    diag = SockDiag()
+    try:
+        sockets = diag.dump(states=['LISTEN'], ports=[port], families=(socket.AF_INET,))
+    finally:
+        diag.close()
+        server.close()
+    assert [(s.local_ip, s.local_port, s.status) for s in sockets] == [('127.0.0.1', port, 'LISTEN')]
@@ -0,0 +1,166 @@
+import pytest
+import requests
+
+import telegram_client
+from telegram_client import TelegramClient, TelegramError, TokenBucket, run_stub_server
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None):
+        self.status_code = status_code
+        self.body = body if body is not None else {'ok': True, 'result': {'message_id': 1}}
+
+    def json(self):
+        if isinstance(self.body, Exception):
+            raise self.body
+        return self.body
+
+
+class FakeSession:
+    """Отвечает по сценарию: ответ или исключение на каждый запрос"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.requests = []
+
+    def post(self, url, data=None, files=None, timeout=None):
+        self.requests.append((url, data, timeout))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Паузы клиента и ограничителей записываются и двигают поддельные
+    часы вместо сна"""
+    calls = []
+    now = [1000.0]
+
+    def sleep(seconds):
+        calls.append(seconds)
+        now[0] += seconds
+    monkeypatch.setattr(telegram_client.time, 'sleep', sleep)
+    monkeypatch.setattr(telegram_client.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(telegram_client.random, 'uniform', lambda low, high: 1.0)
+    return calls
+
+
+def client_with(*outcomes, **kwargs) -> TelegramClient:
+    client = TelegramClient('TOKEN', 'http://bot.invalid', **kwargs)
+    client.session = FakeSession(*outcomes)
+    return client
+
+
+def rate_limited(retry_after):
+    return FakeResponse(429, {'ok': False, 'error_code': 429, 'parameters': {'retry_after': retry_after}})
+
+
+def test_result_and_url(sleeps):
+    client = client_with(FakeResponse(body={'ok': True, 'result': [1, 2]}))
+    assert client.call('getUpdates', {'offset': 5}, read_timeout=35) == [1, 2]
+    url, data, timeout = client.session.requests[0]
+    assert url == 'http://bot.invalid/botTOKEN/getUpdates'
+    assert data == {'offset': 5}
+    assert timeout == (5.0, 35)
+    assert sleeps == []
+
+
+def test_server_errors_back_off_exponentially(sleeps):
+    client = client_with(FakeResponse(502), FakeResponse(503), FakeResponse(), backoff=0.5)
+    assert client.call('getMe') is not None
+    assert sleeps == [0.5, 1.0]
+
+
+def test_server_errors_give_up_after_retries(sleeps):
+    client = client_with(*[FakeResponse(500)] * 3, retries=2)
+    with pytest.raises(TelegramError, match='HTTP 500'):
+        client.call('getMe')
+    assert len(client.session.requests) == 3
+
+
+def test_api_error_is_not_retried(sleeps):
+    client = client_with(FakeResponse(400, {'ok': False, 'description': 'Bad Request: chat not found'}))
+    with pytest.raises(TelegramError, match='chat not found'):
+        client.call('sendMessage', {'chat_id': 1, 'text': 'x'})
+    assert len(client.session.requests) == 1
+
+
+def test_retry_after_without_rate_limits(sleeps):
+    client = client_with(rate_limited(7), FakeResponse(), rate_limits=False)
+    assert client.send_message(1, 'text')
+    assert sleeps == [7.0]
+    assert len(client.session.requests) == 2
+
+
+def test_retry_after_blocks_chat_bucket(sleeps):
+    client = client_with(rate_limited(3), FakeResponse())
+    assert client.send_message(1, 'text')
+    # Повтор ждёт в ограничителе не меньше retry_after
+    assert sleeps == [3.0]
+
+
+def test_retry_after_exhausted(sleeps):
+    client = client_with(*[rate_limited(1)] * 2, retries=1, rate_limits=False)
+    with pytest.raises(TelegramError, match='retry_after=1.0'):
+        client.call('getMe')
+
+
+def test_connection_errors_are_retried(sleeps):
+    client = client_with(requests.ConnectionError(), requests.ConnectTimeout(), FakeResponse())
+    assert client.send_message(1, 'text')
+    assert len(client.session.requests) == 3
+
+
+def test_read_timeout_does_not_resend_message(sleeps):
+    client = client_with(requests.ReadTimeout(), FakeResponse())
+    assert not client.send_message(1, 'text')
+    assert len(client.session.requests) == 1
+
+    client = client_with(requests.ReadTimeout(), FakeResponse())
+    assert not client.send_photo(1, b'png')
+    assert len(client.session.requests) == 1
+
+
+def test_read_timeout_retried_for_idempotent_methods(sleeps):
+    client = client_with(requests.ReadTimeout(), FakeResponse())
+    assert client.call('getUpdates', {'offset': 0}) is not None
+    assert len(client.session.requests) == 2
+
+    client = client_with(requests.ReadTimeout(), FakeResponse())
+    assert client.call('sendMessage', {'chat_id': 1}, retry_read_timeout=True) is not None
+
+
+def test_token_bucket_spacing(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(telegram_client.time, 'monotonic', lambda: now[0])
+    bucket = TokenBucket(rate=2.0, capacity=2.0)
+    # Запас тратится сразу, дальше - по токену в 0.5 с в порядке очереди
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+    now[0] += 2.0
+    assert bucket.reserve() == 0.0
+
+
+def test_token_bucket_penalty(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(telegram_client.time, 'monotonic', lambda: now[0])
+    bucket = TokenBucket(rate=10.0, capacity=10.0)
+    bucket.penalize(5.0)
+    bucket.penalize(1.0)  # более короткий запрет не сокращает действующий
+    assert bucket.reserve() == 5.0
+    now[0] += 5.0
+    assert bucket.reserve() == 0.0
+
+
+def test_stub_server_round_trip():
+    server, base_url = run_stub_server()
+    client = TelegramClient('TOKEN', base_url, rate_limits=False)
+    try:
+        assert client.call('sendMessage', {'chat_id': 1, 'text': 'x'}) == {'message_id': 1}
+    finally:
+        client.close()
+        server.shutdown()
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from tgBotManager import TelegramBotManager
+
+
+class FakeSampler:
+    """Учёт подписок вместо фонового сбора"""
+
+    def __init__(self):
+        self.active = {}
+        self.started = False
+        self._next = 0
+
+    def subscribe(self, kinds, interval):
+        self._next += 1
+        self.active[self._next] = (tuple(kinds), interval)
+        return self._next
+
+    def unsubscribe(self, token):
+        del self.active[token]
+
+    def start(self):
+        self.started = True
+
+
+@pytest.fixture
+def manager(tmp_path):
+    settings = tmp_path / 'telegram_settings.json'
+    settings.write_text(json.dumps({'bot_token': '', 'chat_id': ''}))
+    manager = TelegramBotManager(str(settings), sampler=FakeSampler())
+    yield manager
+    manager.alerts.stop()
+
+
+def test_stop_without_start(manager):
+    # Так закрывается приложение без настроенного бота
+    manager.stop_bot()
+    assert manager.report_subscriptions == []
+    assert not manager.is_running
+
+
+def test_start_without_token_refused(manager):
+    assert not manager.start_bot()
+    manager.stop_bot()
+    assert manager.sampler.active == {}
+
+
+def test_saving_settings_keeps_report_subscriptions(manager, monkeypatch):
+    monkeypatch.setattr(manager, 'bot_loop', lambda: None)
+    manager.settings['bot_token'] = 'token'
+    assert manager.start_bot()
+    assert len(manager.sampler.active) == 2
+
+    assert manager.save_settings()
+    manager.stop_bot()
+    # Перечитывание правил не теряет подписки - остановка их снимает
+    assert manager.sampler.active == {}
+
+
+def test_unconfigured_bot_sends_nothing(manager, monkeypatch):
+    monkeypatch.setattr(manager.charts, 'render', lambda *args: pytest.fail("график без получателя"))
+    assert manager.send_alert("Память") is False